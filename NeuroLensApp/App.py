@@ -1,27 +1,120 @@
 # app.py - Enhanced Main Application Entry Point
+import os
 import tkinter as tk
 from tkinter import messagebox
 from Pages.DashBoard import Dashboard
 from Pages.Alerts import Alerts  #
 from Pages.Help import Help
 from sensor_monitor import SensorMonitor
+from sensor_process import SensorProcess
+from jitter_meter import format_stats
+from ui_channel import UIEventChannel
+from event_log import EventLog, EventLogReader
+from alert_store import AlertStore
+from alert_index import AlertIndex
+from sample_store import SampleStore
+from rollups import RollupEngine
+from checkpoint import Checkpointer
+from sync_engine import SyncEngine, DEFAULT_ENDPOINT
+from retention import StorageCompactor, format_report
+
+# "thread" runs SensorMonitor inside the UI process, "process" isolates it in its own
+SENSOR_MODE = os.environ.get("NEUROLENS_SENSOR_MODE", "thread")
+
+# Where the Sync button uploads alerts, and where local state is kept between runs
+SYNC_ENDPOINT = os.environ.get("NEUROLENS_SYNC_URL", DEFAULT_ENDPOINT)
+DATA_DIR = os.environ.get("NEUROLENS_DATA_DIR",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
 
 class NeuroLensApp:
-    def __init__(self):
+    def __init__(self, sensor_mode=SENSOR_MODE):
         self.window = tk.Tk()
         self.window.geometry("1072x618")
         self.window.title("NeuroLens - Drowsiness Monitor")
         self.window.configure(bg="#3A404D")
         self.window.resizable(False, False)
         
-        # Initialize sensor monitor
+        # Sensor-to-UI event channel (pages subscribe in their constructors)
+        self.ui_channel = UIEventChannel(self.window)
+        
+        # Initialize sensor monitor - it records alerts and state changes in the event log,
+        # alert history in the alert store, which the Alerts page pages through, and raw
+        # samples as per-session column files under sample_dir (read with sample_store.SampleSession)
+        # and 1 s / 1 min / 1 h rollups under rollup_dir, which the dashboard charts. After a
+        # crash or reboot it resumes the session from its last checkpoint plus the log tail
+        self.sensor_mode = sensor_mode
+        self.event_log_dir = os.path.join(DATA_DIR, "events")
+        self.sample_dir = os.path.join(DATA_DIR, "samples")
+        self.rollup_dir = os.path.join(DATA_DIR, "rollups")
+        checkpoint_path = os.path.join(DATA_DIR, "checkpoint.bin")
+        self.event_log = None
+        alert_store_path = os.path.join(DATA_DIR, "alerts.db")
         try:
-            self.sensor_monitor = SensorMonitor()
+            os.makedirs(DATA_DIR, exist_ok=True)
+            self.alert_store = AlertStore(alert_store_path)
+        except Exception as e:
+            print(f"Alert store unavailable: {e}")
+            self.alert_store = None
+        # Full-text search over the whole alert history, built in the background
+        self.alert_index = None
+        if self.alert_store is not None:
+            self.alert_index = AlertIndex(self.alert_store)
+            self.alert_index.start()
+        # In thread mode the stores are opened here, each on its own - the monitor
+        # runs without any that fail (in process mode the sensing process opens them)
+        stores = {}
+        if sensor_mode != "process":
+            for name, open_store in (
+                    ("event_log", lambda: EventLog(self.event_log_dir)),
+                    ("sample_store", lambda: SampleStore(self.sample_dir)),
+                    ("rollups", lambda: RollupEngine(self.rollup_dir)),
+                    ("checkpointer", lambda: Checkpointer(checkpoint_path, stores.get("event_log")))):
+                try:
+                    stores[name] = open_store()
+                except Exception as e:
+                    print(f"{name} unavailable: {e}")
+            self.event_log = stores.get("event_log")
+        try:
+            if sensor_mode == "process":
+                self.sensor_monitor = SensorProcess(ui_channel=self.ui_channel,
+                                                    event_log_dir=self.event_log_dir,
+                                                    alert_store_path=alert_store_path,
+                                                    sample_dir=self.sample_dir,
+                                                    rollup_dir=self.rollup_dir,
+                                                    checkpoint_path=checkpoint_path)
+            else:
+                self.sensor_monitor = SensorMonitor(ui_channel=self.ui_channel, alert_store=self.alert_store,
+                                                    **stores)
             self.sensor_monitor.start()
-            print("Sensor monitor initialized successfully")
+            print(f"Sensor monitor initialized successfully ({sensor_mode} mode)")
         except Exception as e:
             print(f"Sensor monitor initialization failed: {e}")
             self.sensor_monitor = None
+            # Nothing will run to close these - the event log stays open for stop_sensor_monitor
+            for name in ("checkpointer", "rollups", "sample_store"):
+                if name in stores:
+                    stores[name].close()
+        
+        self.sensor_stopped = False
+        
+        # The Sync button uploads the event log past the last synced event (progress arrives as 'sync' events)
+        self.sync_engine = SyncEngine(
+            outbox=EventLogReader(self.event_log_dir),
+            endpoint=SYNC_ENDPOINT,
+            cursor_path=os.path.join(DATA_DIR, "sync_cursor.json"),
+            on_progress=lambda progress: self.ui_channel.post('sync', progress)
+        )
+        
+        # Hourly low-priority pass keeping DATA_DIR within its age and size limits;
+        # events are only expired once synced (unless past the hard size limit, e.g. when the
+        # sync endpoint is never reachable), raw samples leave their rollups behind
+        self.storage_compactor = StorageCompactor(
+            self.event_log_dir, self.sample_dir, rollup_dir=self.rollup_dir,
+            alert_store_path=alert_store_path,
+            synced_seq=lambda: self.sync_engine.cursor,
+            on_report=lambda report: print(f"Storage: {format_report(report)}")
+        )
+        self.storage_compactor.start()
         
         # Session tracking
         self.session_count = 0
@@ -157,12 +250,7 @@ class NeuroLensApp:
                         dashboard.increment_logout_count()
                 
                 # Stop sensor monitor
-                if self.sensor_monitor:
-                    try:
-                        self.sensor_monitor.stop()
-                        print("Sensor monitor stopped")
-                    except Exception as e:
-                        print(f"Error stopping sensor monitor: {e}")
+                self.stop_sensor_monitor()
                 
                 # Show logout confirmation
                 messagebox.showinfo("Logout Complete", 
@@ -189,12 +277,9 @@ class NeuroLensApp:
             
             if result:
                 # Stop sensor monitor
-                if self.sensor_monitor:
-                    try:
-                        self.sensor_monitor.stop()
-                        print("Sensor monitor stopped on exit")
-                    except:
-                        pass
+                self.stop_sensor_monitor()
+                
+                self.ui_channel.close()
                 
                 # Cleanup any page resources
                 for page in self.pages.values():
@@ -211,6 +296,43 @@ class NeuroLensApp:
             # Force close if error
             self.window.destroy()
     
+    def stop_sensor_monitor(self):
+        """Stop the sensor monitor (thread or process) and everything storing its data, once"""
+        if self.sensor_stopped:
+            return
+        self.sensor_stopped = True
+        if self.sensor_monitor:
+            try:
+                print(f"Sampling jitter ({self.sensor_mode} mode): "
+                      f"{format_stats(self.sensor_monitor.get_jitter_stats())}")
+                self.sensor_monitor.stop()  # A SensorMonitor thread flushes its stores and releases the GPIO first
+                print("Sensor monitor stopped")
+            except Exception as e:
+                print(f"Error stopping sensor monitor: {e}")
+        
+        # Each part shuts down even if another fails; the index before the store it reads
+        for name, component, shutdown in (
+                ("alert index", self.alert_index, lambda index: index.stop()),
+                ("event log", self.event_log, self.close_event_log),  # Process mode: the child closes it
+                ("alert store", self.alert_store, lambda store: store.close()),
+                ("storage compactor", self.storage_compactor, lambda compactor: compactor.stop()),
+                ("sync engine", self.sync_engine, lambda engine: engine.stop())):
+            if component is None:
+                continue
+            try:
+                shutdown(component)
+            except Exception as e:
+                print(f"Error stopping {name}: {e}")
+    
+    def close_event_log(self, event_log):
+        event_log.close()
+        stats = event_log.get_stats()
+        print(f"Event log closed: {stats['records']} events in {stats['commits']} commits")
+    
+    def sync_now(self):
+        """Start a sync in the background - returns at once, progress arrives as 'sync' events"""
+        self.sync_engine.request_sync()
+    
     def get_sensor_data(self):
         """Get current sensor data for pages"""
         if self.sensor_monitor:
@@ -250,12 +372,7 @@ class NeuroLensApp:
         
         finally:
             # Cleanup on exit
-            if self.sensor_monitor:
-                try:
-                    self.sensor_monitor.stop()
-                    print("Cleanup: Sensor monitor stopped")
-                except:
-                    pass
+            self.stop_sensor_monitor()
             
             print("👋 NeuroLens Application closed")
 
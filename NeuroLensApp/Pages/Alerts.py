@@ -4,25 +4,53 @@ import tkinter as tk
 from tkinter import Canvas, Entry, Button, PhotoImage, messagebox, filedialog
 import csv
 from datetime import datetime
+from records import as_dict
+from alert_index import tokenize
 
 OUTPUT_PATH = Path(__file__).parent
 ASSETS_PATH = OUTPUT_PATH.parent / "assets/alerts"
 
+# Alerts shown per page - the layout has two alert panels
+PAGE_SIZE = 2
+
+# Live alerts reach the store through a writer thread (or the sensing process) -
+# reload the newest page this long after one arrives, once per burst
+LIVE_REFRESH_MS = 250
+
 def relative_to_assets(path: str) -> Path:
     return ASSETS_PATH / Path(path)
 
+def display_alert(alert):
+    """Alerts page form of a stored AlertRecord or alert dict"""
+    alert = dict(as_dict(alert))
+    alert.setdefault("username", alert.get("user", "Unknown"))
+    if alert.get("count", 1) > 1:
+        alert["title"] = f"{alert['title']} (x{alert['count']})"
+    return alert
+
 class Alerts(tk.Frame):  
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#3A404D")
         self.controller = controller
 
         
-        # Alerts data
+        # Alerts data - pages of the persistent alert store when there is one
         self.alerts_data = []
         self.live_alerts = []
+        self.alert_store = getattr(controller, 'alert_store', None)
+        self.alert_index = getattr(controller, 'alert_index', None)
+        self.current_page = None
+        # Hits of the current search (alert_index.SearchResult), or the matching
+        # alerts_data entries when there is no store
+        self.search_result = None
+        self.filtered = None
+        self.refresh_pending = None  # after() id of a scheduled refresh_newest
         
         self.setup_ui()
-        self.load_sample_alerts()
+        if self.alert_store is not None:
+            self.load_page()
+        else:
+            self.load_sample_alerts()
     
     def setup_ui(self):
         self.canvas = Canvas(
@@ -162,7 +190,70 @@ class Alerts(tk.Frame):
         )
         self.export_btn.place(x=250.0, y=550.0, width=100, height=30)
         
-        
+        # Paging through stored alert history
+        if self.alert_store is not None:
+            self.prev_btn = Button(
+                self, text="◀ Newer", fg="#FFFFFF", bg="#4277FF",
+                font=("Arial", 10), command=self.show_newer_page,
+                relief="flat", bd=0, cursor="hand2"
+            )
+            self.prev_btn.place(x=560.0, y=550.0, width=80, height=30)
+            self.next_btn = Button(
+                self, text="Older ▶", fg="#FFFFFF", bg="#4277FF",
+                font=("Arial", 10), command=self.show_older_page,
+                relief="flat", bd=0, cursor="hand2"
+            )
+            self.next_btn.place(x=650.0, y=550.0, width=80, height=30)
+    
+    def load_page(self, before=None, after=None):
+        """Show one page of stored alerts (or search hits) - the newest when no cursor is given"""
+        if self.search_result is not None:
+            self.load_search_page(before, after)
+            return
+        try:
+            page = self.alert_store.page(before=before, after=after, limit=PAGE_SIZE)
+        except Exception as e:
+            print(f"Alert store query failed: {e}")
+            return
+        if not page.alerts and (before is not None or after is not None):
+            return  # Stay on the current page
+        self.current_page = page
+        self.alerts_data = [dict(display_alert(alert), live=False) for alert in page.alerts]
+        self.show_paging(page)
+    
+    def load_search_page(self, before=None, after=None):
+        """Show one page of search hits, fetching just their rows from the store"""
+        try:
+            page = self.search_result.page(before=before, after=after, limit=PAGE_SIZE)
+            alerts = self.alert_store.get(page.ids)
+        except Exception as e:
+            print(f"Alert search failed: {e}")
+            return
+        if not page.ids and (before is not None or after is not None):
+            return  # Stay on the current page
+        self.current_page = page
+        self.alerts_data = [dict(display_alert(alert), live=False) for alert in alerts]
+        self.show_paging(page)
+        self.show_search_info(f"{page.total:,} matching alerts")
+    
+    def show_paging(self, page):
+        self.prev_btn.config(state="normal" if page.has_newer else "disabled")
+        self.next_btn.config(state="normal" if page.has_older else "disabled")
+        self.refresh_display()
+    
+    def show_search_info(self, text):
+        self.canvas.delete("search_info")
+        if text:
+            self.canvas.create_text(740.0, 558.0, anchor="nw", text=text,
+                                    fill="#C4C4C4", font=("Arial", 10), tags="search_info")
+    
+    def show_newer_page(self):
+        if self.current_page is not None and self.current_page.first is not None:
+            self.load_page(after=self.current_page.first)
+    
+    def show_older_page(self):
+        if self.current_page is not None and self.current_page.last is not None:
+            self.load_page(before=self.current_page.last)
     
     def load_sample_alerts(self):
         """Load sample alerts data"""
@@ -189,17 +280,44 @@ class Alerts(tk.Frame):
     
     def add_live_alert(self, alert_data):
         """Add a live alert from dashboard"""
-        alert_data["live"] = True
+        if self.alert_store is not None:
+            # On its way to the store - reload once it has had time to land
+            if self.refresh_pending is None:
+                self.refresh_pending = self.after(LIVE_REFRESH_MS, self.refresh_newest, True)
+            return
+        
+        # Sensor alerts are shared with published snapshots - work on a copy
+        alert_data = dict(display_alert(alert_data), live=True)
         self.live_alerts.insert(0, alert_data)
         self.alerts_data = self.live_alerts + self.alerts_data[:2]  # Keep 2 sample + live alerts
         
         if len(self.alerts_data) > 4:
             self.alerts_data = self.alerts_data[:4]
         
+        if self.filtered is not None:
+            self.on_search(None)  # Filter again, with the new alert
+            return
         self.refresh_display()
     
 
     
+    def refresh_newest(self, live=False):
+        """Reload the newest page (searching again, if a search is shown) - older pages are left as they are.
+        With live, the newest alert is marked as just arrived."""
+        if live:
+            self.refresh_pending = None
+        if self.current_page is not None and self.current_page.has_newer:
+            return
+        if self.search_result is not None:
+            try:
+                self.search_result = self.alert_index.search(self.search_entry.get()) or self.search_result
+            except Exception as e:
+                print(f"Alert search failed: {e}")
+        self.load_page()
+        if live and self.alerts_data and self.search_result is None:
+            self.alerts_data[0]["live"] = True
+            self.refresh_display()
+    
     def display_alerts(self):
         """Display alerts with smaller fonts"""
         alert_positions = [
@@ -207,7 +325,8 @@ class Alerts(tk.Frame):
             (248.0, 352.0)   
         ]
         
-        for i, alert in enumerate(self.alerts_data[:2]):
+        alerts = self.alerts_data if self.filtered is None else self.filtered
+        for i, alert in enumerate(alerts[:2]):
             if i >= len(alert_positions):
                 break
                 
@@ -263,15 +382,32 @@ class Alerts(tk.Frame):
             self.search_entry.config(fg="#999999", bg="#2D2D2D")
     
     def on_search(self, event):
-        search_term = self.search_entry.get().lower()
-        if search_term and search_term != "search alerts...":
-            filtered_alerts = [
-                alert for alert in self.alerts_data 
-                if search_term in alert["title"].lower() or 
-                   search_term in alert["condition"].lower() or
-                   search_term in alert["username"].lower()
+        """Show the alerts containing every word typed (each as a prefix), newest first"""
+        search_term = self.search_entry.get()
+        if search_term == "Search alerts...":
+            search_term = ""
+        if self.alert_index is not None:
+            self.search_result = self.alert_index.search(search_term)
+            if self.search_result is None:
+                self.show_search_info("")
+            self.load_page()
+            return
+        
+        # No store - filter what is on the page
+        tokens = tokenize(search_term)
+        if not tokens:
+            self.filtered = None
+            self.show_search_info("")
+        else:
+            self.filtered = [
+                alert for alert in self.alerts_data
+                if all(any(word.startswith(token) for word in tokenize(
+                    " ".join((alert["title"], alert["username"], alert["condition"],
+                              alert["action"], alert["response"]))))
+                       for token in tokens)
             ]
-            print(f"Found {len(filtered_alerts)} alerts matching '{search_term}'")
+            self.show_search_info(f"{len(self.filtered)} matching alerts")
+        self.refresh_display()
     
     def export_data(self):
         """Export alerts data to CSV"""
@@ -288,7 +424,14 @@ class Alerts(tk.Frame):
                     writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                     
                     writer.writeheader()
-                    for alert in self.alerts_data:
+                    # The whole history when it is stored, newest first
+                    if self.alert_store is not None:
+                        alerts = map(display_alert, self.alert_store.iter_alerts())
+                    else:
+                        alerts = self.alerts_data
+                    total = 0
+                    for alert in alerts:
+                        total += 1
                         writer.writerow({
                             'Title': alert['title'],
                             'Username': alert['username'],
@@ -301,12 +444,14 @@ class Alerts(tk.Frame):
                 
                 messagebox.showinfo("Export Successful", 
                                    f"Alerts data exported to:\n{filename}\n"
-                                   f"Total alerts: {len(self.alerts_data)}")
+                                   f"Total alerts: {total}")
                 
         except Exception as e:
             messagebox.showerror("Export Error", f"Failed to export data:\n{str(e)}")
     
     def on_page_show(self):
         """Called when page is shown"""
+        if self.alert_store is not None:
+            self.refresh_newest()
         self.refresh_display()
         print("Alerts page shown")
\ No newline at end of file
@@ -5,14 +5,39 @@ from tkinter import Canvas, Entry, Button, PhotoImage
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import random
+import time
 from datetime import datetime, timedelta
+from records import as_dict
+from link_monitor import LinkMonitor, SimulatedLink, CONNECTED, DEGRADED, DISCONNECTED
+from rollups import RollupReader, daily_alertness
 
 OUTPUT_PATH = Path(__file__).parent
 ASSETS_PATH = OUTPUT_PATH / Path("../assets/dashboard")
 
+# Session timer refresh while sensor updates are pushed (it only shows minutes)
+TIMER_REFRESH_MS = 10000
+
+# Demo-mode refresh when no sensor monitor is running
+DEMO_REFRESH_MS = 3000
+
+# Performance chart refresh - it reads a few hundred rollup rows, not raw samples
+PERFORMANCE_REFRESH_MS = 60000
+PERFORMANCE_DAYS = 5
+
+# Device Connectivity tile colours
+LINK_COLORS = {CONNECTED: "#AEF5B0", DEGRADED: "#FFFF00", DISCONNECTED: "#FF6B6B"}
+
 def relative_to_assets(path: str) -> Path:
     return ASSETS_PATH / Path(path)
 
+def status_for_level(level):
+    """Status label and colour for a monitor status level (1=drowsy, 5=alert)"""
+    if level <= 2:
+        return "Drowsy", "#FF6B6B"  # Red
+    if level <= 3:
+        return "Normal", "#FFFF00"  # Yellow
+    return "Alert", "#AEF5B0"  # Green
+
 class Dashboard(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#3A404D")
@@ -23,18 +48,45 @@ class Dashboard(tk.Frame):
         self.battery_percentage = 78
         self.blink_count = 0
         self.device_connected = True
+        self.link_stats = None
         self.session_start_time = datetime.now()
         self.status = "Active"
         self.alerts = []  # List to store dynamic alerts
         
+        # Live sensor data is pushed through the controller's UI channel
+        self.sensor_monitor = getattr(controller, 'sensor_monitor', None)
+        self.rendered_version = 0
+        self.update_job = None
+        
+        # Performance chart reads the monitor's rollups (% of time with eyes open per day)
+        rollup_dir = getattr(controller, 'rollup_dir', None)
+        self.rollup_reader = RollupReader(rollup_dir) if rollup_dir and self.sensor_monitor else None
+        self.performance_ax = None
+        
+        # Demo mode fakes the glasses link, one heartbeat per refresh
+        if self.sensor_monitor is None:
+            self.simulated_link = SimulatedLink(LinkMonitor(heartbeat_interval=DEMO_REFRESH_MS / 1000))
+        
         # Initialize sample alerts
         self.initialize_sample_alerts()
         
         self.setup_ui()
+        self.subscribe_to_sensor()
         self.start_live_updates()
     
     def initialize_sample_alerts(self):
-        """Initialize with sample alerts"""
+        """Initialize with the newest stored alerts, so a resumed session shows its own - else samples"""
+        store = getattr(self.controller, 'alert_store', None)
+        if store is not None:
+            try:
+                self.alerts = [
+                    {"type": "Battery" if alert.user == "System" else "Drowsiness",
+                     "time": datetime.fromtimestamp(alert.timestamp), "message": alert.title}
+                    for alert in store.page(limit=4).alerts
+                ]
+                return
+            except Exception as e:
+                print(f"Could not load recent alerts: {e}")
         current_time = datetime.now()
         self.alerts = [
             {"type": "Drowsiness", "time": current_time - timedelta(minutes=5), "message": "Drowsiness Detected"},
@@ -287,6 +339,12 @@ class Dashboard(tk.Frame):
             fill="#AEF5B0", font=("Arial", 16), tags="dynamic"  # Reduced from 20
         )
         
+        # Link latency and heartbeat loss under the status
+        self.link_detail_text = self.canvas.create_text(
+            816.0, 510.0, anchor="nw", text="", 
+            fill="#FFFFFF", font=("Arial", 9), tags="dynamic"
+        )
+        
         # Add Sync Data button functionality
         self.sync_button = Button(
             self,
@@ -367,26 +425,11 @@ class Dashboard(tk.Frame):
             # Simple bar chart for performance
             fig, ax = plt.subplots(figsize=(2.5, 1.8))  # Smaller figure
             
-            # Sample performance data
-            days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri']
-            performance = [75, 82, 78, 85, 80]
-            
-            bars = ax.bar(days, performance, color=['#4277FF', '#4277FF', '#4277FF', '#4277FF', '#4277FF'])
-            ax.set_facecolor('#3A404D')
             fig.patch.set_facecolor('#3A404D')
-            ax.tick_params(colors='white', labelsize=6)  # Smaller labels
-            
-            # Set y-axis limit to 100
-            ax.set_ylim(0, 100)
-            
-            # Remove spines
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['left'].set_color('white')
-            ax.spines['bottom'].set_color('white')
+            self.performance_ax = ax
             
             self.performance_canvas = FigureCanvasTkAgg(fig, self)
-            self.performance_canvas.draw()
+            self.update_performance_graph()
             self.performance_widget = self.performance_canvas.get_tk_widget()
             self.performance_widget.place(x=780, y=140, width=180, height=130)  # Adjusted size
             
@@ -398,29 +441,147 @@ class Dashboard(tk.Frame):
                 fill="#FFFFFF", font=("Arial", 12), tags="graph_fallback"
             )
     
+    def update_performance_graph(self):
+        """Redraw the daily performance bars from the rollups, then schedule the next refresh"""
+        if self.rollup_reader is not None:
+            history = daily_alertness(self.rollup_reader, PERFORMANCE_DAYS)
+        else:
+            history = []
+        days = [day for day, _ in history]
+        performance = [value or 0 for _, value in history]
+        
+        ax = self.performance_ax
+        ax.clear()  # Also resets the face colour
+        ax.set_facecolor('#3A404D')
+        ax.bar(days, performance, color='#4277FF')
+        ax.tick_params(colors='white', labelsize=6)  # Smaller labels
+        
+        # Set y-axis limit to 100
+        ax.set_ylim(0, 100)
+        if not any(performance):
+            ax.text(0.5, 0.5, "No data yet", color='white', fontsize=7,
+                    ha='center', va='center', transform=ax.transAxes)
+        
+        # Remove spines
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['left'].set_color('white')
+        ax.spines['bottom'].set_color('white')
+        self.performance_canvas.draw()
+        
+        if self.rollup_reader is not None:
+            self.after(PERFORMANCE_REFRESH_MS, self.update_performance_graph)
+    
+    def subscribe_to_sensor(self):
+        """Render sensor snapshots as soon as the monitor publishes them"""
+        channel = getattr(self.controller, 'ui_channel', None)
+        if channel is not None and self.sensor_monitor is not None:
+            channel.subscribe('snapshot', self.render_snapshot)
+            channel.subscribe('message', self.update_status)
+        if channel is not None:
+            channel.subscribe('sync', self.show_sync_progress)
+    
     def start_live_updates(self):
         """Start updating dashboard data"""
         self.update_dashboard()
     
+    def render_snapshot(self, snapshot):
+        """Draw a MonitorSnapshot, skipping it if already on screen"""
+        if snapshot.version == self.rendered_version:
+            return
+        self.rendered_version = snapshot.version
+        
+        self.drowsiness_level = snapshot.current_status
+        self.battery_percentage = snapshot.battery_level
+        self.blink_count = snapshot.blink_count
+        
+        self.canvas.itemconfig(self.drowsiness_text, text=str(self.drowsiness_level))
+        self.canvas.itemconfig(self.battery_text, text=f"{int(self.battery_percentage)}%")
+        self.canvas.itemconfig(self.blink_text, text=str(self.blink_count))
+        
+        status, color = status_for_level(self.drowsiness_level)
+        self.canvas.itemconfig(self.status_text, text=status, fill=color)
+        self.render_link(snapshot.link)
+        
+        if snapshot.new_alerts:
+            self.receive_sensor_alerts(self.sensor_monitor.take_alerts())
+    
+    def render_link(self, stats):
+        """Show link status, latency and loss in the Device Connectivity tile"""
+        if stats == self.link_stats:
+            return
+        self.link_stats = stats
+        self.device_connected = stats.status != DISCONNECTED
+        self.canvas.itemconfig(self.connectivity_text, text=stats.status, fill=LINK_COLORS[stats.status])
+        if self.device_connected:
+            detail = f"{stats.latency_ms:.0f} ms · {stats.loss_pct:.1f}% loss"
+        else:
+            detail = "reconnecting..."
+        if stats.reconnects:
+            detail += f" · {stats.reconnects} reconnects"
+        self.canvas.itemconfig(self.link_detail_text, text=detail)
+    
+    def receive_sensor_alerts(self, sensor_alerts):
+        """Move alerts taken from the sensor queue onto the dashboard and Alerts page"""
+        for alert in map(as_dict, sensor_alerts):
+            message = alert.get("title", "Alert")
+            if alert.get("count", 1) > 1:
+                message += f" (x{alert['count']})"
+            self.alerts.insert(0, {
+                "type": "Battery" if alert.get("user") == "System" else "Drowsiness",
+                "time": datetime.now(),
+                "message": message
+            })
+            self.controller.add_alert_to_alerts_page(alert)
+        
+        # Keep only last 20 alerts
+        self.alerts = self.alerts[:20]
+        self.update_alerts_display()
+    
+    def update_status(self, message):
+        """Show a transient sensor message under the drowsiness level"""
+        self.canvas.delete("status_message")
+        self.canvas.create_text(
+            256.0, 195.0, anchor="nw", text=message,
+            fill="#FF6B6B", font=("Arial", 9, "bold"), tags="status_message"
+        )
+        self.after(5000, lambda: self.canvas.delete("status_message"))
+    
+    def update_session_timer(self):
+        """Redraw the session timer"""
+        if self.sensor_monitor is not None:
+            session_seconds = time.time() - self.sensor_monitor.get_snapshot().session_start
+        else:
+            session_seconds = (datetime.now() - self.session_start_time).total_seconds()
+        hours = int(session_seconds // 3600)
+        minutes = int((session_seconds % 3600) // 60)
+        self.canvas.itemconfig(self.timer_text, text=f"{hours}H{minutes:02d}m")
+    
     def update_dashboard(self):
         """Update all dynamic elements"""
+        if self.update_job is not None:
+            self.after_cancel(self.update_job)
+            self.update_job = None
+        
+        if self.sensor_monitor is not None:
+            # Sensor values arrive via render_snapshot - only the timer needs a tick
+            self.render_snapshot(self.sensor_monitor.get_snapshot())
+            self.update_session_timer()
+            self.update_alerts_display()
+            self.update_job = self.after(TIMER_REFRESH_MS, self.update_dashboard)
+            return
+        
         try:
             # Simulate sensor data changes
             self.drowsiness_level = max(1, min(5, self.drowsiness_level + random.randint(-1, 1)))
             self.battery_percentage = max(10, self.battery_percentage - 0.02)
             self.blink_count += random.randint(0, 2)
             
-            # Update session timer
-            current_time = datetime.now()
-            session_duration = current_time - self.session_start_time
-            hours = int(session_duration.total_seconds() // 3600)
-            minutes = int((session_duration.total_seconds() % 3600) // 60)
-            
             # Update canvas text elements
             self.canvas.itemconfig(self.drowsiness_text, text=str(self.drowsiness_level))
             self.canvas.itemconfig(self.battery_text, text=f"{int(self.battery_percentage)}%")
             self.canvas.itemconfig(self.blink_text, text=str(self.blink_count))
-            self.canvas.itemconfig(self.timer_text, text=f"{hours}H{minutes:02d}m")
+            self.update_session_timer()
             
             # Update status color based on drowsiness
             if self.drowsiness_level <= 2:
@@ -435,12 +596,9 @@ class Dashboard(tk.Frame):
                 
             self.canvas.itemconfig(self.status_text, text=status, fill=color)
             
-            # Update connectivity status occasionally
-            if random.random() < 0.05:
-                self.device_connected = not self.device_connected
-                status_text = "connected" if self.device_connected else "disconnected"
-                status_color = "#AEF5B0" if self.device_connected else "#FF6B6B"
-                self.canvas.itemconfig(self.connectivity_text, text=status_text, fill=status_color)
+            # Simulated glasses link
+            self.simulated_link.tick()
+            self.render_link(self.simulated_link.link.get_stats())
             
             # Simulate new alerts occasionally (10% chance each update)
             if random.random() < 0.1:
@@ -453,7 +611,7 @@ class Dashboard(tk.Frame):
             print(f"Error updating dashboard: {e}")
         
         # Schedule next update
-        self.after(3000, self.update_dashboard)
+        self.update_job = self.after(DEMO_REFRESH_MS, self.update_dashboard)
     
     def generate_new_alert(self):
         """Generate a new simulated alert"""
@@ -478,6 +636,12 @@ class Dashboard(tk.Frame):
     
     def sync_data(self):
         """Sync data button handler"""
+        if hasattr(self.controller, 'sync_now'):
+            # Upload runs on the sync thread; show_sync_progress reports back
+            self.sync_button.config(state="disabled")
+            self.controller.sync_now()
+            return
+        
         print("Syncing data with glasses...")
         # Refresh all data
         self.battery_percentage = 78
@@ -495,16 +659,44 @@ class Dashboard(tk.Frame):
         # Show sync confirmation
         self.show_sync_confirmation()
     
-    def show_sync_confirmation(self):
+    def show_sync_confirmation(self, text="Data synced successfully!", color="#AEF5B0"):
         """Show sync confirmation message"""
+        self.canvas.delete("sync_confirmation")
         confirmation = self.canvas.create_text(
-            820.0, 565.0, anchor="nw", text="Data synced successfully!", 
-            fill="#AEF5B0", font=("Arial", 10), tags="sync_confirmation"
+            820.0, 565.0, anchor="nw", text=text, 
+            fill=color, font=("Arial", 10), tags="sync_confirmation"
         )
         
         # Remove confirmation after 2 seconds
         self.after(2000, lambda: self.canvas.delete(confirmation))
     
+    def show_sync_progress(self, progress):
+        """Report SyncEngine progress under the Sync button"""
+        state = progress["state"]
+        if state in ("started", "progress"):
+            self.canvas.delete("sync_confirmation")
+            self.canvas.create_text(
+                820.0, 565.0, anchor="nw", text=f"Syncing {progress['sent']}/{progress['total']}...",
+                fill="#FFFFFF", font=("Arial", 10), tags="sync_confirmation"
+            )
+        elif state == "retrying":
+            self.canvas.delete("sync_confirmation")
+            self.canvas.create_text(
+                820.0, 565.0, anchor="nw", text=f"Sync retrying in {progress['delay']:.0f}s",
+                fill="#FFFF00", font=("Arial", 10), tags="sync_confirmation"
+            )
+        elif state == "done":
+            self.sync_button.config(state="normal")
+            self.alerts.insert(0, {"type": "Sync", "time": datetime.now(),
+                                   "message": f"Data Sync Completed ({progress['sent']} events)"})
+            self.alerts = self.alerts[:20]
+            self.update_alerts_display()
+            self.show_sync_confirmation()
+        elif state == "failed":
+            self.sync_button.config(state="normal")
+            print(f"Sync failed: {progress['error']}")
+            self.show_sync_confirmation("Sync failed - will resume", "#FF6B6B")
+    
     def view_all_alerts(self):
         """Navigate to Alerts page"""
         print("Navigating to Alerts page")
@@ -0,0 +1,174 @@
+# actuators.py - Vibration motor and buzzer driver with timed patterns
+import threading
+import time
+from collections import namedtuple
+
+# One pattern step: outputs to hold and for how long (None = until stopped)
+PatternStep = namedtuple('PatternStep', 'vibrate buzz duration')
+
+# A named sequence of steps, optionally looped
+Pattern = namedtuple('Pattern', 'name steps repeat')
+
+
+def pulse_train(name, on, off, buzz=False):
+    """Looping vibration pulses: `on` seconds vibrating, `off` seconds still"""
+    return Pattern(name, (PatternStep(True, buzz, on), PatternStep(False, False, off)), True)
+
+
+# Warning: steady motor pulses
+VIBRATION_PULSE = pulse_train("vibration_pulse", 0.3, 0.3)
+
+# Critical: motor on throughout, buzzer cadence speeding up to continuous
+CRITICAL_ESCALATION = Pattern("critical_escalation", (
+    PatternStep(True, True, 0.15), PatternStep(True, False, 0.6),
+    PatternStep(True, True, 0.15), PatternStep(True, False, 0.6),
+    PatternStep(True, True, 0.15), PatternStep(True, False, 0.3),
+    PatternStep(True, True, 0.15), PatternStep(True, False, 0.3),
+    PatternStep(True, True, 0.15), PatternStep(True, False, 0.15),
+    PatternStep(True, True, 0.15), PatternStep(True, False, 0.15),
+    PatternStep(True, True, None),
+), False)
+
+# Both outputs on until stopped
+FULL_ALERT = Pattern("full_alert", (PatternStep(True, True, None),), False)
+
+
+class ActuatorDriver:
+    """Owns the motor and buzzer pins.
+
+    Pin levels are cached and GPIO.output() is only called when a level
+    actually changes, so repeated "off" requests from the sampling loop
+    cost nothing. Patterns play on the driver's own scheduler thread with
+    deadlines on the monotonic clock, so their timing does not depend on
+    how fast (or slowly) the sampling loop runs. The motor is active low.
+    With gpio=None the driver only tracks levels, for simulation.
+    """
+
+    def __init__(self, gpio=None, motor_pin=8, buzzer_pin=9):
+        self.gpio = gpio
+        self.motor_pin = motor_pin
+        self.buzzer_pin = buzzer_pin
+        high = gpio.HIGH if gpio is not None else 1
+        low = gpio.LOW if gpio is not None else 0
+        self.high, self.low = high, low
+        self.levels = {}
+
+        # Pattern scheduler state, guarded by self.condition
+        self.condition = threading.Condition()
+        self.pattern = None
+        self.generation = 0
+        self.closed = False
+        self.thread = None
+
+        # Statistics
+        self.writes = 0
+        self.suppressed_writes = 0
+        self.patterns_played = 0
+
+    def setup(self):
+        """Configure both pins as outputs in the idle state"""
+        if self.gpio is not None:
+            self.gpio.setup(self.motor_pin, self.gpio.OUT)
+            self.gpio.setup(self.buzzer_pin, self.gpio.OUT)
+        self.levels.clear()
+        self.set_outputs(False, False)
+
+    @property
+    def vibrating(self):
+        return self.levels.get(self.motor_pin) == self.low
+
+    @property
+    def buzzing(self):
+        return self.levels.get(self.buzzer_pin) == self.high
+
+    def _write(self, pin, level):
+        if self.levels.get(pin) == level:
+            self.suppressed_writes += 1
+            return
+        self.levels[pin] = level
+        self.writes += 1
+        if self.gpio is not None:
+            self.gpio.output(pin, level)
+
+    def set_outputs(self, vibrate, buzz):
+        """Drive both outputs, writing only pins whose level changes"""
+        with self.condition:
+            self._write(self.motor_pin, self.low if vibrate else self.high)
+            self._write(self.buzzer_pin, self.high if buzz else self.low)
+
+    def play(self, pattern):
+        """Start a pattern, replacing any pattern already playing"""
+        with self.condition:
+            if self.pattern is pattern:
+                return
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._scheduler, name="actuator-scheduler", daemon=True)
+                self.thread.start()
+            self.pattern = pattern
+            self.generation += 1
+            self.patterns_played += 1
+            self.condition.notify()
+
+    def stop_pattern(self):
+        """Stop any pattern and switch both outputs off"""
+        with self.condition:
+            if self.pattern is not None:
+                self.pattern = None
+                self.generation += 1
+                self.condition.notify()
+            self.set_outputs(False, False)
+
+    def _scheduler(self):
+        """Play patterns until closed - runs on the driver's own thread"""
+        with self.condition:
+            while not self.closed:
+                if self.pattern is None:
+                    self.condition.wait()
+                    continue
+
+                pattern, generation = self.pattern, self.generation
+                deadline = time.monotonic()
+                interrupted = False
+                while not interrupted:
+                    for step in pattern.steps:
+                        self.set_outputs(step.vibrate, step.buzz)
+                        if step.duration is None:
+                            # Hold until someone changes the pattern
+                            while generation == self.generation and not self.closed:
+                                self.condition.wait()
+                            interrupted = True
+                            break
+                        deadline += step.duration
+                        while generation == self.generation and not self.closed:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                break
+                            self.condition.wait(remaining)
+                        if generation != self.generation or self.closed:
+                            interrupted = True
+                            break
+                    if not pattern.repeat:
+                        break
+
+                if not interrupted:
+                    self.pattern = None
+                    self.set_outputs(False, False)
+
+    def get_stats(self):
+        return {
+            "writes": self.writes,
+            "suppressed_writes": self.suppressed_writes,
+            "patterns_played": self.patterns_played,
+            "pattern": self.pattern.name if self.pattern else None,
+        }
+
+    def close(self):
+        """Stop the scheduler and leave both outputs off"""
+        with self.condition:
+            self.closed = True
+            self.pattern = None
+            self.generation += 1
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+        self.set_outputs(False, False)
@@ -0,0 +1,284 @@
+# alert_index.py - Inverted index with token and prefix search over the stored alert history
+import bisect
+import heapq
+import re
+import threading
+from array import array
+from collections import namedtuple
+
+from records import ALERT_BATTERY, CONDITIONS, ACTIONS, RESPONSES
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# One page of search hits, newest first - ids are alert store row ids, and
+# `first`/`last` the cursors for the neighbouring pages
+SearchPage = namedtuple('SearchPage', 'ids total first last has_newer has_older')
+EMPTY_SEARCH = SearchPage((), 0, None, None, False, False)
+
+NO_TEMPLATE = 0xFFFF
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def template_text(kind, condition, action, response):
+    """Text every alert with these codes shares - the title, user and detail lines of AlertRecord.to_dict()
+    without the alert number and battery reading, which are indexed per alert"""
+    if kind == ALERT_BATTERY:
+        title, user = "Low Battery Warning", "System"
+    else:
+        title, user = "Drowsiness Alert", "Current User"
+    return " ".join((title, user, CONDITIONS[condition].split("{")[0], ACTIONS[action], RESPONSES[response]))
+
+
+def alert_text(alert):
+    """Text of one alert that is not in its template"""
+    text = f"{alert.alert_id:03d}"
+    if "{" in CONDITIONS[alert.condition]:
+        text += f" {alert.battery:.1f}"
+    return text
+
+
+class SearchResult:
+    """The hits for one query as disjoint ascending runs of ids - paged without materialising them"""
+
+    def __init__(self, runs):
+        self.runs = runs
+
+    @property
+    def total(self):
+        return sum(len(run) for run in self.runs)
+
+    def page(self, before=None, after=None, limit=20):
+        """One SearchPage, newest first - `before`/`after` are a page's last/first id"""
+        runs = self.runs
+        if after is not None:
+            starts = [bisect.bisect_right(run, after) for run in runs]
+            ids = list(heapq.merge(*(run[start:start + limit] for run, start in zip(runs, starts))))[:limit]
+            ids.reverse()
+            newer = sum(len(run) - start for run, start in zip(runs, starts))
+            older = sum(starts)
+            has_newer, has_older = newer > limit, older > 0
+        else:
+            ends = [len(run) if before is None else bisect.bisect_left(run, before) for run in runs]
+            tails = (reversed(run[max(0, end - limit):end]) for run, end in zip(runs, ends))
+            ids = list(heapq.merge(*tails, reverse=True))[:limit]
+            has_newer = before is not None and sum(len(run) - end for run, end in zip(runs, ends)) > 0
+            has_older = sum(ends) > limit
+        if not ids:
+            return EMPTY_SEARCH
+        return SearchPage(tuple(ids), self.total, ids[0], ids[-1], has_newer, has_older)
+
+
+class AlertIndex:
+    """Token and prefix search over every alert in an AlertStore.
+
+    Alerts with the same kind, condition, action and response share all
+    their text except the alert number and battery reading, so the index
+    has two levels: terms map to the few templates containing them, each
+    template keeps an ascending id array of its alerts, and the per-alert
+    terms (numbers) keep their own id arrays. A query of plain words
+    resolves to a set of templates and pages straight off their arrays;
+    queries with numbers filter the smallest candidate list. Every query
+    term matches as a prefix, found by bisecting sorted vocabularies.
+
+    catch_up() indexes rows added to the store since the last call, so
+    the index follows inserts from the sensing thread or process; search()
+    calls it first.
+    """
+
+    def __init__(self, store, batch=20000):
+        self.store = store
+        self.batch = batch
+        self.lock = threading.RLock()
+        self.last_id = 0
+        self.ready = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+        self.templates = {}          # (kind, condition, action, response) -> template number
+        self.template_ids = []       # template number -> array of alert ids
+        self.template_of = array('H')  # alert id -> template number
+        self.terms = []              # sorted template vocabulary
+        self.term_templates = {}     # term -> set of template numbers
+        self.alert_terms = []        # sorted per-alert vocabulary
+        self.alert_postings = {}     # term -> array of alert ids
+
+    def start(self):
+        """Index the existing history in the background - search() works meanwhile, on what is indexed"""
+        self.thread = threading.Thread(target=self._build, name="alert-index", daemon=True)
+        self.thread.start()
+
+    def _build(self):
+        try:
+            while self.catch_up(self.batch) == self.batch and not self.stopping.is_set():
+                pass
+        except Exception as e:
+            print(f"Alert index build failed: {e}")
+        self.ready.set()
+
+    def catch_up(self, limit=None):
+        """Index alerts stored since the last call. Returns how many were added."""
+        with self.lock:
+            rows = self.store.rows_after(self.last_id, limit or self.batch)
+            for row_id, alert in rows:
+                self.add(row_id, alert)
+            return len(rows)
+
+    def add(self, row_id, alert):
+        """Index one stored alert - ids must arrive in ascending order"""
+        key = (alert.kind, alert.condition, alert.action, alert.response)
+        template = self.templates.get(key)
+        if template is None:
+            template = self.templates[key] = len(self.template_ids)
+            self.template_ids.append(array('q'))
+            for term in set(tokenize(template_text(*key))):
+                if term not in self.term_templates:
+                    bisect.insort(self.terms, term)
+                    self.term_templates[term] = set()
+                self.term_templates[term].add(template)
+        self.template_ids[template].append(row_id)
+
+        template_of = self.template_of
+        if len(template_of) <= row_id:
+            template_of.extend([NO_TEMPLATE] * (row_id + 1 - len(template_of)))
+        template_of[row_id] = template
+
+        for term in set(tokenize(alert_text(alert))):
+            postings = self.alert_postings.get(term)
+            if postings is None:
+                bisect.insort(self.alert_terms, term)
+                postings = self.alert_postings[term] = array('q')
+            postings.append(row_id)
+        self.last_id = row_id
+
+    @staticmethod
+    def _prefixed(vocabulary, prefix):
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + "￿", start)
+        return vocabulary[start:end]
+
+    def _match(self, token):
+        """(templates containing a term starting with token, id arrays of per-alert terms starting with it)"""
+        templates = set()
+        for term in self._prefixed(self.terms, token):
+            templates |= self.term_templates[term]
+        postings = [self.alert_postings[term] for term in self._prefixed(self.alert_terms, token)]
+        return templates, postings
+
+    def search(self, query):
+        """SearchResult for alerts matching every word of query (each as a prefix), or None for an empty query"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return None
+        if self.ready.is_set():
+            self.catch_up()
+        with self.lock:
+            matches = [self._match(token) for token in tokens]
+            if not any(postings for _, postings in matches):
+                # Words only - the answer is a set of templates
+                templates = set.intersection(*(templates for templates, _ in matches))
+                return SearchResult([self.template_ids[t] for t in sorted(templates)])
+
+            # Start from the token with the fewest candidates, filter by the rest
+            def candidates(match):
+                templates, postings = match
+                return (sum(len(self.template_ids[t]) for t in templates)
+                        + sum(len(ids) for ids in postings))
+            matches.sort(key=candidates)
+            templates, postings = matches[0]
+            ids = set()
+            for t in templates:
+                ids.update(self.template_ids[t])
+            for run in postings:
+                ids.update(run)
+            template_of = self.template_of
+            for templates, postings in matches[1:]:
+                extra = set()
+                for run in postings:
+                    extra.update(run)
+                ids = {i for i in ids if template_of[i] in templates or i in extra}
+            return SearchResult([array('q', sorted(ids))])
+
+    def stop(self):
+        """End a background build early - call before closing the store"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "alerts": sum(len(ids) for ids in self.template_ids),
+                "templates": len(self.template_ids),
+                "terms": len(self.terms) + len(self.alert_terms),
+                "postings": sum(len(ids) for ids in self.alert_postings.values()),
+                "ready": self.ready.is_set(),
+            }
+
+
+# Index a million stored alerts, then time typical queries and live updates
+if __name__ == "__main__":
+    import os
+    import random
+    import shutil
+    import tempfile
+    import time
+    from alert_store import AlertStore
+    from records import AlertRecord, ALERT_DROWSINESS, DROWSINESS_CONDITIONS, COND_BATTERY_LOW
+
+    directory = tempfile.mkdtemp(prefix="neurolens-index-")
+    store = AlertStore(os.path.join(directory, "alerts.db"))
+    rng = random.Random(8)
+    total = 1000000
+    start = time.time() - total * 30.0
+
+    def generate(first, count):
+        for i in range(first, first + count):
+            if rng.random() < 0.05:
+                yield AlertRecord.create(i % 1000, ALERT_BATTERY, COND_BATTERY_LOW, 6, 7, 1, rng.uniform(5, 20),
+                                         timestamp=start + i * 30)
+            else:
+                yield AlertRecord.create(i % 1000, ALERT_DROWSINESS, rng.choice(DROWSINESS_CONDITIONS),
+                                         rng.randint(1, 5), rng.randint(1, 6), rng.randint(1, 5),
+                                         rng.uniform(20, 100), rng.randint(0, 36000), timestamp=start + i * 30)
+
+    for first in range(0, total, 50000):
+        store.add_many(generate(first, 50000))
+
+    index = AlertIndex(store)
+    started = time.perf_counter()
+    index.start()
+    index.ready.wait()
+    print(f"Indexed {total:,} alerts in {time.perf_counter() - started:.1f}s: {index.get_stats()}")
+
+    def timed(query, repeat=20):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = index.search(query)
+            page = result.page(limit=2)
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        older = result.page(before=page.last, limit=2)
+        print(f"{query!r:28} {page.total:>8,} hits in {elapsed:6.2f} ms, newest {page.ids}, next {older.ids}")
+
+    for query in ("eyes", "head", "battery crit", "no resp", "micro sleep vibration", "user took",
+                  "alert 042", "042", "1", "low 15", "xyz"):
+        timed(query)
+
+    # Live alerts show up in the next search
+    row_id = store.add(AlertRecord.create(999, ALERT_DROWSINESS, 3, 1, 1, 1, 50.0))
+    started = time.perf_counter()
+    page = index.search("micro sleep").page(limit=2)
+    print(f"After a live insert: newest hit {page.ids[0]} (inserted {row_id}), "
+          f"catch-up + search {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    # Check one query against a brute-force scan
+    expected = [row_id for row_id, alert in store.rows_after(0, total + 10)
+                if all(any(word.startswith(token) for word in tokenize(template_text(
+                    alert.kind, alert.condition, alert.action, alert.response) + " " + alert_text(alert)))
+                       for token in ("head", "1"))]
+    result = index.search("head 1")
+    print(f"'head 1' matches brute force: {list(result.runs[0]) == expected} ({len(expected):,} hits)")
+    store.close()
+    shutil.rmtree(directory)
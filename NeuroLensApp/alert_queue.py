@@ -0,0 +1,160 @@
+# alert_queue.py - Bounded, coalescing alert queue with drop policies
+import threading
+import time
+from collections import OrderedDict
+
+from records import AlertRecord
+
+# Alert priorities, most urgent first
+PRIORITY_CRITICAL = 0
+PRIORITY_HIGH = 1
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_CRITICAL: "critical",
+    PRIORITY_HIGH: "high",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_LOW: "low",
+}
+
+# What to do with a new alert when the queue is full
+DROP_OLDEST = "drop_oldest"    # Evict the oldest queued alert of any priority
+DROP_NEWEST = "drop_newest"    # Reject the incoming alert
+EVICT_LOWER = "evict_lower"    # Evict the oldest lower-priority alert, else reject
+
+DEFAULT_POLICIES = {
+    PRIORITY_CRITICAL: EVICT_LOWER,
+    PRIORITY_HIGH: EVICT_LOWER,
+    PRIORITY_NORMAL: DROP_OLDEST,
+    PRIORITY_LOW: DROP_NEWEST,
+}
+
+
+class AlertQueue:
+    """Bounded queue of pending alerts for the UI.
+
+    Alerts are AlertRecords or legacy dicts. Alerts pushed with the same
+    key (by default their condition) within `coalesce_window` seconds of
+    the last occurrence are merged into one entry whose count goes up,
+    instead of queueing a duplicate. When the queue is at capacity the
+    incoming alert's priority picks a drop policy. Queued alerts are never
+    mutated after being queued - a coalesced repeat replaces its entry with
+    an updated copy - so published snapshots holding them stay immutable.
+    """
+
+    def __init__(self, capacity=50, policies=None, coalesce_window=60.0):
+        self.capacity = capacity
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        self.coalesce_window = coalesce_window
+        self.entries = OrderedDict()  # key -> (priority, alert), oldest first
+        self.version = 0
+        self._lock = threading.Lock()
+
+        # Overflow statistics
+        self.pushed = 0
+        self.coalesced = 0
+        self.dropped = {priority: 0 for priority in PRIORITY_NAMES}
+        self.overflows = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.items())
+
+    def push(self, alert, priority=PRIORITY_NORMAL, key=None):
+        """Queue an alert. Returns False if it was dropped by the overflow policy."""
+        record = isinstance(alert, AlertRecord)
+        if key is None:
+            key = alert.coalesce_key if record else alert.get("condition", alert.get("title"))
+        now = time.time()
+
+        with self._lock:
+            self.pushed += 1
+            existing = self.entries.get(key)
+            if existing is not None and now - _last_seen(existing[1], now) <= self.coalesce_window:
+                old_priority, old_alert = existing
+                if record:
+                    merged = alert.coalesce(old_alert, now)
+                else:
+                    merged = dict(alert, count=old_alert.get("count", 1) + 1,
+                                  first_seen=old_alert.get("first_seen", now), last_seen=now)
+                self.entries[key] = (min(priority, old_priority), merged)
+                self.entries.move_to_end(key)
+                self.coalesced += 1
+                self.version += 1
+                return True
+
+            if existing is None and len(self.entries) >= self.capacity:
+                self.overflows += 1
+                if not self._make_room(priority):
+                    self.dropped[priority] += 1
+                    return False
+
+            self.entries.pop(key, None)
+            if not record:
+                alert = dict(alert, count=1, first_seen=now, last_seen=now)
+            self.entries[key] = (priority, alert)
+            self.high_water = max(self.high_water, len(self.entries))
+            self.version += 1
+            return True
+
+    def _make_room(self, priority):
+        """Evict one entry per the incoming priority's policy. Caller holds the lock."""
+        policy = self.policies.get(priority, DROP_OLDEST)
+        if policy == DROP_NEWEST:
+            return False
+
+        if policy == EVICT_LOWER:
+            victim = None
+            for key, (queued_priority, _) in self.entries.items():
+                if queued_priority > priority and (victim is None or queued_priority > victim[1]):
+                    victim = (key, queued_priority)
+            if victim is None:
+                return False
+            del self.entries[victim[0]]
+            self.dropped[victim[1]] += 1
+            return True
+
+        _, (queued_priority, _) = self.entries.popitem(last=False)
+        self.dropped[queued_priority] += 1
+        return True
+
+    def items(self):
+        """Queued alerts, oldest first"""
+        with self._lock:
+            return [alert for _, alert in self.entries.values()]
+
+    def drain(self):
+        """Remove and return all queued alerts, oldest first"""
+        with self._lock:
+            alerts = [alert for _, alert in self.entries.values()]
+            if alerts:
+                self.entries.clear()
+                self.version += 1
+            return alerts
+
+    def clear(self):
+        """Drop all queued alerts. Returns how many were cleared."""
+        return len(self.drain())
+
+    def get_stats(self):
+        return {
+            "queued": len(self.entries),
+            "capacity": self.capacity,
+            "pushed": self.pushed,
+            "coalesced": self.coalesced,
+            "overflows": self.overflows,
+            "high_water": self.high_water,
+            "dropped": {PRIORITY_NAMES[p]: count for p, count in self.dropped.items()},
+        }
+
+
+def _last_seen(alert, default):
+    if isinstance(alert, AlertRecord):
+        return alert.last_seen
+    return alert.get("last_seen", default)
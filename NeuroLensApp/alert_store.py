@@ -0,0 +1,311 @@
+# alert_store.py - Persistent alert history in SQLite (WAL) with keyset pagination
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from records import AlertRecord
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id              INTEGER PRIMARY KEY,
+    timestamp       REAL    NOT NULL,
+    alert_id        INTEGER NOT NULL,
+    kind            INTEGER NOT NULL,
+    condition       INTEGER NOT NULL,
+    action          INTEGER NOT NULL,
+    response        INTEGER NOT NULL,
+    status          INTEGER NOT NULL,
+    battery         REAL    NOT NULL,
+    session_seconds INTEGER NOT NULL,
+    count           INTEGER NOT NULL,
+    last_seen       REAL    NOT NULL,
+    user            TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_timestamp ON alerts (timestamp);
+CREATE INDEX IF NOT EXISTS alerts_kind ON alerts (kind, timestamp);
+CREATE INDEX IF NOT EXISTS alerts_user ON alerts (user, timestamp);
+CREATE INDEX IF NOT EXISTS alerts_condition ON alerts (condition, timestamp);
+"""
+
+# AlertRecord fields in column order, then the row id
+_COLUMNS = ", ".join(AlertRecord._fields)
+_INSERT = (f"INSERT INTO alerts ({_COLUMNS}, user) "
+           f"VALUES ({', '.join('?' * (len(AlertRecord._fields) + 1))})")
+
+# One page of alerts, newest first. `first` and `last` are the keyset
+# cursors (timestamp, id) of its first and last rows.
+AlertPage = namedtuple('AlertPage', 'alerts ids first last has_newer has_older')
+EMPTY_PAGE = AlertPage((), (), None, None, False, False)
+
+
+class AlertStore:
+    """Alert history in an SQLite database, shared by the sensing side and the UI.
+
+    The database runs in WAL mode, so the sensing side's inserts never
+    block page queries from the UI and the other way round - including
+    across processes. Each thread gets its own connection. Pages are
+    fetched by keyset (timestamp, id) rather than OFFSET, so page 10,000
+    costs the same as page 1, and the (column, timestamp) indexes keep
+    filtered pages just as cheap.
+
+    submit() queues an alert for a background writer instead of committing
+    on the caller's thread, for the sampling loop: alerts submitted while
+    a commit is under way go in together in the next one (group commit).
+    flush() waits for them; close() writes whatever is still queued.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        with self.connection() as db:
+            db.executescript(SCHEMA)
+
+        # Write-behind queue for submit()
+        self.write_lock = threading.Lock()
+        self.wakeup = threading.Condition(self.write_lock)
+        self.committed = threading.Condition(self.write_lock)
+        self.pending = []
+        self.submitted = 0
+        self.written = 0
+        self.commits = 0
+        self.writer = None
+        self.running = True
+
+    def connection(self):
+        """This thread's connection, opened on first use"""
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; commits skip fsync
+            self.local.db = db
+            with self.lock:
+                self.connections.append(db)
+        return db
+
+    def add(self, alert):
+        """Insert one AlertRecord and return its row id"""
+        db = self.connection()
+        with db:
+            return db.execute(_INSERT, (*alert, alert.user)).lastrowid
+
+    def add_many(self, alerts):
+        """Insert AlertRecords in one transaction"""
+        db = self.connection()
+        with db:
+            db.executemany(_INSERT, ((*alert, alert.user) for alert in alerts))
+
+    def submit(self, alert):
+        """Queue an AlertRecord for the background writer - returns at once"""
+        with self.write_lock:
+            self.pending.append(alert)
+            self.submitted += 1
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._writer, name="alert-store", daemon=True)
+                self.writer.start()
+            self.wakeup.notify()
+
+    def flush(self, timeout=5.0):
+        """Block until every alert submitted so far is stored. Returns True if it is."""
+        with self.write_lock:
+            target = self.submitted
+            return self.committed.wait_for(lambda: self.written >= target, timeout)
+
+    def _writer(self):
+        while True:
+            with self.write_lock:
+                while not self.pending and self.running:
+                    self.wakeup.wait()
+                batch, self.pending = self.pending, []
+                running = self.running
+            if batch:
+                try:
+                    self.add_many(batch)
+                except sqlite3.Error as e:
+                    # Keep the batch for the next commit - flush() keeps waiting meanwhile
+                    print(f"Alert store write failed: {e}")
+                    with self.write_lock:
+                        self.pending = batch + self.pending
+                    if running:
+                        time.sleep(0.05)
+                        continue
+                    break
+                with self.write_lock:
+                    self.written += len(batch)
+                    self.commits += 1
+                    self.committed.notify_all()
+            elif not running:
+                break
+
+    def page(self, before=None, after=None, limit=20, kind=None, user=None, condition=None):
+        """One AlertPage, newest first.
+
+        With `before` (a page's `last` cursor) returns the next older page,
+        with `after` (a page's `first` cursor) the next newer one, and with
+        neither the newest page. kind, user and condition filter exactly.
+        """
+        where, params = [], []
+        for column, value in (('kind', kind), ('user', user), ('condition', condition)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        newer = after is not None
+        if newer:
+            where.append("(timestamp, id) > (?, ?)")
+            params.extend(after)
+        elif before is not None:
+            where.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+        order = "ASC" if newer else "DESC"
+        sql = (f"SELECT {_COLUMNS}, id FROM alerts"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''}"
+               f" ORDER BY timestamp {order}, id {order} LIMIT ?")
+        rows = self.connection().execute(sql, (*params, limit + 1)).fetchall()
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if newer:
+            rows.reverse()
+        if not rows:
+            return EMPTY_PAGE
+        return AlertPage(
+            alerts=tuple(AlertRecord._make(row[:-1]) for row in rows),
+            ids=tuple(row[-1] for row in rows),
+            first=(rows[0][0], rows[0][-1]),
+            last=(rows[-1][0], rows[-1][-1]),
+            has_newer=more if newer else before is not None,
+            has_older=True if newer else more,
+        )
+
+    def iter_alerts(self, batch=1000, **filters):
+        """Every matching alert, newest first, fetched a page at a time"""
+        page = self.page(limit=batch, **filters)
+        while page.alerts:
+            yield from page.alerts
+            if not page.has_older:
+                break
+            page = self.page(before=page.last, limit=batch, **filters)
+
+    def rows_after(self, after_id=0, limit=10000):
+        """[(id, AlertRecord)] with id > after_id in insert order - for incremental indexing"""
+        rows = self.connection().execute(
+            f"SELECT id, {_COLUMNS} FROM alerts WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)).fetchall()
+        return [(row[0], AlertRecord._make(row[1:])) for row in rows]
+
+    def get(self, ids):
+        """AlertRecords for row ids, in the order given (missing ids are skipped)"""
+        if not ids:
+            return []
+        rows = self.connection().execute(
+            f"SELECT id, {_COLUMNS} FROM alerts WHERE id IN ({', '.join('?' * len(ids))})", tuple(ids)).fetchall()
+        by_id = {row[0]: AlertRecord._make(row[1:]) for row in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def count(self, **filters):
+        where = [f"{column} = ?" for column, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        sql = f"SELECT COUNT(*) FROM alerts{' WHERE ' + ' AND '.join(where) if where else ''}"
+        return self.connection().execute(sql, params).fetchone()[0]
+
+    def close(self):
+        """Write any queued alerts, then close every thread's connection"""
+        with self.write_lock:
+            self.running = False
+            self.wakeup.notify()
+            writer = self.writer
+        if writer is not None:
+            writer.join(timeout=10)
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for db in connections:
+            try:
+                db.close()
+            except sqlite3.ProgrammingError:
+                pass  # Belongs to a thread that already exited
+        self.local = threading.local()
+
+
+# Fill a store with a million alerts and time inserts and page queries
+if __name__ == "__main__":
+    import os
+    import random
+    import shutil
+    import tempfile
+    import time
+    from records import ALERT_DROWSINESS, ALERT_BATTERY, DROWSINESS_CONDITIONS, COND_BATTERY_LOW
+
+    directory = tempfile.mkdtemp(prefix="neurolens-alerts-")
+    store = AlertStore(os.path.join(directory, "alerts.db"))
+    rng = random.Random(5)
+    total = 1000000
+    start = time.time() - total * 30.0
+
+    def generate(first, count):
+        for i in range(first, first + count):
+            if rng.random() < 0.05:
+                yield AlertRecord.create(i, ALERT_BATTERY, COND_BATTERY_LOW, 6, 7, 1, 15.0, timestamp=start + i * 30)
+            else:
+                yield AlertRecord.create(i, ALERT_DROWSINESS, rng.choice(DROWSINESS_CONDITIONS), rng.randint(1, 5),
+                                         rng.randint(1, 6), rng.randint(1, 5), rng.uniform(20, 100),
+                                         rng.randint(0, 36000), timestamp=start + i * 30)
+
+    started = time.perf_counter()
+    for first in range(0, total, 50000):
+        store.add_many(generate(first, 50000))
+    elapsed = time.perf_counter() - started
+    print(f"Bulk inserted {total:,} alerts in {elapsed:.1f}s ({total / elapsed:,.0f}/s), "
+          f"{os.path.getsize(store.path) / 1e6:.0f} MB")
+
+    started = time.perf_counter()
+    for i in range(200):
+        store.add(next(generate(total + i, 1)))
+    print(f"Single inserts: {(time.perf_counter() - started) / 200 * 1e6:.0f} us each")
+
+    # The sensor thread only queues; the writer batches
+    started = time.perf_counter()
+    for i in range(2000):
+        store.submit(next(generate(total + 200 + i, 1)))
+    queued = time.perf_counter() - started
+    store.flush()
+    print(f"Submitted inserts (sensor thread): {queued / 2000 * 1e6:.0f} us each, "
+          f"stored in {store.commits} commits after {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def timed(label, fn, repeat=50):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        print(f"{label}: {(time.perf_counter() - started) / repeat * 1000:.2f} ms")
+        return result
+
+    first_page = timed("Newest page", lambda: store.page(limit=20))
+    page = first_page
+    for _ in range(5000):
+        page = store.page(before=page.last, limit=20)
+    timed("Page 5,001 (keyset)", lambda: store.page(before=page.last, limit=20))
+    timed("Same depth with OFFSET", lambda: store.connection().execute(
+        f"SELECT {_COLUMNS} FROM alerts ORDER BY timestamp DESC, id DESC LIMIT 20 OFFSET 100000").fetchall(), 5)
+    timed("Newest battery alerts", lambda: store.page(limit=20, kind=ALERT_BATTERY))
+    timed("Newest by condition", lambda: store.page(limit=20, condition=3))
+    back = store.page(after=page.first, limit=20)
+    print(f"Prev from page 5,001 lands on rows {back.ids[0]}..{back.ids[-1]} "
+          f"(has newer {back.has_newer}, has older {back.has_older})")
+
+    # Reads keep flowing while another thread inserts
+    stop = threading.Event()
+
+    def writer():
+        i = total + 1000
+        while not stop.is_set():
+            store.add(next(generate(i, 1)))
+            i += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    timed("Newest page during inserts", lambda: store.page(limit=20), 200)
+    stop.set()
+    thread.join()
+    store.close()
+    shutil.rmtree(directory)
@@ -0,0 +1,117 @@
+# async_stream.py - Bounded hand-off from sensor threads to asyncio consumers
+import asyncio
+import threading
+from collections import deque, namedtuple
+
+# One raw sample as seen by stream() consumers
+Sample = namedtuple('Sample', 'timestamp eyes_closed state')
+
+
+class AsyncSubscription:
+    """Async iterator fed from another thread through a bounded buffer.
+
+    The producer never blocks: offer() appends to a deque of `maxlen`
+    items and, when the buffer is full, the oldest item is discarded and
+    counted in `dropped`. The consumer's event loop is only woken (via
+    call_soon_threadsafe) when it is actually waiting, so a busy consumer
+    costs the producer an append and an uncontended lock per item. Use it
+    as `async for item in subscription`; close() ends the iteration.
+    """
+
+    def __init__(self, maxlen=1024, on_close=None, loop=None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.buffer = deque(maxlen=maxlen)
+        self.maxlen = maxlen
+        self.on_close = on_close
+        self.lock = threading.Lock()
+        self.waiter = None
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def offer(self, item):
+        """Queue an item from any thread - drops the oldest when full"""
+        if self.closed:
+            return
+        if len(self.buffer) == self.maxlen:
+            self.dropped += 1
+        self.buffer.append(item)
+        self._wake()
+
+    def _wake(self):
+        with self.lock:
+            waiter, self.waiter = self.waiter, None
+        if waiter is not None:
+            try:
+                self.loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:
+                pass  # Consumer's loop already closed
+
+    def close(self):
+        """End the iteration once buffered items are consumed"""
+        if self.closed:
+            return
+        self.closed = True
+        self._wake()
+        if self.on_close is not None:
+            self.on_close(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            with self.lock:
+                if self.buffer:
+                    self.delivered += 1
+                    return self.buffer.popleft()
+                if self.closed:
+                    raise StopAsyncIteration
+                waiter = self.waiter = self.loop.create_future()
+            await waiter
+
+    def get_stats(self):
+        return {
+            "buffered": len(self.buffer),
+            "maxlen": self.maxlen,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+# A fast and a slow consumer on the same monitor
+if __name__ == "__main__":
+    from sensor_monitor import SensorMonitor
+    from sensor_backends import SyntheticBackend
+
+    async def consume(subscription, delay, counts, name):
+        async for _ in subscription:
+            counts[name] += 1
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def main():
+        monitor = SensorMonitor(backend=SyntheticBackend(rate_hz=1000, seed=5))
+        fast = monitor.stream()
+        slow = monitor.stream(maxlen=256)
+        alerts = monitor.alerts()
+        counts = {"fast": 0, "slow": 0, "alerts": 0}
+        tasks = [
+            asyncio.create_task(consume(fast, 0, counts, "fast")),
+            asyncio.create_task(consume(slow, 0.01, counts, "slow")),
+            asyncio.create_task(consume(alerts, 0, counts, "alerts")),
+        ]
+        monitor.start()
+        await asyncio.sleep(5)
+        monitor.stop()
+        await asyncio.gather(*tasks)
+        print(f"fast consumer: {fast.get_stats()}")
+        print(f"slow consumer: {slow.get_stats()}")
+        print(f"alerts: {alerts.get_stats()}, blinks {monitor.blink_count}")
+
+    asyncio.run(main())
@@ -0,0 +1,255 @@
+# checkpoint.py - Periodic session checkpoints, restored on startup with a replay of the event log tail
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from event_log import (EventLogReader, EVENT_ALERT, EVENT_STATUS, EVENT_BLINKS, EVENT_BATTERY,
+                       EVENT_SESSION, STATUS_PAYLOAD, BLINKS_PAYLOAD, BATTERY_PAYLOAD, SESSION_PAYLOAD)
+from records import AlertRecord, ALERT_DROWSINESS
+
+# Session state as of event `seq` - what the dashboard shows
+SessionState = namedtuple('SessionState',
+                          'seq saved_at session_start blink_count alert_count battery_level current_status')
+
+# magic, version, log position (segment, offset), then SessionState, then a crc32 of everything before it
+CHECKPOINT = struct.Struct('<4sBQQQddIIfB')
+CHECKPOINT_MAGIC = b"NLCP"
+CHECKPOINT_VERSION = 1
+CHECKSUM = struct.Struct('<I')
+
+STATE_EVENTS = (EVENT_ALERT, EVENT_STATUS, EVENT_BLINKS, EVENT_BATTERY, EVENT_SESSION)
+
+# Don't resume a session whose last sign of life is older than this (seconds)
+MAX_RESUME_GAP = 4 * 3600
+
+
+def encode_checkpoint(state, position=(0, 0)):
+    body = CHECKPOINT.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, *position, *state)
+    return body + CHECKSUM.pack(zlib.crc32(body))
+
+
+def decode_checkpoint(data):
+    """(SessionState, log position) from a checkpoint file's bytes, or None if it is not a valid checkpoint"""
+    if len(data) != CHECKPOINT.size + CHECKSUM.size:
+        return None
+    body = data[:CHECKPOINT.size]
+    if CHECKSUM.unpack_from(data, CHECKPOINT.size)[0] != zlib.crc32(body):
+        return None
+    magic, version, segment, offset, *fields = CHECKPOINT.unpack(body)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        return None
+    return SessionState(*fields), (segment, offset)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    checkpoint = decode_checkpoint(data)
+    if checkpoint is None:
+        print(f"Ignoring damaged checkpoint {os.path.basename(path)}")
+    return checkpoint
+
+
+def save_checkpoint(path, state, position=(0, 0)):
+    """Write a checkpoint atomically - a crash leaves the old one or the new one"""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(encode_checkpoint(state, position))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def replay(state, events):
+    """Apply logged events to a SessionState. Returns (state, events applied, last event time)."""
+    session_start, blinks, alerts = state.session_start, state.blink_count, state.alert_count
+    battery, status, seq = state.battery_level, state.current_status, state.seq
+    applied = 0
+    last_time = state.saved_at
+    for event in events:
+        kind, payload = event.kind, event.payload
+        if kind == EVENT_SESSION:
+            session_start, = SESSION_PAYLOAD.unpack(payload)
+            blinks = alerts = 0
+        elif kind == EVENT_BLINKS:
+            blinks, = BLINKS_PAYLOAD.unpack(payload)
+        elif kind == EVENT_STATUS:
+            status, = STATUS_PAYLOAD.unpack(payload)
+        elif kind == EVENT_BATTERY:
+            battery, = BATTERY_PAYLOAD.unpack(payload)
+        elif kind == EVENT_ALERT:
+            alert = AlertRecord.unpack(payload)
+            if alert.kind == ALERT_DROWSINESS:
+                alerts = max(alerts, alert.alert_id)  # Drowsiness alerts are numbered by alert_count
+        seq = event.seq
+        last_time = max(last_time, event.timestamp)
+        applied += 1
+    return SessionState(seq, state.saved_at, session_start, blinks, alerts, battery, status), applied, last_time
+
+
+class Checkpointer:
+    """Saves SessionStates from a background thread, at most every `interval` seconds.
+
+    The monitor hands over its state with submit(), which only notes it
+    and the log's current position. The thread first waits for the event
+    log to make everything up to the state's seq durable, then writes the
+    checkpoint, so a checkpoint never runs ahead of the log it will be
+    replayed against. restore() loads the last checkpoint and reads the log
+    from the saved position, so only the events logged after it are read.
+    """
+
+    def __init__(self, path, event_log=None, interval=10.0):
+        self.path = path
+        self.event_log = event_log
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.submitted = threading.Condition(self.lock)
+        self.pending = None
+        self.saved_key = None
+        self.next_due = 0.0
+        self.running = True
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Statistics
+        self.writes = 0
+        self.write_time = 0.0
+
+        self.thread = threading.Thread(target=self._writer, name="checkpoint", daemon=True)
+        self.thread.start()
+
+    def restore(self, max_gap=MAX_RESUME_GAP, now=None):
+        """(SessionState to resume, or None, events replayed, seconds taken)"""
+        started = time.perf_counter()
+        checkpoint = load_checkpoint(self.path)
+        if checkpoint is None:
+            return None, 0, time.perf_counter() - started
+        state, position = checkpoint
+        applied = 0
+        last_time = state.saved_at
+        if self.event_log is not None:
+            events = EventLogReader(self.event_log.directory).events(state.seq, STATE_EVENTS, position)
+            state, applied, last_time = replay(state, events)
+        now = time.time() if now is None else now
+        if now - last_time > max_gap:
+            state = None  # Too long ago to be the same shift
+        return state, applied, time.perf_counter() - started
+
+    def due(self, now):
+        """True at most once per interval (monotonic clock)"""
+        if now < self.next_due:
+            return False
+        self.next_due = now + self.interval
+        return True
+
+    def submit(self, state):
+        """Queue a state for the writer - newer submissions replace older ones"""
+        # Everything durable now precedes the events after state.seq
+        position = self.event_log.position() if self.event_log is not None else (0, 0)
+        with self.lock:
+            self.pending = (state, position)
+            self.submitted.notify()
+
+    def _writer(self):
+        while True:
+            with self.lock:
+                while self.pending is None and self.running:
+                    self.submitted.wait()
+                checkpoint, self.pending = self.pending, None
+                running = self.running
+            if checkpoint is not None:
+                self._save(*checkpoint)
+            if not running:
+                break
+
+    def _save(self, state, position):
+        key = state._replace(saved_at=0.0)
+        if key == self.saved_key:
+            return  # Nothing changed since the last checkpoint
+        if self.event_log is not None and not self.event_log.flush():
+            print("Checkpoint skipped - event log is not durable yet")
+            return
+        started = time.perf_counter()
+        try:
+            save_checkpoint(self.path, state, position)
+        except OSError as e:
+            print(f"Checkpoint write failed: {e}")
+            return
+        self.write_time += time.perf_counter() - started
+        self.writes += 1
+        self.saved_key = key
+
+    def get_stats(self):
+        return {"writes": self.writes, "write_ms": self.write_time * 1000,
+                "bytes": CHECKPOINT.size + CHECKSUM.size}
+
+    def close(self, state=None):
+        """Write `state` (if given) or whatever is pending, then stop the writer"""
+        if state is not None:
+            self.submit(state)
+        with self.lock:
+            self.running = False
+            self.submitted.notify()
+        self.thread.join(timeout=5)
+
+
+# Log a long shift, checkpoint near its end, then time restore against a full replay
+if __name__ == "__main__":
+    import random
+    import shutil
+    import tempfile
+    from event_log import EventLog
+
+    directory = tempfile.mkdtemp(prefix="neurolens-checkpoint-")
+    log = EventLog(os.path.join(directory, "events"))
+    checkpointer = Checkpointer(os.path.join(directory, "checkpoint.bin"), log, interval=10.0)
+    rng = random.Random(6)
+
+    # A 12-hour shift: blinks every ~4 s, status changes every ~30 s, an alert every ~10 min
+    now = time.time()
+    start = now - 12 * 3600
+    log.append(EVENT_SESSION, SESSION_PAYLOAD.pack(start), timestamp=start)
+    t, blinks, alerts, battery, seq = start, 0, 0, 100.0, 0
+    while t < now:
+        t += rng.expovariate(1 / 4.0)
+        blinks += 1
+        seq = log.append(EVENT_BLINKS, BLINKS_PAYLOAD.pack(blinks), timestamp=t)
+        if rng.random() < 4 / 30:
+            seq = log.append(EVENT_STATUS, STATUS_PAYLOAD.pack(rng.randint(1, 5)), timestamp=t)
+        if rng.random() < 4 / 600:
+            alerts += 1
+            alert = AlertRecord.create(alerts, ALERT_DROWSINESS, 1, 2, 1, 2, battery, int(t - start), timestamp=t)
+            seq = log.append(EVENT_ALERT, alert.pack(), timestamp=t)
+        if battery - (t - start) / 900 < int(battery):
+            battery = 100.0 - (t - start) / 900
+            seq = log.append(EVENT_BATTERY, BATTERY_PAYLOAD.pack(battery), timestamp=t)
+        # The monitor checkpoints every 10 s; the last one lands ~5 s before the crash
+        if t < now - 5 and checkpointer.due(t):
+            checkpointer.submit(SessionState(seq, t, start, blinks, alerts, battery, 3))
+    checkpointer.close()
+    log.close()  # ...then the app "crashes"
+    total = log.get_stats()["records"]
+    print(f"Shift: {total:,} events, {blinks:,} blinks, {alerts} alerts, "
+          f"{checkpointer.writes} checkpoints written ({checkpointer.write_time / checkpointer.writes * 1000:.2f} ms each)")
+
+    log = EventLog(os.path.join(directory, "events"))
+    checkpointer = Checkpointer(os.path.join(directory, "checkpoint.bin"), log)
+    state, applied, elapsed = checkpointer.restore(now=now)
+    print(f"Resume from checkpoint: {applied} events replayed in {elapsed * 1000:.1f} ms -> "
+          f"blinks {state.blink_count}, alerts {state.alert_count}, battery {state.battery_level:.1f}%")
+
+    started = time.perf_counter()
+    empty = SessionState(0, 0.0, 0.0, 0, 0, 0.0, 0)
+    full, applied, _ = replay(empty, EventLogReader(log.directory).events(0, STATE_EVENTS))
+    print(f"Full replay for comparison: {applied:,} events in {(time.perf_counter() - started) * 1000:.1f} ms -> "
+          f"blinks {full.blink_count}, alerts {full.alert_count}, matches {full[2:6] == state[2:6]}")
+    checkpointer.close()
+    log.close()
+    shutil.rmtree(directory)
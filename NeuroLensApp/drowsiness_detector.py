@@ -0,0 +1,216 @@
+# drowsiness_detector.py - Streaming eye-closure detection state machine
+
+# Detection states, in escalating order
+OPEN = 0
+CAUTION = 1
+WARNING = 2
+CRITICAL = 3
+
+STATE_NAMES = {OPEN: "open", CAUTION: "caution", WARNING: "warning", CRITICAL: "critical"}
+
+# Dashboard status scale (1=drowsy, 5=alert) for each detection state
+STATUS_BY_STATE = {OPEN: 5, CAUTION: 3, WARNING: 2, CRITICAL: 1}
+
+# Eyes-closed seconds before entering CAUTION, WARNING and CRITICAL
+DEFAULT_THRESHOLDS = (1.0, 2.0, 3.0)
+
+
+class DrowsinessDetector:
+    """O(1)-per-event closure detector with debounce and recovery hysteresis.
+
+    Feed it (timestamp, eyes_closed) samples or edges with update(). All
+    timestamps must come from one monotonic clock. A raw change only counts
+    once it has held for `debounce` seconds, so sensor chatter is ignored,
+    but the closure is timed from the original edge. While the eyes are
+    closed the state escalates through the thresholds; once they are open
+    it steps back down one level per `recovery` seconds. `closure_level`
+    is the level the current closure alone has reached (OPEN while the
+    eyes are open), which is what actuators should follow.
+
+    Between samples call poll(now) - next_deadline() says when the state
+    can next change on its own, so callers can sleep until then.
+    """
+
+    __slots__ = (
+        'thresholds', 'debounce', 'recovery', 'state', 'eyes_closed',
+        'raw_closed', 'raw_since', 'closed_since', 'open_since',
+        'recover_from', 'closure_level', 'blink_count', 'closure_count', 'transition_count',
+        'last_update',
+    )
+
+    def __init__(self, thresholds=DEFAULT_THRESHOLDS, debounce=0.05, recovery=1.0):
+        self.thresholds = tuple(thresholds)
+        self.debounce = debounce
+        self.recovery = recovery
+        self.reset()
+
+    def reset(self, timestamp=0.0):
+        """Return to the eyes-open state with all counters cleared"""
+        self.state = OPEN
+        self.eyes_closed = False
+        self.raw_closed = False
+        self.raw_since = timestamp
+        self.closed_since = timestamp
+        self.open_since = timestamp
+        self.recover_from = OPEN
+        self.closure_level = OPEN
+        self.blink_count = 0
+        self.closure_count = 0
+        self.transition_count = 0
+        self.last_update = timestamp
+
+    @property
+    def status(self):
+        """Current state on the dashboard's 1-5 scale"""
+        return STATUS_BY_STATE[self.state]
+
+    def update(self, timestamp, eyes_closed):
+        """Process one sample. Returns the new state if it changed, else None."""
+        previous = self.state
+        if eyes_closed != self.raw_closed:
+            self._advance(timestamp)
+            self.raw_closed = eyes_closed
+            self.raw_since = timestamp
+        self._advance(timestamp)
+        return self.state if self.state != previous else None
+
+    def poll(self, now):
+        """Advance timers with no new sample. Returns the new state if it changed."""
+        previous = self.state
+        self._advance(now)
+        return self.state if self.state != previous else None
+
+    def _advance(self, now):
+        """Settle any debounced change and timed transition up to now"""
+        self.last_update = now
+
+        # Compare against the same sums next_deadline() returns so a poll at
+        # exactly the deadline always fires despite float rounding
+        if self.raw_closed != self.eyes_closed and now >= self.raw_since + self.debounce:
+            self.eyes_closed = self.raw_closed
+            if self.eyes_closed:
+                self.closed_since = self.raw_since
+                self.closure_count += 1
+            else:
+                if self.raw_since - self.closed_since < self.thresholds[0]:
+                    self.blink_count += 1
+                self.open_since = self.raw_since
+                self.recover_from = self.state
+                self.closure_level = OPEN
+
+        if self.eyes_closed:
+            level = OPEN
+            for threshold in self.thresholds:
+                if now >= self.closed_since + threshold:
+                    level += 1
+            self.closure_level = level
+            new_state = max(level, self.state)
+        elif self.state != OPEN:
+            steps = int((now - self.open_since) / self.recovery)
+            if now >= self.open_since + (steps + 1) * self.recovery:
+                steps += 1
+            new_state = max(OPEN, self.recover_from - steps)
+        else:
+            return
+
+        if new_state != self.state:
+            self.state = new_state
+            self.transition_count += 1
+
+    def next_deadline(self):
+        """Monotonic time of the next change that needs no new sample, or None"""
+        deadline = None
+        if self.eyes_closed:
+            if self.closure_level < len(self.thresholds):
+                deadline = self.closed_since + self.thresholds[self.closure_level]
+        elif self.state != OPEN:
+            steps = self.recover_from - self.state + 1
+            deadline = self.open_since + steps * self.recovery
+
+        # A pending raw change may settle before the timed transition
+        if self.raw_closed != self.eyes_closed:
+            pending = self.raw_since + self.debounce
+            if deadline is None or pending < deadline:
+                return pending
+        return deadline
+
+    def run_batch(self, timestamps, states, per_sample=False):
+        """Run the same machine over arrays of samples.
+
+        timestamps and states are NumPy arrays (or anything np.asarray
+        accepts). Only the samples where the raw state changes are fed to
+        update(), with timed transitions resolved between them, so the cost
+        scales with the number of edges rather than samples.
+
+        Returns (transition_times, transition_states) arrays. With
+        per_sample=True returns the detection state at every sample instead.
+        """
+        import numpy as np
+
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        states = np.asarray(states).astype(bool)
+        if len(timestamps) == 0:
+            empty = np.empty(0, dtype=np.int8)
+            return empty if per_sample else (np.empty(0), empty)
+
+        change_index = np.flatnonzero(states[1:] != states[:-1]) + 1
+        run_starts = np.concatenate(([0], change_index))
+        end_time = timestamps[-1]
+
+        times = [self.last_update]
+        results = [self.state]
+
+        def settle_until(limit):
+            deadline = self.next_deadline()
+            while deadline is not None and deadline <= limit:
+                if self.poll(deadline) is not None:
+                    times.append(deadline)
+                    results.append(self.state)
+                deadline = self.next_deadline()
+
+        for index in run_starts:
+            timestamp = timestamps[index]
+            settle_until(timestamp)
+            if self.update(float(timestamp), bool(states[index])) is not None:
+                times.append(float(timestamp))
+                results.append(self.state)
+        settle_until(end_time)
+        self.poll(float(end_time))
+
+        transition_times = np.array(times[1:], dtype=np.float64)
+        transition_states = np.array(results[1:], dtype=np.int8)
+        if not per_sample:
+            return transition_times, transition_states
+
+        # State at each sample is the last transition at or before it
+        all_states = np.array(results, dtype=np.int8)
+        positions = np.searchsorted(transition_times, timestamps, side='right')
+        return all_states[positions]
+
+
+# Batch throughput check when run directly
+if __name__ == "__main__":
+    import time
+    import numpy as np
+    from sensor_backends import SyntheticBackend
+
+    total = 1_000_000
+    backend = SyntheticBackend(rate_hz=1000, seed=7, realtime=False)
+    backend.open()
+    samples = [backend.read() for _ in range(total)]
+    timestamps = np.fromiter((t for t, _ in samples), dtype=np.float64, count=total)
+    states = np.fromiter((c for _, c in samples), dtype=bool, count=total)
+
+    started = time.perf_counter()
+    transition_times, transition_states = DrowsinessDetector().run_batch(timestamps, states)
+    elapsed = time.perf_counter() - started
+    print(f"Batch: {total:,} samples in {elapsed:.3f}s ({total / elapsed:,.0f} samples/s), "
+          f"{len(transition_times)} transitions")
+
+    detector = DrowsinessDetector()
+    started = time.perf_counter()
+    for timestamp, eyes_closed in samples:
+        detector.update(timestamp, eyes_closed)
+    elapsed = time.perf_counter() - started
+    print(f"Streaming: {total:,} samples in {elapsed:.3f}s ({total / elapsed:,.0f} samples/s), "
+          f"{detector.transition_count} transitions")
@@ -0,0 +1,124 @@
+# edge_acquisition.py - Interrupt-driven eye sensor acquisition
+import queue
+import random
+import threading
+import time
+
+
+class EdgeAcquisition:
+    """Timestamp every edge of the IR sensor pin and queue it as an event.
+
+    Events are (timestamp, eyes_closed) tuples where timestamp comes from
+    time.monotonic() taken inside the GPIO edge callback, so it reflects
+    when the edge happened rather than when the consumer got round to it.
+    """
+
+    def __init__(self, gpio, sensor_pin, bouncetime=5):
+        self.gpio = gpio
+        self.sensor_pin = sensor_pin
+        self.bouncetime = bouncetime
+        self.events = queue.SimpleQueue()
+        self.edge_count = 0
+        self.started = False
+
+    def start(self):
+        """Enable edge detection and queue the current level as the first event"""
+        self.gpio.add_event_detect(
+            self.sensor_pin, self.gpio.BOTH,
+            callback=self._on_edge, bouncetime=self.bouncetime
+        )
+        self.started = True
+        self._on_edge(self.sensor_pin)
+
+    def _on_edge(self, channel):
+        """GPIO callback - runs on the GPIO library's own thread"""
+        timestamp = time.monotonic()
+        eyes_closed = self.gpio.input(channel) == self.gpio.LOW
+        self.edge_count += 1
+        self.events.put((timestamp, eyes_closed))
+
+    def read(self, timeout=None):
+        """Return the next (timestamp, eyes_closed) event, or None on timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop(self):
+        """Disable edge detection"""
+        if self.started:
+            self.gpio.remove_event_detect(self.sensor_pin)
+            self.started = False
+
+
+def measure_latency(trials=50, poll_interval=0.1):
+    """Compare edge-to-detection latency of polling vs edge-triggered reads"""
+    from fake_gpio import FakeGPIO
+
+    def run_trials(consumer_setup):
+        gpio = FakeGPIO()
+        gpio.setup(2, gpio.IN, pull_up_down=gpio.PUD_UP)
+        detected = queue.SimpleQueue()
+        stop = consumer_setup(gpio, detected)
+        latencies = []
+        level = gpio.HIGH
+        for _ in range(trials):
+            time.sleep(random.uniform(0.05, 0.15))
+            level = gpio.LOW if level == gpio.HIGH else gpio.HIGH
+            edge_time = gpio.inject_edge(2, level)
+            seen_time = detected.get(timeout=2)
+            latencies.append(seen_time - edge_time)
+        stop()
+        latencies.sort()
+        return latencies
+
+    def polling_consumer(gpio, detected):
+        running = [True]
+
+        def loop():
+            last = gpio.input(2)
+            while running[0]:
+                level = gpio.input(2)
+                if level != last:
+                    detected.put(time.monotonic())
+                    last = level
+                time.sleep(poll_interval)
+
+        threading.Thread(target=loop, daemon=True).start()
+        return lambda: running.__setitem__(0, False)
+
+    def edge_consumer(gpio, detected):
+        acquisition = EdgeAcquisition(gpio, 2)
+        acquisition.start()
+        acquisition.read(timeout=0)  # drop the initial level event
+        running = [True]
+
+        def loop():
+            while running[0]:
+                if acquisition.read(timeout=0.5) is not None:
+                    detected.put(time.monotonic())
+
+        threading.Thread(target=loop, daemon=True).start()
+
+        def stop():
+            running[0] = False
+            acquisition.stop()
+        return stop
+
+    results = {}
+    for name, consumer in (("polling", polling_consumer), ("edge", edge_consumer)):
+        latencies = run_trials(consumer)
+        results[name] = {
+            "mean_ms": 1000 * sum(latencies) / len(latencies),
+            "p50_ms": 1000 * latencies[len(latencies) // 2],
+            "max_ms": 1000 * latencies[-1],
+        }
+    return results
+
+
+# Latency comparison when run directly
+if __name__ == "__main__":
+    print("Measuring eye-closure detection latency (fake GPIO)...")
+    for mode, stats in measure_latency().items():
+        print(f"{mode:8s} mean {stats['mean_ms']:7.2f} ms | "
+              f"p50 {stats['p50_ms']:7.2f} ms | max {stats['max_ms']:7.2f} ms")
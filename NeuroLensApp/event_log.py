@@ -0,0 +1,427 @@
+# event_log.py - Durable append-only session event log with group commit
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+# Event kinds
+EVENT_ALERT = 1     # Packed AlertRecord
+EVENT_SAMPLES = 2   # encode_samples() output
+EVENT_STATUS = 3    # STATUS_PAYLOAD
+EVENT_BLINKS = 4    # BLINKS_PAYLOAD
+EVENT_BATTERY = 5   # BATTERY_PAYLOAD
+EVENT_SESSION = 6   # SESSION_PAYLOAD - a new session started
+
+STATUS_PAYLOAD = struct.Struct('<B')     # 1-5 status
+BLINKS_PAYLOAD = struct.Struct('<I')     # blink count so far this session
+BATTERY_PAYLOAD = struct.Struct('<f')    # percent
+SESSION_PAYLOAD = struct.Struct('<d')    # session start, epoch seconds
+
+# Record: payload length u32, crc32 u32 (of everything after it), seq u64,
+# epoch timestamp f64, kind u8, then the payload
+RECORD_HEADER = struct.Struct('<IIQdB')
+CRC_OFFSET = 8  # CRC covers seq onwards
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".log"
+
+Event = namedtuple('Event', 'seq timestamp kind payload')
+
+
+def segment_name(first_seq):
+    return f"{SEGMENT_PREFIX}{first_seq:016d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory):
+    """[(first_seq, path)] for the log's segments, oldest first"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    segments = []
+    for name in names:
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+            try:
+                first_seq = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            segments.append((first_seq, os.path.join(directory, name)))
+    segments.sort()
+    return segments
+
+
+def segment_started(path):
+    """Timestamp of a segment's first record, or None if it has none"""
+    with open(path, 'rb') as f:
+        header = f.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        return None
+    return RECORD_HEADER.unpack(header)[3]
+
+
+def scan_records(data, after_seq=0):
+    """Yield Events from a segment's bytes, stopping at the first torn or corrupt record"""
+    view = memoryview(data)
+    offset = 0
+    end = len(data)
+    header_size = RECORD_HEADER.size
+    unpack = RECORD_HEADER.unpack_from
+    crc32 = zlib.crc32
+    while end - offset >= header_size:
+        length, crc, seq, timestamp, kind = unpack(view, offset)
+        record_end = offset + header_size + length
+        if record_end > end or crc32(view[offset + CRC_OFFSET:record_end]) != crc:
+            break
+        # Never expected in one file, but a repeated sequence number must not be delivered twice
+        if seq > after_seq:
+            yield Event(seq, timestamp, kind, bytes(view[offset + header_size:record_end]))
+            after_seq = seq
+        offset = record_end
+
+
+def valid_prefix(data):
+    """(length of the intact records at the start of data, last seq in them or None)"""
+    view = memoryview(data)
+    offset = 0
+    last_seq = None
+    while len(data) - offset >= RECORD_HEADER.size:
+        length, crc, seq, _, _ = RECORD_HEADER.unpack_from(view, offset)
+        record_end = offset + RECORD_HEADER.size + length
+        if record_end > len(data) or zlib.crc32(view[offset + CRC_OFFSET:record_end]) != crc:
+            break
+        offset = record_end
+        last_seq = seq
+    return offset, last_seq
+
+
+def encode_record(buffer, seq, timestamp, kind, payload):
+    """Append one framed record to a bytearray"""
+    start = len(buffer)
+    buffer += RECORD_HEADER.pack(len(payload), 0, seq, timestamp, kind)
+    buffer += payload
+    crc = zlib.crc32(memoryview(buffer)[start + CRC_OFFSET:])
+    struct.pack_into('<I', buffer, start + 4, crc)
+
+
+class EventLog:
+    """Append-only event log in rotating segment files, written by a background thread.
+
+    append() only numbers the event and queues it, so it is cheap enough
+    for the sampling thread. The writer thread commits queued events as one
+    write and one fsync whenever `commit_records` are waiting or
+    `commit_interval` seconds have passed (group commit), so many events
+    share each fsync. flush() waits until everything appended so far is on
+    disk. Segments rotate at `segment_bytes` or once they are
+    `segment_seconds` old, so retention can drop old days whole; on open a
+    torn record left at the tail by a crash is truncated away.
+    """
+
+    def __init__(self, directory, segment_bytes=4 * 1024 * 1024, commit_interval=0.05,
+                 commit_records=512, segment_seconds=86400):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.commit_interval = commit_interval
+        self.commit_records = commit_records
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.committed = threading.Condition(self.lock)
+        self.pending = []
+        self.next_seq = self.recover()
+        self.durable_seq = self.next_seq - 1
+        self.running = True
+        self.segment = None
+        self.segment_size = 0
+        self.segment_opened = 0.0
+        self.segment_first = None
+        self.written_seq = self.next_seq - 1  # Last seq whose bytes are on disk
+        self.open_segment()
+        self.durable_position = (self.segment_first, self.segment_size)
+
+        # Statistics
+        self.records = 0
+        self.commits = 0
+        self.bytes_written = 0
+        self.fsync_time = 0.0
+        self.max_batch = 0
+
+        self.thread = threading.Thread(target=self._writer, name="event-log", daemon=True)
+        self.thread.start()
+
+    def recover(self):
+        """Truncate any torn tail and return the next sequence number"""
+        segments = list_segments(self.directory)
+        if not segments:
+            return 1
+        first_seq, path = segments[-1]
+        with open(path, 'rb') as f:
+            data = f.read()
+        good, last_seq = valid_prefix(data)
+        if last_seq is None:
+            last_seq = first_seq - 1
+        if good < len(data):
+            print(f"Event log: dropping {len(data) - good} bytes of torn tail from {os.path.basename(path)}")
+            os.truncate(path, good)
+        return last_seq + 1
+
+    def open_segment(self):
+        segments = list_segments(self.directory)
+        if segments and os.path.getsize(segments[-1][1]) < self.segment_bytes:
+            self.segment_first, path = segments[-1]
+        else:
+            self.segment_first = self.next_seq
+            path = os.path.join(self.directory, segment_name(self.next_seq))
+        self.segment = open(path, 'ab')
+        self.segment_size = self.segment.tell()
+        self.segment_opened = (segment_started(path) if self.segment_size else None) or time.time()
+
+    def append(self, kind, payload, timestamp=None):
+        """Queue one event for the next group commit. Returns its sequence number."""
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            self.pending.append((seq, timestamp, kind, payload))
+            if len(self.pending) >= self.commit_records:
+                self.wakeup.notify()
+        return seq
+
+    def flush(self, timeout=5.0):
+        """Block until every event appended so far is durable. Returns True if it is."""
+        with self.lock:
+            target = self.next_seq - 1
+            self.wakeup.notify()
+            return self.committed.wait_for(lambda: self.durable_seq >= target or not self.thread.is_alive(),
+                                           timeout) and self.durable_seq >= target
+
+    def position(self):
+        """(segment first seq, byte offset) just past the last durable record - see EventLogReader.events"""
+        with self.lock:
+            return self.durable_position
+
+    def _writer(self):
+        while True:
+            with self.lock:
+                if self.running and len(self.pending) < self.commit_records:
+                    self.wakeup.wait(self.commit_interval)
+                batch, self.pending = self.pending, []
+                running = self.running
+            if batch:
+                try:
+                    self.commit(batch)
+                except OSError as e:
+                    # e.g. a full card. Cut the segment back to its last good byte, then keep the
+                    # records not yet written for the next commit - flush() keeps waiting meanwhile
+                    print(f"Event log write failed: {e}")
+                    self.repair()
+                    written = self.written_seq
+                    with self.lock:
+                        self.pending = [event for event in batch if event[0] > written] + self.pending
+                    time.sleep(self.commit_interval)
+                    if running:
+                        continue
+                    break
+                with self.lock:
+                    self.durable_seq = batch[-1][0]
+                    self.durable_position = (self.segment_first, self.segment_size)
+                    self.committed.notify_all()
+            elif not running:
+                break
+
+    def commit(self, batch):
+        """Write a batch with one write() and one fsync per segment it touches, rotating as needed"""
+        if self.segment.closed:  # A repair could not reopen it last time
+            self.repair()
+            if self.segment.closed:
+                raise OSError("segment could not be reopened")
+        buffer = bytearray()
+        if self.segment_size and time.time() - self.segment_opened >= self.segment_seconds:
+            self.rotate(batch[0][0])
+        last_seq = None
+        for seq, timestamp, kind, payload in batch:
+            if self.segment_size + len(buffer) >= self.segment_bytes and buffer:
+                self._write(buffer, last_seq)
+                buffer = bytearray()
+            if self.segment_size >= self.segment_bytes:
+                self.rotate(seq)
+            encode_record(buffer, seq, timestamp, kind, payload)
+            last_seq = seq
+        self._write(buffer, last_seq)
+        self.records += len(batch)
+        self.commits += 1
+        self.max_batch = max(self.max_batch, len(batch))
+
+    def _write(self, buffer, last_seq):
+        self.segment.write(buffer)
+        self.segment.flush()
+        started = time.perf_counter()
+        if hasattr(os, 'fdatasync'):
+            os.fdatasync(self.segment.fileno())
+        else:
+            os.fsync(self.segment.fileno())
+        self.fsync_time += time.perf_counter() - started
+        self.segment_size += len(buffer)
+        self.bytes_written += len(buffer)
+        self.written_seq = last_seq
+
+    def repair(self):
+        """After a failed write: drop whatever part of it reached the segment (or still sits in
+        the file object's buffer) by truncating to the last good size and reopening"""
+        path = os.path.join(self.directory, segment_name(self.segment_first))
+        try:
+            self.segment.close()  # Its flush may fail again - the bytes it leaves are cut below
+        except OSError:
+            pass
+        try:
+            os.truncate(path, self.segment_size)
+            self.segment = open(path, 'ab')
+        except OSError as e:
+            print(f"Event log repair failed: {e}")  # Retried before the next write
+
+    def rotate(self, first_seq):
+        self.segment.close()
+        self.segment = open(os.path.join(self.directory, segment_name(first_seq)), 'ab')
+        self.segment_first = first_seq
+        self.segment_size = 0
+        self.segment_opened = time.time()
+
+    def get_stats(self):
+        return {
+            "records": self.records,
+            "commits": self.commits,
+            "records_per_commit": self.records / self.commits if self.commits else 0.0,
+            "max_batch": self.max_batch,
+            "bytes": self.bytes_written,
+            "fsync_ms": self.fsync_time * 1000,
+            "durable_seq": self.durable_seq,
+        }
+
+    def close(self):
+        """Commit everything queued and close the current segment"""
+        if not self.running:
+            return
+        with self.lock:
+            self.running = False
+            self.wakeup.notify()
+        self.thread.join()
+        self.segment.close()
+
+
+class EventLogReader:
+    """Sequential reader over a log's segments - also usable while it is being written.
+
+    Segments are read whole and parsed in place; only committed records
+    are visible, and a record still being written ends the scan. It also
+    answers read_since()/pending_since() so SyncEngine can use the log as
+    its outbox.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def events(self, after_seq=0, kinds=None, position=None):
+        """Yield Events with seq > after_seq, oldest first, optionally only some kinds.
+
+        `position` from EventLog.position(), taken when after_seq was
+        current, lets the scan start there instead of at the segment start.
+        """
+        segments = list_segments(self.directory)
+        start_segment, start_offset = position or (None, 0)
+        if start_segment not in {first_seq for first_seq, _ in segments}:
+            start_segment = None  # Merged away by compaction - scan from the segment start
+        for index, (first_seq, path) in enumerate(segments):
+            # Skip segments that end before after_seq
+            if index + 1 < len(segments) and segments[index + 1][0] <= after_seq + 1:
+                continue
+            if start_segment is not None and first_seq < start_segment:
+                continue
+            offset = start_offset if first_seq == start_segment else 0
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read()
+            except FileNotFoundError:
+                continue  # Removed by retention while we were reading
+            for event in scan_records(data, after_seq):
+                # Compaction can briefly leave a merged segment's events in two files
+                after_seq = event.seq
+                if kinds is None or event.kind in kinds:
+                    yield event
+
+    def __iter__(self):
+        return self.events()
+
+    def last_event(self):
+        last = None
+        segments = list_segments(self.directory)
+        if segments:
+            for last in self.events(segments[-1][0] - 1):
+                pass
+        return last
+
+    # Sync outbox interface
+
+    def read_since(self, cursor, limit):
+        batch = []
+        for event in self.events(cursor):
+            batch.append((event.seq, event.kind, event.payload))
+            if len(batch) >= limit:
+                break
+        return batch
+
+    def pending_since(self, cursor):
+        return sum(1 for _ in self.events(cursor))
+
+    def discard_through(self, seq):
+        """Synced events stay in the log - retention removes them"""
+
+
+# Measure append cost, group commit batching and sequential read speed
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp(prefix="neurolens-events-")
+    log = EventLog(directory, segment_bytes=1024 * 1024)
+    total = 200000
+    payload = BLINKS_PAYLOAD.pack(0)
+
+    started = time.perf_counter()
+    slowest = 0.0
+    for i in range(total):
+        before = time.perf_counter()
+        log.append(EVENT_BLINKS, payload)
+        slowest = max(slowest, time.perf_counter() - before)
+        if i % 1000 == 0:
+            time.sleep(0.001)  # Arrive in bursts, like a sampling loop
+    append_time = time.perf_counter() - started
+    log.flush()
+    log.close()
+    stats = log.get_stats()
+    print(f"{total:,} appends: {append_time / total * 1e6:.2f} us each on the caller "
+          f"(slowest {slowest * 1e6:.0f} us)")
+    print(f"{stats['commits']:,} fsyncs, {stats['records_per_commit']:.0f} records each "
+          f"(max {stats['max_batch']}), {stats['bytes']:,} bytes, {stats['fsync_ms']:.0f} ms in fsync, "
+          f"{len(list_segments(directory))} segments")
+
+    # Simulate a crash mid-write: a half record at the tail
+    last_path = list_segments(directory)[-1][1]
+    with open(last_path, 'ab') as f:
+        f.write(RECORD_HEADER.pack(100, 0, total + 1, time.time(), EVENT_BLINKS)[:15])
+    log = EventLog(directory)
+    seq = log.append(EVENT_STATUS, STATUS_PAYLOAD.pack(3))
+    log.close()
+    print(f"Reopened after torn write: next event got seq {seq}")
+
+    reader = EventLogReader(directory)
+    started = time.perf_counter()
+    count = sum(1 for _ in reader)
+    elapsed = time.perf_counter() - started
+    print(f"Read back {count:,} events in {elapsed * 1000:.0f} ms ({count / elapsed:,.0f} events/s), "
+          f"tail from seq {total - 10}: {len(list(reader.events(total - 10)))} events")
+    shutil.rmtree(directory)
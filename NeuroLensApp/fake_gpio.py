@@ -0,0 +1,104 @@
+# fake_gpio.py - Stand-in for RPi.GPIO on machines without a Pi
+import threading
+import time
+
+# Constants mirror RPi.GPIO so callers can use either module interchangeably
+BCM = 11
+BOARD = 10
+IN = 1
+OUT = 0
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+
+class FakeGPIO:
+    """In-memory GPIO backend that can inject sensor edges for testing"""
+
+    BCM = BCM
+    BOARD = BOARD
+    IN = IN
+    OUT = OUT
+    LOW = LOW
+    HIGH = HIGH
+    PUD_OFF = PUD_OFF
+    PUD_DOWN = PUD_DOWN
+    PUD_UP = PUD_UP
+    RISING = RISING
+    FALLING = FALLING
+    BOTH = BOTH
+
+    def __init__(self):
+        self.mode = None
+        self.levels = {}
+        self.directions = {}
+        self.callbacks = {}
+        self.output_writes = 0
+        self._lock = threading.Lock()
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=PUD_OFF, initial=None):
+        with self._lock:
+            self.directions[pin] = direction
+            if direction == IN:
+                self.levels[pin] = HIGH if pull_up_down == PUD_UP else LOW
+            else:
+                self.levels[pin] = LOW if initial is None else initial
+
+    def input(self, pin):
+        return self.levels.get(pin, LOW)
+
+    def output(self, pin, level):
+        with self._lock:
+            self.levels[pin] = level
+            self.output_writes += 1
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        with self._lock:
+            if pin in self.callbacks:
+                raise RuntimeError(f"Edge detection already enabled for pin {pin}")
+            self.callbacks[pin] = (edge, callback)
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            self.callbacks.pop(pin, None)
+
+    def cleanup(self, pin=None):
+        with self._lock:
+            if pin is None:
+                self.levels.clear()
+                self.directions.clear()
+                self.callbacks.clear()
+            else:
+                self.levels.pop(pin, None)
+                self.directions.pop(pin, None)
+                self.callbacks.pop(pin, None)
+
+    def inject_edge(self, pin, level):
+        """Drive an input pin to level and fire any matching edge callback.
+
+        Returns the monotonic time the edge happened so callers can measure
+        how long the consumer took to react to it.
+        """
+        with self._lock:
+            previous = self.levels.get(pin, LOW)
+            self.levels[pin] = level
+            edge, callback = self.callbacks.get(pin, (None, None))
+        edge_time = time.monotonic()
+
+        if callback is None or previous == level:
+            return edge_time
+
+        if edge == BOTH or (edge == RISING and level == HIGH) or (edge == FALLING and level == LOW):
+            callback(pin)
+        return edge_time
@@ -0,0 +1,323 @@
+# fleet_monitor.py - Supervise many glasses on one asyncio event loop
+import asyncio
+import json
+import random
+import time
+from collections import namedtuple
+
+from alert_queue import AlertQueue, PRIORITY_CRITICAL
+from drowsiness_detector import DrowsinessDetector, DEFAULT_THRESHOLDS, OPEN, CRITICAL, STATUS_BY_STATE
+from records import AlertRecord, ALERT_DROWSINESS, COND_EYES_CLOSED, RESPONSE_PENDING
+
+DeviceSnapshot = namedtuple('DeviceSnapshot', (
+    'device_id', 'status', 'state', 'eyes_closed', 'blink_count', 'closure_count',
+    'alert_count', 'battery_level', 'events', 'last_seen', 'connected',
+))
+
+FleetSnapshot = namedtuple('FleetSnapshot', (
+    'devices', 'connected', 'status_counts', 'critical_devices', 'blink_count',
+    'alert_count', 'events', 'published_at',
+))
+
+
+class FleetDevice:
+    """Per-device detection state - kept small, there may be thousands"""
+
+    __slots__ = (
+        'device_id', 'detector', 'closure_level', 'alert_count', 'events',
+        'last_seen', 'battery_level', 'connected', 'timer', 'task',
+    )
+
+    def __init__(self, device_id, detector):
+        self.device_id = device_id
+        self.detector = detector
+        self.closure_level = OPEN
+        self.alert_count = 0
+        self.events = 0
+        self.last_seen = 0.0
+        self.battery_level = 100.0
+        self.connected = False
+        self.timer = None
+        self.task = None
+
+    def snapshot(self):
+        detector = self.detector
+        return DeviceSnapshot(
+            device_id=self.device_id,
+            status=STATUS_BY_STATE[detector.state],
+            state=detector.state,
+            eyes_closed=detector.eyes_closed,
+            blink_count=detector.blink_count,
+            closure_count=detector.closure_count,
+            alert_count=self.alert_count,
+            battery_level=self.battery_level,
+            events=self.events,
+            last_seen=self.last_seen,
+            connected=self.connected,
+        )
+
+
+class FleetMonitor:
+    """Multiplex many devices' eye-state streams on a single event loop.
+
+    Each device has an async source yielding (timestamp, eyes_closed)
+    events and one lightweight task consuming it. Between events, the
+    detector's next deadline is armed with loop.call_at() instead of a
+    per-device polling loop, so idle devices cost nothing. A device
+    reaching CRITICAL queues one alert on the shared AlertQueue, keyed by
+    device so repeats coalesce. With realtime=False sources run on their
+    own virtual timelines and deadlines are settled at the next event.
+    """
+
+    def __init__(self, thresholds=DEFAULT_THRESHOLDS, debounce=0.05, recovery=1.0,
+                 alert_capacity=500, realtime=True):
+        self.thresholds = thresholds
+        self.debounce = debounce
+        self.recovery = recovery
+        self.realtime = realtime
+        self.devices = {}
+        self.sources = {}
+        self.alerts = AlertQueue(alert_capacity)
+        self.loop = None
+        self.running = False
+        self.events = 0
+        self.started = None
+
+    def add_device(self, device_id, source=None):
+        """Register a device and its async (timestamp, eyes_closed) source.
+
+        Devices without a source are fed by calling handle_event() directly,
+        e.g. from the telemetry server.
+        """
+        detector = DrowsinessDetector(self.thresholds, self.debounce, self.recovery)
+        detector.reset(time.monotonic())
+        device = FleetDevice(device_id, detector)
+        self.devices[device_id] = device
+        self.sources[device_id] = source
+        if self.running and source is not None:
+            device.task = self.loop.create_task(self._consume(device, source))
+        return device
+
+    def remove_device(self, device_id):
+        device = self.devices.pop(device_id, None)
+        self.sources.pop(device_id, None)
+        if device is not None:
+            self._cancel_timer(device)
+            if device.task is not None:
+                device.task.cancel()
+
+    async def run(self):
+        """Consume every device's source until all end or stop() is called"""
+        self.loop = asyncio.get_running_loop()
+        self.running = True
+        self.started = time.monotonic()
+        for device_id, device in self.devices.items():
+            if self.sources[device_id] is not None:
+                device.task = self.loop.create_task(self._consume(device, self.sources[device_id]))
+        try:
+            # Devices added while running bring their own tasks - keep waiting for them
+            while self.running:
+                pending = [device.task for device in self.devices.values()
+                           if device.task is not None and not device.task.done()]
+                if not pending:
+                    break
+                await asyncio.wait(pending)
+        finally:
+            self.running = False
+            for device in self.devices.values():
+                self._cancel_timer(device)
+
+    def bind(self, loop):
+        """Arm deadlines on `loop` for devices fed through handle_event() without run()"""
+        self.loop = loop
+        self.running = True
+        self.started = time.monotonic()
+
+    def stop(self):
+        """Cancel every device task - safe to call from the loop thread"""
+        self.running = False
+        for device in self.devices.values():
+            if device.task is not None:
+                device.task.cancel()
+
+    async def _consume(self, device, source):
+        device.connected = True
+        try:
+            async for timestamp, eyes_closed in source:
+                self.handle_event(device, timestamp, eyes_closed)
+        except asyncio.CancelledError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Fleet device {device.device_id} source failed: {e}")
+        finally:
+            self.disconnect(device)
+
+    def disconnect(self, device):
+        """Mark a device's feed as gone and stop its pending deadline"""
+        device.connected = False
+        self._cancel_timer(device)
+
+    def handle_event(self, device, timestamp, eyes_closed):
+        """Feed one event to a device's detector and react to the result"""
+        self.events += 1
+        device.events += 1
+        device.last_seen = timestamp
+        device.detector.update(timestamp, eyes_closed)
+        self._apply(device)
+        if self.realtime:
+            self._arm_deadline(device)
+
+    def _apply(self, device):
+        level = device.detector.closure_level
+        if level != device.closure_level:
+            device.closure_level = level
+            if level == CRITICAL:
+                self.create_alert(device)
+
+    def _arm_deadline(self, device):
+        self._cancel_timer(device)
+        deadline = device.detector.next_deadline()
+        if deadline is not None:
+            device.timer = self.loop.call_at(deadline, self._on_deadline, device)
+
+    def _on_deadline(self, device):
+        device.timer = None
+        device.detector.poll(self.loop.time())
+        self._apply(device)
+        self._arm_deadline(device)
+
+    def _cancel_timer(self, device):
+        if device.timer is not None:
+            device.timer.cancel()
+            device.timer = None
+
+    def create_alert(self, device):
+        """Queue a closure alert for device - an AlertRecord, keyed by device so its repeats coalesce"""
+        device.alert_count += 1
+        status = STATUS_BY_STATE[CRITICAL]
+        alert = AlertRecord.create(device.alert_count, ALERT_DROWSINESS, COND_EYES_CLOSED,
+                                   action=status, response=RESPONSE_PENDING, status=status,
+                                   battery=device.battery_level)
+        self.alerts.push(alert, PRIORITY_CRITICAL, key=(device.device_id, "closure"))
+
+    def get_device_snapshot(self, device_id):
+        device = self.devices.get(device_id)
+        return device.snapshot() if device is not None else None
+
+    def get_snapshot(self):
+        """Aggregate view across all devices"""
+        status_counts = {status: 0 for status in STATUS_BY_STATE.values()}
+        critical = []
+        connected = blinks = alerts = 0
+        for device in self.devices.values():
+            detector = device.detector
+            status_counts[STATUS_BY_STATE[detector.state]] += 1
+            if detector.state == CRITICAL:
+                critical.append(device.device_id)
+            connected += device.connected
+            blinks += detector.blink_count
+            alerts += device.alert_count
+        return FleetSnapshot(
+            devices=len(self.devices),
+            connected=connected,
+            status_counts=status_counts,
+            critical_devices=tuple(critical),
+            blink_count=blinks,
+            alert_count=alerts,
+            events=self.events,
+            published_at=time.time(),
+        )
+
+    def take_alerts(self):
+        """Drain queued AlertRecords - records.as_dict() gives their display form"""
+        return self.alerts.drain()
+
+
+async def simulated_source(seed, realtime=True, max_events=None, blink_rate=0.3,
+                           closure_rate=0.05, batch=64):
+    """Seeded eye open/close edges, same model as SyntheticBackend but edge-only.
+
+    realtime=False runs on a virtual timeline, yielding to the loop every
+    `batch` events so many devices interleave.
+    """
+    rng = random.Random(seed)
+    timestamp = time.monotonic()
+    eyes_closed = False
+    events = 0
+    while max_events is None or events < max_events:
+        # Hold the current state for a while, then flip it
+        if not eyes_closed:
+            timestamp += rng.expovariate(blink_rate + closure_rate)
+        elif rng.random() < closure_rate / (blink_rate + closure_rate):
+            timestamp += rng.uniform(1.0, 4.0)
+        else:
+            timestamp += rng.uniform(0.1, 0.4)
+        eyes_closed = not eyes_closed
+
+        if realtime:
+            await asyncio.sleep(max(0.0, timestamp - time.monotonic()))
+        elif events % batch == 0:
+            await asyncio.sleep(0)
+        events += 1
+        yield (timestamp, eyes_closed)
+
+
+async def daemon_source(host="127.0.0.1", port=8765):
+    """Edges from an anti_sleep_glasses Pi.py service (see DaemonBackend)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    sensor_low = None
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            state = json.loads(line)
+            if state.get("sensor_low") is None or state["sensor_low"] == sensor_low:
+                continue
+            sensor_low = state["sensor_low"]
+            age = max(0.0, time.time() - state.get("time", time.time()))
+            yield (time.monotonic() - age, not sensor_low)
+    finally:
+        writer.close()
+
+
+# Benchmark 1,000 simulated devices on one event loop
+if __name__ == "__main__":
+    import tracemalloc
+
+    device_count = 1000
+    events_per_device = 500
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    fleet = FleetMonitor(realtime=False)
+    for i in range(device_count):
+        fleet.add_device(f"G{i:04d}", simulated_source(i, realtime=False, max_events=events_per_device))
+    per_device = (tracemalloc.get_traced_memory()[0] - baseline) / device_count
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    asyncio.run(fleet.run())
+    elapsed = time.perf_counter() - started
+    snapshot = fleet.get_snapshot()
+    print(f"Throughput: {snapshot.events:,} events from {device_count} devices in {elapsed:.2f}s "
+          f"({snapshot.events / elapsed:,.0f} events/s), {per_device:,.0f} bytes/device "
+          f"(detector state + idle source), {snapshot.alert_count} closure alerts")
+
+    # Real time: every device on its own clock, deadlines armed with call_at
+    duration = 5.0
+    fleet = FleetMonitor()
+    for i in range(device_count):
+        fleet.add_device(f"G{i:04d}", simulated_source(i))
+
+    async def realtime_run():
+        asyncio.get_running_loop().call_later(duration, fleet.stop)
+        cpu_started = time.process_time()
+        await fleet.run()
+        return time.process_time() - cpu_started
+
+    cpu = asyncio.run(realtime_run())
+    snapshot = fleet.get_snapshot()
+    print(f"Real time: {snapshot.events:,} events from {device_count} devices in {duration:.0f}s "
+          f"({snapshot.events / duration:,.0f} events/s) using {cpu / duration:.1%} of one core, "
+          f"status counts {snapshot.status_counts}, {snapshot.alert_count} closure alerts")
@@ -0,0 +1,102 @@
+# jitter_meter.py - Inter-sample interval statistics for the sampling loop
+import math
+import time
+from collections import deque
+
+
+class JitterMeter:
+    """Track the intervals between consecutive sampling loop passes.
+
+    Keeps the last `window` intervals for percentiles plus running totals
+    for the whole session. Jitter is reported as how far the p99 and the
+    worst interval stray from the median, which is what a stall caused by
+    another thread holding the GIL shows up as.
+    """
+
+    def __init__(self, window=2000):
+        self.intervals = deque(maxlen=window)
+        self.last = None
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.max_interval = 0.0
+
+    def record(self, now=None):
+        """Mark one sampling pass at monotonic time `now`"""
+        if now is None:
+            now = time.monotonic()
+        if self.last is not None:
+            interval = now - self.last
+            self.intervals.append(interval)
+            self.count += 1
+            self.total += interval
+            self.total_squares += interval * interval
+            if interval > self.max_interval:
+                self.max_interval = interval
+        self.last = now
+
+    def reset(self):
+        self.__init__(self.intervals.maxlen)
+
+    def get_stats(self):
+        """Interval statistics in milliseconds"""
+        if not self.count:
+            return {"samples": 0}
+        recent = sorted(self.intervals)
+        mean = self.total / self.count
+        variance = max(0.0, self.total_squares / self.count - mean * mean)
+        median = recent[len(recent) // 2]
+        p99 = recent[min(len(recent) - 1, int(len(recent) * 0.99))]
+        return {
+            "samples": self.count,
+            "mean_ms": mean * 1000,
+            "stdev_ms": math.sqrt(variance) * 1000,
+            "median_ms": median * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": self.max_interval * 1000,
+            "jitter_p99_ms": (p99 - median) * 1000,
+            "jitter_max_ms": (self.max_interval - median) * 1000,
+        }
+
+
+def format_stats(stats):
+    if not stats.get("samples"):
+        return "no samples"
+    return (f"{stats['samples']} intervals, median {stats['median_ms']:.2f} ms, "
+            f"p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms, "
+            f"stdev {stats['stdev_ms']:.2f} ms")
+
+
+def simulate_ui_load(duration, redraw_items=300000, frame_interval=0.05):
+    """Hold the GIL in long C calls, like matplotlib/Tk redraws, for `duration` seconds"""
+    data = [math.sin(i) for i in range(redraw_items)]
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        sorted(data)
+        time.sleep(frame_interval)
+
+
+# Compare sampling jitter in-thread and out-of-process under UI load
+if __name__ == "__main__":
+    from sensor_monitor import SensorMonitor
+    from sensor_backends import SyntheticBackend
+    from sensor_process import SensorProcess
+
+    rate_hz = 100
+    duration = 5.0
+
+    monitor = SensorMonitor(backend=SyntheticBackend(rate_hz=rate_hz, seed=3))
+    monitor.start()
+    simulate_ui_load(duration)
+    thread_stats = monitor.get_jitter_stats()
+    monitor.stop()
+
+    sensor = SensorProcess(backend_kind='synthetic', backend_options={'rate_hz': rate_hz, 'seed': 3})
+    sensor.start()
+    simulate_ui_load(duration)
+    process_stats = sensor.get_jitter_stats(wait=2.0)
+    sensor.stop()
+
+    print(f"\nSampling at {rate_hz} Hz for {duration:.0f}s under simulated UI redraws:")
+    print(f"  in-thread:      {format_stats(thread_stats)}")
+    print(f"  out-of-process: {format_stats(process_stats)}")
@@ -0,0 +1,198 @@
+# link_monitor.py - Heartbeat-based connectivity tracking for the glasses link
+import random
+import time
+from collections import deque, namedtuple
+
+# Link states - the index is the code stored in shared state (1 = connected, as before)
+DISCONNECTED = "disconnected"
+CONNECTED = "connected"
+DEGRADED = "degraded"
+LINK_STATUSES = (DISCONNECTED, CONNECTED, DEGRADED)
+
+LinkStats = namedtuple('LinkStats', 'status latency_ms loss_pct reconnects')
+
+# Local sensors (GPIO, synthetic, replay) have no link to lose
+LOCAL_LINK = LinkStats(CONNECTED, 0.0, 0.0, 0)
+
+
+class ReconnectBackoff:
+    """Exponential reconnect delays with jitter: base, 2*base, 4*base ... up to maximum"""
+
+    def __init__(self, base=0.5, maximum=30.0, jitter=0.2, rng=None):
+        self.base = base
+        self.maximum = maximum
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.attempts = 0
+
+    def next_delay(self):
+        delay = min(self.maximum, self.base * 2 ** self.attempts)
+        self.attempts += 1
+        return delay * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    def reset(self):
+        self.attempts = 0
+
+
+class LinkMonitor:
+    """Track link health from the sender's heartbeats.
+
+    Every message from the sending side counts as a heartbeat when it
+    carries a sequence number and send time. Latency is receive time minus
+    send time (meaningful when both share a clock, e.g. the Pi service on
+    the same host), loss comes from sequence gaps, both over the last
+    `window` heartbeats. The link is disconnected when the transport is
+    down or `missed_limit` heartbeat intervals pass in silence, and
+    degraded when heartbeats are late, loss exceeds `degraded_loss` or the
+    mean latency of the last `recent` heartbeats exceeds `degraded_latency`
+    seconds.
+    """
+
+    def __init__(self, heartbeat_interval=1.0, missed_limit=3, window=20, recent=5,
+                 degraded_latency=0.25, degraded_loss=0.05):
+        self.heartbeat_interval = heartbeat_interval
+        self.missed_limit = missed_limit
+        self.recent = recent
+        self.degraded_latency = degraded_latency
+        self.degraded_loss = degraded_loss
+        self.heartbeats = deque(maxlen=window)  # (seq, latency)
+        self.link_up = False
+        self.last_heard = None
+        self.reconnects = -1  # The first connect is not a reconnect
+        self.timeouts = 0
+
+    def connected(self, now=None):
+        """The transport came up"""
+        self.link_up = True
+        self.last_heard = time.monotonic() if now is None else now
+        self.reconnects += 1
+        # Sequence numbers restart with a new connection on most senders
+        self.heartbeats.clear()
+
+    def disconnected(self):
+        """The transport went down"""
+        self.link_up = False
+
+    def heartbeat(self, seq, sent_at, received_at, now=None):
+        """Record one heartbeat - sent_at and received_at on the same (wall) clock"""
+        self.last_heard = time.monotonic() if now is None else now
+        heartbeats = self.heartbeats
+        if heartbeats and seq <= heartbeats[-1][0]:
+            return  # Duplicate or reordered
+        heartbeats.append((seq, max(0.0, received_at - sent_at)))
+
+    def timed_out(self, now=None):
+        """True when the link is up but the sender has been silent too long"""
+        if not self.link_up or self.last_heard is None:
+            return False
+        now = time.monotonic() if now is None else now
+        if now - self.last_heard > self.heartbeat_interval * self.missed_limit:
+            self.timeouts += 1
+            return True
+        return False
+
+    def latency(self, last=None):
+        """Mean latency in seconds over the window, or its `last` heartbeats"""
+        heartbeats = self.heartbeats
+        if not heartbeats:
+            return 0.0
+        count = len(heartbeats) if last is None else min(last, len(heartbeats))
+        return sum(heartbeats[-i][1] for i in range(1, count + 1)) / count
+
+    def loss(self):
+        """Fraction of heartbeats missing from the window's sequence range"""
+        heartbeats = self.heartbeats
+        if len(heartbeats) < 2:
+            return 0.0
+        expected = heartbeats[-1][0] - heartbeats[0][0] + 1
+        return 1.0 - len(heartbeats) / expected
+
+    def status(self, now=None):
+        if not self.link_up or self.last_heard is None:
+            return DISCONNECTED
+        now = time.monotonic() if now is None else now
+        silence = now - self.last_heard
+        if silence > self.heartbeat_interval * self.missed_limit:
+            return DISCONNECTED
+        if (silence > self.heartbeat_interval * 1.5 or self.loss() > self.degraded_loss
+                or self.latency(self.recent) > self.degraded_latency):
+            return DEGRADED
+        return CONNECTED
+
+    def get_stats(self, now=None):
+        """LinkStats rounded for display, so unchanged links compare equal"""
+        return LinkStats(self.status(now), round(self.latency() * 1000, 1),
+                         round(self.loss() * 100, 1), max(0, self.reconnects))
+
+
+class SimulatedLink:
+    """Fake wireless link for demo mode - feeds heartbeats into a LinkMonitor.
+
+    Mostly healthy (~15 ms), with occasional interference that adds
+    latency and drops heartbeats, and rare dropouts long enough to time
+    out before the link reconnects.
+    """
+
+    def __init__(self, link, seed=None):
+        self.link = link
+        self.rng = random.Random(seed)
+        self.seq = 0
+        self.next_heartbeat = 0.0
+        self.condition = CONNECTED
+        self.condition_until = None
+
+    def tick(self, now=None):
+        """Advance the simulation to now, sending any heartbeat that is due"""
+        now = time.monotonic() if now is None else now
+        link = self.link
+        if self.condition_until is None:
+            link.connected(now)
+            self.condition_until = now
+        if now >= self.condition_until:
+            roll = self.rng.random()
+            if self.condition == DISCONNECTED:
+                link.connected(now)
+            # Durations in heartbeats, so slower demo refreshes behave the same
+            if roll < 0.05:
+                self.condition, beats = DISCONNECTED, self.rng.uniform(4.0, 8.0)
+            elif roll < 0.2:
+                self.condition, beats = DEGRADED, self.rng.uniform(5.0, 15.0)
+            else:
+                self.condition, beats = CONNECTED, self.rng.uniform(20.0, 60.0)
+            self.condition_until = now + beats * link.heartbeat_interval
+
+        if now < self.next_heartbeat:
+            return
+        self.next_heartbeat = now + link.heartbeat_interval
+        self.seq += 1
+        if self.condition == DISCONNECTED:
+            if link.timed_out(now):
+                link.disconnected()
+            return
+        if self.condition == DEGRADED:
+            if self.rng.random() < 0.15:
+                return  # Lost
+            latency = self.rng.uniform(0.15, 0.6)
+        else:
+            latency = self.rng.lognormvariate(-4.2, 0.3)  # ~15 ms
+        wall = time.time()
+        link.heartbeat(self.seq, wall - latency, wall, now)
+
+
+# Run the simulated link on a virtual clock and print its transitions
+if __name__ == "__main__":
+    link = LinkMonitor()
+    simulated = SimulatedLink(link, seed=3)
+    backoff = ReconnectBackoff(base=0.5, maximum=30.0, rng=random.Random(1))
+    print("Reconnect delays:", ", ".join(f"{backoff.next_delay():.2f}s" for _ in range(8)))
+
+    start = time.monotonic()
+    previous = None
+    for step in range(18000):  # 30 minutes at 10 Hz
+        now = start + step * 0.1
+        simulated.tick(now)
+        stats = link.get_stats(now)
+        if stats.status != previous:
+            previous = stats.status
+            print(f"{step / 10:6.1f}s {stats.status:12s} latency {stats.latency_ms:6.1f} ms, "
+                  f"loss {stats.loss_pct:4.1f}%, reconnects {stats.reconnects}")
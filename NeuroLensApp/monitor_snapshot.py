@@ -0,0 +1,100 @@
+# monitor_snapshot.py - Immutable, versioned views of SensorMonitor state
+import time
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+
+from link_monitor import DISCONNECTED, LOCAL_LINK
+from records import as_dict
+
+_SNAPSHOT_FIELDS = (
+    'version', 'battery_level', 'current_status', 'alert_count', 'new_alerts',
+    'blink_count', 'session_start', 'performance_metrics', 'connectivity_status',
+    'link', 'published_at',
+)
+
+
+class MonitorSnapshot(namedtuple('MonitorSnapshot', _SNAPSHOT_FIELDS)):
+    """One consistent, read-only copy of the monitor's dashboard state.
+
+    The sensor thread builds a new snapshot only when something changed
+    and publishes it by rebinding a single attribute, which is atomic, so
+    readers need no lock. Compare `version` with the last one drawn to
+    skip redraws when nothing changed.
+    """
+
+    __slots__ = ()
+
+    def as_dashboard_data(self):
+        """Legacy get_dashboard_data() dict built from this snapshot"""
+        return {
+            "version": self.version,
+            "battery_level": max(0, self.battery_level),
+            "current_status": self.current_status,
+            "alert_count": self.alert_count,
+            "new_alerts": [as_dict(alert) for alert in self.new_alerts],
+            "blink_count": self.blink_count,
+            "session_duration": time.time() - self.session_start,
+            "performance_metrics": dict(self.performance_metrics),
+            "connectivity_status": self.connectivity_status,
+            "link": self.link._asdict(),
+            "last_update": datetime.fromtimestamp(self.published_at).isoformat()
+        }
+
+
+EMPTY_METRICS = MappingProxyType({})
+
+
+class SnapshotPublisher:
+    """Copy-on-write publisher for MonitorSnapshot.
+
+    publish() receives the cheap scalar fields every call and only builds
+    a new snapshot when they differ from the last one. Alerts and metrics
+    are copied only when their change counters move.
+    """
+
+    def __init__(self):
+        self.current = MonitorSnapshot(
+            version=0, battery_level=0.0, current_status=0, alert_count=0,
+            new_alerts=(), blink_count=0, session_start=time.time(),
+            performance_metrics=EMPTY_METRICS, connectivity_status=True,
+            link=LOCAL_LINK, published_at=time.time(),
+        )
+        self._key = None
+        self._alerts_version = -1
+        self._metrics_version = -1
+
+    def publish(self, battery_level, current_status, alert_count, blink_count,
+                session_start, link, alerts_version, alerts, metrics_version, metrics):
+        """Publish a new snapshot if any input changed. Returns the current one."""
+        key = (battery_level, current_status, alert_count, blink_count,
+               session_start, link, alerts_version, metrics_version)
+        if key == self._key:
+            return self.current
+
+        previous = self.current
+        new_alerts = previous.new_alerts
+        if alerts_version != self._alerts_version:
+            new_alerts = tuple(alerts)
+            self._alerts_version = alerts_version
+
+        performance_metrics = previous.performance_metrics
+        if metrics_version != self._metrics_version:
+            performance_metrics = MappingProxyType(dict(metrics))
+            self._metrics_version = metrics_version
+
+        self._key = key
+        self.current = MonitorSnapshot(
+            version=previous.version + 1,
+            battery_level=battery_level,
+            current_status=current_status,
+            alert_count=alert_count,
+            new_alerts=new_alerts,
+            blink_count=blink_count,
+            session_start=session_start,
+            performance_metrics=performance_metrics,
+            connectivity_status=link.status != DISCONNECTED,
+            link=link,
+            published_at=time.time(),
+        )
+        return self.current
@@ -0,0 +1,248 @@
+# records.py - Compact binary alert records and delta-encoded sample streams
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# Alert kinds
+ALERT_DROWSINESS = 0
+ALERT_BATTERY = 1
+
+# Condition codes - index into CONDITIONS
+COND_EYES_CLOSED = 0
+COND_BATTERY_LOW = 7
+CONDITIONS = (
+    "Eyes closed for 3+ seconds",
+    "Head nodding detected",
+    "Low blink rate: 8/min",
+    "Micro-sleep episode detected",
+    "Sustained attention drift",
+    "Eyelid droop detected",
+    "Head tilt angle exceeded",
+    "Battery level critically low: {battery:.1f}%",
+)
+DROWSINESS_CONDITIONS = tuple(range(COND_BATTERY_LOW))
+
+# Action codes - 1-5 follow the dashboard status scale
+ACTION_NOTIFY = 0
+ACTION_BATTERY = 6
+ACTIONS = (
+    "Alert notification sent",
+    "Emergency alert - Buzzer + Vibration + Visual",
+    "High priority - Buzzer + Vibration",
+    "Standard alert - Vibration only",
+    "Low priority - Visual notification",
+    "Information only - Status update",
+    "Battery warning notification sent",
+)
+
+# Response codes
+RESPONSE_PENDING = 0
+RESPONSE_CHARGE = 7
+RESPONSES = (
+    "Pending",
+    "User acknowledged",
+    "User took break",
+    "No response",
+    "User alert",
+    "Session paused",
+    "User active",
+    "Charge device immediately",
+)
+SIMULATED_RESPONSES = tuple(range(1, RESPONSE_CHARGE))
+
+# epoch f64, alert number u32, kind/condition/action/response/status u8,
+# battery f32, session seconds u32, count u16, last seen epoch f64
+ALERT_STRUCT = struct.Struct('<dIBBBBBfIHd')
+ALERT_RECORD_SIZE = ALERT_STRUCT.size
+
+_ALERT_FIELDS = (
+    'timestamp', 'alert_id', 'kind', 'condition', 'action', 'response', 'status',
+    'battery', 'session_seconds', 'count', 'last_seen',
+)
+
+
+class AlertRecord(namedtuple('AlertRecord', _ALERT_FIELDS)):
+    """One alert as numbers and enum codes - 35 bytes packed.
+
+    The dashboard strings (title, date, "85.0%", ...) are derived only when
+    the alert is shown or exported, via to_dict(). `timestamp` is when it
+    first fired, `last_seen` when it last repeated and `count` how many
+    times it has, once AlertQueue has coalesced repeats.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, alert_id, kind, condition, action, response, status, battery,
+               session_seconds=0, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        return cls(timestamp, alert_id, kind, condition, action, response, status,
+                   battery, int(session_seconds), 1, timestamp)
+
+    @property
+    def coalesce_key(self):
+        """Repeats of the same kind and condition coalesce in AlertQueue"""
+        return (self.kind, self.condition)
+
+    def coalesce(self, previous, now):
+        """This alert repeating `previous` - keep its first time, bump the count"""
+        return self._replace(timestamp=previous.timestamp, count=previous.count + 1, last_seen=now)
+
+    def pack(self):
+        return ALERT_STRUCT.pack(*self)
+
+    def pack_into(self, buffer, offset=0):
+        ALERT_STRUCT.pack_into(buffer, offset, *self)
+
+    @classmethod
+    def unpack(cls, buffer, offset=0):
+        return cls._make(ALERT_STRUCT.unpack_from(buffer, offset))
+
+    # Display-time text
+
+    @property
+    def title(self):
+        if self.kind == ALERT_BATTERY:
+            return "Low Battery Warning"
+        return f"Drowsiness Alert #{self.alert_id:03d}"
+
+    @property
+    def user(self):
+        return "System" if self.kind == ALERT_BATTERY else "Current User"
+
+    def to_dict(self):
+        """Legacy alert dict for the pages and CSV export"""
+        alert = {
+            "id": f"{'B' if self.kind == ALERT_BATTERY else 'A'}{self.alert_id:03d}",
+            "title": self.title,
+            "user": self.user,
+            "condition": CONDITIONS[self.condition].format(battery=self.battery),
+            "action": ACTIONS[self.action],
+            "response": RESPONSES[self.response],
+            "date": datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+            "battery": f"{self.battery:.1f}%",
+            "status": "critical" if self.kind == ALERT_BATTERY else self.status,
+            "count": self.count,
+            "first_seen": self.timestamp,
+            "last_seen": self.last_seen,
+        }
+        if self.kind == ALERT_DROWSINESS:
+            hours, minutes = divmod(self.session_seconds // 60, 60)
+            alert["session_time"] = f"{hours}H{minutes:02d}m"
+        return alert
+
+
+def as_dict(alert):
+    """Display form of an alert, whether it is an AlertRecord or already a dict"""
+    return alert.to_dict() if isinstance(alert, AlertRecord) else alert
+
+
+def encode_alerts(records):
+    """Pack alert records into one buffer: count u16, then fixed-size records"""
+    buffer = bytearray(2 + len(records) * ALERT_RECORD_SIZE)
+    struct.pack_into('<H', buffer, 0, len(records))
+    offset = 2
+    for record in records:
+        record.pack_into(buffer, offset)
+        offset += ALERT_RECORD_SIZE
+    return bytes(buffer)
+
+
+def decode_alerts(buffer):
+    count = struct.unpack_from('<H', buffer, 0)[0]
+    return [AlertRecord.unpack(buffer, 2 + i * ALERT_RECORD_SIZE) for i in range(count)]
+
+
+# Sample streams: header (first timestamp f64, tick seconds f64, count u32) then
+# one unsigned LEB128 varint per sample holding (tick delta << 1) | eyes_closed.
+# Ticks are taken from the first timestamp, so rounding never accumulates.
+SAMPLE_HEADER = struct.Struct('<ddI')
+DEFAULT_TICK = 1e-4
+
+
+def encode_samples(timestamps, states, tick=DEFAULT_TICK):
+    """Delta-encode (timestamp, eyes_closed) samples - timestamps must not decrease"""
+    body = bytearray()
+    first = None
+    previous_ticks = 0
+    count = 0
+    for timestamp, closed in zip(timestamps, states):
+        if first is None:
+            first = timestamp
+        ticks = round((timestamp - first) / tick)
+        delta = ticks - previous_ticks
+        if delta < 0:
+            raise ValueError("Sample timestamps must not decrease")
+        previous_ticks = ticks
+        value = (delta << 1) | (1 if closed else 0)
+        while value >= 0x80:
+            body.append((value & 0x7F) | 0x80)
+            value >>= 7
+        body.append(value)
+        count += 1
+    return SAMPLE_HEADER.pack(first or 0.0, tick, count) + body
+
+
+def decode_samples(buffer):
+    """Return (timestamps, states) lists from encode_samples() output"""
+    first, tick, count = SAMPLE_HEADER.unpack_from(buffer, 0)
+    timestamps = []
+    states = []
+    position = SAMPLE_HEADER.size
+    ticks = 0
+    for _ in range(count):
+        value = shift = 0
+        while True:
+            byte = buffer[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        ticks += value >> 1
+        timestamps.append(first + ticks * tick)
+        states.append(value & 1)
+    return timestamps, states
+
+
+# Compare record sizes when run directly
+if __name__ == "__main__":
+    import pickle
+    import tracemalloc
+    from sample_buffer import SampleRingBuffer
+    from sensor_backends import SyntheticBackend
+
+    record = AlertRecord.create(7, ALERT_DROWSINESS, COND_EYES_CLOSED, 1, RESPONSE_PENDING, 1, 85.0, 3720)
+    legacy = record.to_dict()
+    del legacy["count"], legacy["first_seen"], legacy["last_seen"]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [record._replace(alert_id=i, battery=80.0 - i * 0.001, timestamp=record.timestamp + i)
+               for i in range(10000)]
+    record_bytes = (tracemalloc.get_traced_memory()[0] - before) / len(records)
+    before = tracemalloc.get_traced_memory()[0]
+    dicts = [dict(legacy, id=f"A{i:03d}", title=f"Drowsiness Alert #{i:03d}", battery=f"{80.0 - i * 0.001:.1f}%")
+             for i in range(10000)]
+    dict_bytes = (tracemalloc.get_traced_memory()[0] - before) / len(dicts)
+    tracemalloc.stop()
+
+    print(f"Alert in memory: dict ~{dict_bytes:.0f} bytes, AlertRecord ~{record_bytes:.0f} bytes")
+    print(f"Alert on the wire: pickled dict {len(pickle.dumps(legacy))} bytes, "
+          f"pickled record {len(pickle.dumps(record))} bytes, packed record {len(record.pack())} bytes")
+    assert AlertRecord.unpack(record.pack()) == record
+
+    backend = SyntheticBackend(rate_hz=1000, seed=2, realtime=False, max_samples=60000)
+    backend.open()
+    buffer = SampleRingBuffer()
+    for _ in range(60000):
+        buffer.append(*backend.read())
+    (timestamps, states), = buffer.window(60.0)
+    encoded = buffer.encode_window(60.0)
+    decoded_timestamps, decoded_states = decode_samples(encoded)
+    error = max(abs(a - b) for a, b in zip(timestamps, decoded_timestamps))
+    assert list(decoded_states) == [int(s) for s in states]
+    print(f"60s of 1 kHz samples: {len(timestamps) * 9:,} bytes raw (f64 + i8), "
+          f"{len(encoded):,} bytes delta-encoded, max timestamp error {error * 1e6:.1f} us")
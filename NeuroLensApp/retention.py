@@ -0,0 +1,426 @@
+# retention.py - Age and size limits for stored events and samples, with background compaction
+import os
+import shutil
+import sys
+import threading
+import time
+
+from event_log import list_segments, valid_prefix, segment_name
+from sample_store import list_sessions
+
+DAY = 86400
+
+
+def path_bytes(path):
+    """Size of a file, or of everything under a directory"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def last_modified(path):
+    """Newest mtime of a file or of the files in a directory"""
+    if os.path.isfile(path):
+        return os.path.getmtime(path)
+    times = [os.path.getmtime(os.path.join(path, name)) for name in os.listdir(path)]
+    return max(times, default=os.path.getmtime(path))
+
+
+def thread_io():
+    """(read_bytes, write_bytes) this thread has caused at the block layer - Linux only, else None"""
+    try:
+        with open(f"/proc/self/task/{threading.get_native_id()}/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["read_bytes"]), int(fields["write_bytes"])
+    except (OSError, KeyError, ValueError, AttributeError):
+        return None
+
+
+class StorageCompactor:
+    """Keeps the data directory within its limits from a low-priority background thread.
+
+    Each pass, oldest first and never touching the segment or session
+    being written:
+      - raw sample sessions older than `sample_days` are deleted - their
+        rollups stay, so charts and summaries still cover them
+      - event log segments older than `max_age_days` are deleted once synced
+      - runs of small closed segments are merged into one, up to `merge_bytes`
+      - while events and samples together exceed `max_bytes`, the oldest
+        samples go first, then synced segments - unsynced segments are kept,
+        so this limit can be exceeded until sync catches up
+      - past `hard_max_bytes` the oldest unsynced segments are deleted too,
+        with a warning - without it a device whose sync endpoint is never
+        reachable (the default is localhost) would fill its disk
+
+    Rollups and the alert store are the long-term history and are reported
+    in usage() but not counted against `max_bytes` - no pass removes them,
+    so counting them could only push out events and samples.
+
+    `synced_seq` returns the sync cursor. Copies are throttled to `io_rate`
+    bytes per second and, on Linux, the thread runs at the lowest CPU
+    priority, so the sampling thread never waits on it.
+    """
+
+    def __init__(self, event_log_dir, sample_dir, rollup_dir=None, alert_store_path=None,
+                 synced_seq=None, max_age_days=90, sample_days=14, max_bytes=2 * 1024 ** 3,
+                 hard_max_bytes=4 * 1024 ** 3, merge_bytes=4 * 1024 * 1024, interval=3600.0, io_rate=4 * 1024 * 1024,
+                 on_report=None):
+        self.event_log_dir = event_log_dir
+        self.sample_dir = sample_dir
+        self.rollup_dir = rollup_dir
+        self.alert_store_path = alert_store_path
+        self.synced_seq = synced_seq or (lambda: 0)
+        self.max_age_days = max_age_days
+        self.sample_days = sample_days
+        self.max_bytes = max_bytes
+        self.hard_max_bytes = hard_max_bytes  # None never deletes unsynced events
+        self.merge_bytes = merge_bytes
+        self.interval = interval
+        self.io_rate = io_rate
+        self.on_report = on_report
+        self.stopping = threading.Event()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+        # Statistics
+        self.runs = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.bytes_deleted = 0
+        self.files_deleted = 0
+        self.sessions_dropped = 0
+        self.segments_dropped = 0
+        self.segments_merged = 0
+        self.unsynced_dropped = 0  # Events deleted before they were synced
+        self.disk_read = 0   # Block-layer I/O from /proc, where available
+        self.disk_written = 0
+        self.run_time = 0.0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="storage-compactor", daemon=True)
+        self.thread.start()
+
+    def request_run(self):
+        """Run a pass now rather than at the next interval"""
+        self.wakeup.set()
+
+    def _run(self):
+        if sys.platform.startswith("linux"):
+            try:
+                # Per thread on Linux - the rest of the process keeps its priority
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+            except (AttributeError, OSError):
+                pass
+        while not self.stopping.is_set():
+            try:
+                report = self.run_once()
+                if self.on_report is not None:
+                    self.on_report(report)
+            except Exception as e:
+                print(f"Storage compaction failed: {e}")
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def run_once(self, now=None):
+        """One retention and compaction pass - returns usage and I/O figures"""
+        now = time.time() if now is None else now
+        started = time.perf_counter()
+        io_before = thread_io()
+
+        self.expire_samples(now)
+        self.expire_segments(now)
+        self.merge_segments()
+        self.enforce_size()
+
+        io_after = thread_io()
+        if io_before and io_after:
+            self.disk_read += io_after[0] - io_before[0]
+            self.disk_written += io_after[1] - io_before[1]
+        self.run_time += time.perf_counter() - started
+        self.runs += 1
+        return dict(self.get_stats(), usage=self.usage(),
+                    pass_ms=(time.perf_counter() - started) * 1000)
+
+    def usage(self):
+        """Bytes on disk per kind of data"""
+        usage = {
+            "events": sum(path_bytes(path) for _, path in list_segments(self.event_log_dir)),
+            "samples": sum(path_bytes(path) for _, path in list_sessions(self.sample_dir)),
+        }
+        if self.rollup_dir and os.path.isdir(self.rollup_dir):
+            usage["rollups"] = path_bytes(self.rollup_dir)
+        if self.alert_store_path:
+            usage["alerts"] = sum(path_bytes(self.alert_store_path + suffix)
+                                  for suffix in ("", "-wal", "-shm")
+                                  if os.path.exists(self.alert_store_path + suffix))
+        return usage
+
+    # Samples
+
+    def closed_sessions(self):
+        """Sample sessions oldest first, without the newest one (it may still be written)"""
+        return list_sessions(self.sample_dir)[:-1]
+
+    def expire_samples(self, now):
+        cutoff = now - self.sample_days * DAY
+        for _, path in self.closed_sessions():
+            if last_modified(path) < cutoff:
+                self.drop_session(path)
+
+    def drop_session(self, path):
+        size = path_bytes(path)
+        files = len(os.listdir(path))
+        shutil.rmtree(path, ignore_errors=True)
+        self.bytes_deleted += size
+        self.files_deleted += files
+        self.sessions_dropped += 1
+
+    # Event log
+
+    def closed_segments(self):
+        """[(first_seq, last_seq, path)] oldest first, without the segment the log appends to"""
+        segments = list_segments(self.event_log_dir)
+        return [(first_seq, segments[index + 1][0] - 1, path)
+                for index, (first_seq, path) in enumerate(segments[:-1])]
+
+    def expire_segments(self, now):
+        cutoff = now - self.max_age_days * DAY
+        synced = self.synced_seq()
+        for _, last_seq, path in self.closed_segments():
+            if last_seq > synced:
+                break  # Keep everything not yet uploaded
+            if os.path.getmtime(path) < cutoff:
+                self.drop_segment(path)
+
+    def drop_segment(self, path):
+        size = self.remove(path)
+        self.segments_dropped += 1
+        return size
+
+    def remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        self.bytes_deleted += size
+        self.files_deleted += 1
+        return size
+
+    def merge_segments(self):
+        """Merge runs of adjacent small segments into the first of each run"""
+        run, run_bytes = [], 0
+        for _, _, path in self.closed_segments() + [(None, None, None)]:
+            size = os.path.getsize(path) if path else None
+            if path and run_bytes + size <= self.merge_bytes:
+                run.append(path)
+                run_bytes += size
+                continue
+            if len(run) > 1:
+                self.merge(run)
+            run, run_bytes = ([path], size) if path else ([], 0)
+
+    def merge(self, paths):
+        """Copy the intact records of `paths` into one file named for the first, then delete the rest.
+
+        The merged file replaces the first atomically; readers skip the
+        repeated sequence numbers if they see it before the rest are gone.
+        """
+        target = paths[0]
+        temp_path = target + ".tmp"
+        modified = max(os.path.getmtime(path) for path in paths)
+        with open(temp_path, 'wb') as out:
+            for path in paths:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                good, _ = valid_prefix(data)
+                self.bytes_read += len(data)
+                self.copy(out, memoryview(data)[:good])
+            out.flush()
+            os.fsync(out.fileno())
+        # Keep the newest part's age, so age-based retention still applies
+        os.utime(temp_path, (modified, modified))
+        os.replace(temp_path, target)
+        for path in paths[1:]:
+            self.remove(path)
+        self.segments_merged += len(paths) - 1
+
+    def copy(self, out, data, chunk=256 * 1024):
+        """Write data in chunks, sleeping to stay under io_rate"""
+        for offset in range(0, len(data), chunk):
+            if self.stopping.is_set():
+                raise OSError("compaction stopped")
+            piece = data[offset:offset + chunk]
+            started = time.perf_counter()
+            out.write(piece)
+            self.bytes_written += len(piece)
+            if self.io_rate:
+                delay = len(piece) / self.io_rate - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+    # Size limit
+
+    def enforce_size(self):
+        usage = self.usage()
+        total = usage["events"] + usage["samples"]  # What a pass can free
+        while total > self.max_bytes:
+            freed = self.free_oldest()
+            if not freed:
+                print(f"Storage over limit ({total / 1e6:.0f} MB) - the rest is unsynced or in use")
+                break
+            total -= freed
+        if self.hard_max_bytes is not None and total > self.hard_max_bytes:
+            self.drop_unsynced(total)
+
+    def drop_unsynced(self, total):
+        """Delete the oldest segments, synced or not, until under hard_max_bytes"""
+        first = last = None
+        for first_seq, last_seq, path in self.closed_segments():
+            if total <= self.hard_max_bytes:
+                break
+            total -= self.drop_segment(path)
+            first = first_seq if first is None else first
+            last = last_seq
+        if first is None:
+            return
+        synced = self.synced_seq()
+        lost = last - max(first - 1, synced)
+        if lost > 0:
+            self.unsynced_dropped += lost
+            print(f"WARNING: storage over hard limit ({self.hard_max_bytes / 1e6:.1f} MB) - "
+                  f"deleted {lost:,} unsynced events (up to #{last})")
+
+    def free_oldest(self):
+        """Delete the oldest removable item - returns the bytes freed, 0 if none"""
+        sessions = self.closed_sessions()
+        if sessions:
+            size = path_bytes(sessions[0][1])
+            self.drop_session(sessions[0][1])
+            return size
+        segments = self.closed_segments()
+        if segments:
+            _, last_seq, path = segments[0]
+            if last_seq <= self.synced_seq():
+                return self.drop_segment(path)
+        return 0
+
+    def get_stats(self):
+        return {
+            "runs": self.runs,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "bytes_deleted": self.bytes_deleted,
+            "files_deleted": self.files_deleted,
+            "sessions_dropped": self.sessions_dropped,
+            "segments_dropped": self.segments_dropped,
+            "segments_merged": self.segments_merged,
+            "unsynced_dropped": self.unsynced_dropped,
+            "disk_read": self.disk_read,
+            "disk_written": self.disk_written,
+            "run_ms": self.run_time * 1000,
+        }
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+
+def format_report(report):
+    usage = ", ".join(f"{name} {size / 1e6:.1f} MB" for name, size in report["usage"].items())
+    return (f"{usage}; pass {report['pass_ms']:.0f} ms, freed {report['bytes_deleted'] / 1e6:.1f} MB "
+            f"({report['sessions_dropped']} sessions, {report['segments_dropped']} segments), "
+            f"merged {report['segments_merged']} segments, copied {report['bytes_written'] / 1e6:.1f} MB, "
+            f"disk I/O {report['disk_read'] / 1e6:.1f} MB read / {report['disk_written'] / 1e6:.1f} MB written")
+
+
+# Build a month of small event segments and sample sessions, then compact while a writer keeps logging
+if __name__ == "__main__":
+    import tempfile
+    from event_log import EventLog, EventLogReader, EVENT_BLINKS, BLINKS_PAYLOAD
+    from sample_store import SampleStore, session_name
+
+    directory = tempfile.mkdtemp(prefix="neurolens-retention-")
+    event_dir = os.path.join(directory, "events")
+    sample_dir = os.path.join(directory, "samples")
+    now = time.time()
+
+    # 30 daily segments of ~1000 events, the last 10 days not yet synced
+    log = EventLog(event_dir, segment_seconds=DAY)
+    synced = 0
+    for day in range(30):
+        day_time = now - (30 - day) * DAY
+        for i in range(1000):
+            log.append(EVENT_BLINKS, BLINKS_PAYLOAD.pack(i), timestamp=day_time + i)
+        log.flush()
+        log.rotate(log.next_seq)
+        if day < 20:
+            synced = log.next_seq - 1
+        os.utime(os.path.join(event_dir, segment_name(log.next_seq - 1000)), (day_time, day_time))
+    # 30 daily sessions of 10 minutes at 50 Hz
+    for day in range(30):
+        day_time = now - (30 - day) * DAY
+        store = SampleStore(sample_dir)
+        store.start_session(day_time)
+        for i in range(30000):
+            store.append(day_time + i / 50 - store.clock_offset, i % 40 == 0, 80.0)
+        store.close()
+        path = os.path.join(sample_dir, session_name(day_time))
+        for name in os.listdir(path):
+            os.utime(os.path.join(path, name), (day_time + 600, day_time + 600))
+
+    compactor = StorageCompactor(event_dir, sample_dir, synced_seq=lambda: synced, max_age_days=14,
+                                 sample_days=7, merge_bytes=256 * 1024)
+    before = sum(1 for _ in EventLogReader(event_dir))
+    print("Before:", {name: f"{size / 1e6:.1f} MB" for name, size in compactor.usage().items()},
+          f"{len(list_segments(event_dir))} segments, {len(list_sessions(sample_dir))} sessions")
+
+    # The live log keeps taking events while a pass runs
+    stop = threading.Event()
+    appended = [0]
+
+    def writer():
+        while not stop.is_set():
+            log.append(EVENT_BLINKS, BLINKS_PAYLOAD.pack(0))
+            appended[0] += 1
+            time.sleep(0.0005)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    compactor.start()
+    time.sleep(1.0)
+    stop.set()
+    thread.join()
+    log.close()
+    compactor.stop()
+
+    after = sum(1 for _ in EventLogReader(event_dir))
+    report = dict(compactor.get_stats(), usage=compactor.usage(), pass_ms=compactor.run_time * 1000)
+    print("After:", format_report(report))
+    print(f"{len(list_segments(event_dir))} segments, {len(list_sessions(sample_dir))} sessions; "
+          f"events {before:,} + {appended[0]:,} live -> {after:,} "
+          f"({before + appended[0] - after:,} expired, all synced)")
+
+    # Size limit: squeeze to 1 MB - samples and synced events go, unsynced events stay
+    compactor.max_bytes = 1024 * 1024
+    compactor.run_once()
+    kept = EventLogReader(event_dir).events(synced)
+    print("Squeezed:", {name: f"{size / 1e6:.2f} MB" for name, size in compactor.usage().items()},
+          f"{sum(1 for _ in kept):,} unsynced events kept")
+
+    # Hard limit: sync never caught up - the oldest unsynced events go too
+    compactor.hard_max_bytes = 64 * 1024
+    compactor.run_once()
+    kept = EventLogReader(event_dir).events(synced)
+    print("Hard limit:", {name: f"{size / 1e6:.2f} MB" for name, size in compactor.usage().items()},
+          f"{sum(1 for _ in kept):,} unsynced events kept, {compactor.unsynced_dropped:,} deleted")
+    shutil.rmtree(directory)
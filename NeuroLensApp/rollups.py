@@ -0,0 +1,368 @@
+# rollups.py - Incremental 1 s / 1 min / 1 h aggregates of eye state, blinks, alerts and status
+import bisect
+import math
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# Bucket widths in seconds, finest first - each tier is rolled up from the one before
+TIERS = (1, 60, 3600)
+
+# One bucket: start (epoch, aligned to the width), seconds observed, seconds
+# with eyes closed, blinks, alerts, lowest and highest 1-5 status (0 = none seen)
+Rollup = namedtuple('Rollup', 'start observed closed blinks alerts min_status max_status')
+ROLLUP_RECORD = struct.Struct('<dffIIBB')
+
+# Longer silences between samples count as no data rather than one long state
+MAX_SAMPLE_GAP = 60.0
+
+
+def tier_path(directory, width):
+    return os.path.join(directory, f"rollup-{width}s.bin")
+
+
+def merge_status(low, high, other_low, other_high):
+    if not low:
+        return other_low, other_high
+    if not other_low:
+        return low, high
+    return min(low, other_low), max(high, other_high)
+
+
+def combine(rollups, start=None):
+    """One Rollup summing a sequence of them"""
+    observed = closed = 0.0
+    blinks = alerts = low = high = 0
+    for rollup in rollups:
+        if start is None:
+            start = rollup.start
+        observed += rollup.observed
+        closed += rollup.closed
+        blinks += rollup.blinks
+        alerts += rollup.alerts
+        low, high = merge_status(low, high, rollup.min_status, rollup.max_status)
+    return Rollup(start or 0.0, observed, closed, blinks, alerts, low, high)
+
+
+def closed_fraction(rollup):
+    return rollup.closed / rollup.observed if rollup.observed else 0.0
+
+
+def alertness(rollup):
+    """Percent of observed time with eyes open, or None without data - the dashboard's Performance"""
+    if not rollup.observed:
+        return None
+    return round(100 * (1 - rollup.closed / rollup.observed))
+
+
+class RollupEngine:
+    """Maintains every tier's open bucket as samples and events arrive.
+
+    Only the 1 s tier sees raw input; when a bucket closes it is written
+    out and merged into the open bucket of the next tier up, so each sample
+    costs a few additions however many tiers there are. Closed-time is
+    time-weighted - a sample's state holds until the next sample (or
+    tick()) - so edge-triggered sensors that report only changes roll up
+    correctly. Closed buckets are appended as fixed-width records to one
+    file per tier; close() also writes the open buckets, and readers merge
+    records that share a start.
+    """
+
+    def __init__(self, directory, tiers=TIERS, max_gap=MAX_SAMPLE_GAP):
+        self.directory = directory
+        self.tiers = tiers
+        self.max_gap = max_gap
+        os.makedirs(directory, exist_ok=True)
+        self.files = []
+        for width in tiers:
+            f = open(tier_path(directory, width), 'ab')
+            # Drop a record torn by a crash
+            f.truncate(f.tell() - f.tell() % ROLLUP_RECORD.size)
+            self.files.append(f)
+        self.open = [None] * len(tiers)  # [start, observed, closed, blinks, alerts, min, max]
+        self.dirty = False
+        self.last_time = None
+        self.last_closed = False
+        self.status = 0
+        self.rows_written = [0] * len(tiers)
+
+    def _bucket(self, timestamp):
+        """The open finest-tier bucket for timestamp, closing the previous one if it has ended"""
+        width = self.tiers[0]
+        start = math.floor(timestamp / width) * width
+        bucket = self.open[0]
+        if bucket is not None:
+            if start <= bucket[0]:
+                return bucket  # Same bucket, or a late arrival folded into it
+            self._close(0)
+        bucket = self.open[0] = [start, 0.0, 0.0, 0, 0, self.status, self.status]
+        return bucket
+
+    def _close(self, level):
+        """Write out a tier's open bucket and merge it into the tier above"""
+        bucket = self.open[level]
+        self.open[level] = None
+        self.files[level].write(ROLLUP_RECORD.pack(*bucket))
+        self.rows_written[level] += 1
+        self.dirty = True
+        if level + 1 == len(self.tiers):
+            return
+        width = self.tiers[level + 1]
+        start = math.floor(bucket[0] / width) * width
+        parent = self.open[level + 1]
+        if parent is not None and parent[0] != start:
+            self._close(level + 1)
+            parent = None
+        if parent is None:
+            self.open[level + 1] = [start] + bucket[1:]
+            return
+        parent[1] += bucket[1]
+        parent[2] += bucket[2]
+        parent[3] += bucket[3]
+        parent[4] += bucket[4]
+        parent[5], parent[6] = merge_status(parent[5], parent[6], bucket[5], bucket[6])
+
+    def _observe(self, start, end, closed):
+        """Attribute [start, end) with one eye state, split at bucket edges"""
+        width = self.tiers[0]
+        while start < end:
+            bucket = self._bucket(start)
+            stop = min(end, bucket[0] + width)
+            bucket[1] += stop - start
+            if closed:
+                bucket[2] += stop - start
+            start = stop
+
+    def _advance(self, timestamp):
+        last = self.last_time
+        if last is not None and 0 < timestamp - last <= self.max_gap:
+            self._observe(last, timestamp, self.last_closed)
+        if last is None or timestamp > last:
+            self.last_time = timestamp
+
+    def add_sample(self, timestamp, eyes_closed):
+        """One raw sample (epoch timestamp) - its state holds until the next sample"""
+        self._advance(timestamp)
+        self.last_closed = bool(eyes_closed)
+        self._bucket(timestamp)
+        self._flush()
+
+    def tick(self, now):
+        """Extend the current state up to now, closing buckets that have ended"""
+        if self.last_time is None:
+            return
+        self._advance(now)
+        self._flush()
+
+    def add_blinks(self, count, timestamp):
+        self._bucket(timestamp)[3] += count
+        self._flush()
+
+    def add_alert(self, timestamp):
+        self._bucket(timestamp)[4] += 1
+        self._flush()
+
+    def set_status(self, status, timestamp):
+        bucket = self._bucket(timestamp)
+        self.status = status
+        bucket[5], bucket[6] = merge_status(bucket[5], bucket[6], status, status)
+        self._flush()
+
+    def current(self, width):
+        """A tier's open bucket as a Rollup, or None"""
+        bucket = self.open[self.tiers.index(width)]
+        return Rollup(*bucket) if bucket is not None else None
+
+    def _flush(self):
+        if self.dirty:
+            self.dirty = False
+            for f in self.files:
+                f.flush()
+
+    def get_stats(self):
+        return {f"{width}s_rows": rows for width, rows in zip(self.tiers, self.rows_written)}
+
+    def close(self):
+        """Write the open buckets too, so the rollups cover everything seen so far"""
+        if not self.files:
+            return
+        for level in range(len(self.tiers)):
+            if self.open[level] is not None:
+                self._close(level)
+        for f in self.files:
+            f.close()
+        self.files = []
+
+
+class RollupReader:
+    """Reads rollup records from the tier files, possibly while an engine appends to them.
+
+    Records are found by binary search over the mapped file, and
+    collect() covers a time range with the coarsest buckets that fit
+    inside it and finer ones at the edges, so a week reads a few hundred
+    records whatever the sample rate.
+    """
+
+    def __init__(self, directory, tiers=TIERS):
+        self.directory = directory
+        self.tiers = tiers
+
+    def rows(self, width, since=None, until=None):
+        """Rollups of one tier with since <= start < until, oldest first, same-start records merged"""
+        try:
+            with open(tier_path(self.directory, width), 'rb') as f:
+                count = os.fstat(f.fileno()).st_size // ROLLUP_RECORD.size
+                if not count:
+                    return []
+                data = mmap.mmap(f.fileno(), count * ROLLUP_RECORD.size, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return []
+        with data:
+            size = ROLLUP_RECORD.size
+            starts = _RecordStarts(data, count)
+            first = 0 if since is None else bisect.bisect_left(starts, since)
+            last = count if until is None else bisect.bisect_left(starts, until, first)
+            rows = []
+            for index in range(first, last):
+                row = Rollup._make(ROLLUP_RECORD.unpack_from(data, index * size))
+                if rows and rows[-1].start == row.start:
+                    rows[-1] = combine((rows[-1], row))
+                else:
+                    rows.append(row)
+            return rows
+
+    def collect(self, since, until, widths=None):
+        """Rollups covering [since, until) - coarse buckets inside, finer ones at the edges and gaps"""
+        if widths is None:
+            widths = sorted(self.tiers, reverse=True)
+        width, finer = widths[0], widths[1:]
+        rows = self.rows(width, since, until)
+        if not finer:
+            return rows
+        covered = []
+        position = since
+        for row in rows:
+            if row.start + width > until:
+                break
+            # Finer records fill gaps, e.g. an hour whose bucket was lost in a crash
+            if row.start > position:
+                covered.extend(self.collect(position, row.start, finer))
+            covered.append(row)
+            position = row.start + width
+        if position < until:
+            covered.extend(self.collect(position, until, finer))
+        return covered
+
+    def summarize(self, since, until):
+        return combine(self.collect(since, until), start=since)
+
+    def series(self, since, until, width):
+        """One combined Rollup per `width` seconds from since, for charts"""
+        return [self.summarize(start, min(start + width, until))
+                for start in range(int(since), int(until), int(width))]
+
+
+class _RecordStarts:
+    """Sequence view of the record start times, for bisect"""
+
+    def __init__(self, data, count):
+        self.data = data
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return struct.unpack_from('<d', self.data, index * ROLLUP_RECORD.size)[0]
+
+
+def daily_alertness(reader, days=5, now=None):
+    """[(weekday, alertness % or None)] for the last `days` local days, today last"""
+    now = time.time() if now is None else now
+    midnight = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    history = []
+    for back in range(days - 1, -1, -1):
+        day = midnight - timedelta(days=back)
+        end = min((day + timedelta(days=1)).timestamp(), now)
+        history.append((day.strftime('%a'), alertness(reader.summarize(day.timestamp(), end))))
+    return history
+
+
+# Roll up a week of synthetic 200 Hz samples, then time chart queries against a raw scan
+if __name__ == "__main__":
+    import random
+    import shutil
+    import tempfile
+    from sample_store import SampleStore, open_sessions
+
+    directory = tempfile.mkdtemp(prefix="neurolens-rollups-")
+    engine = RollupEngine(os.path.join(directory, "rollups"))
+    rng = random.Random(4)
+    now = time.time()
+    start = now - 7 * 86400
+    rate = 200
+    interval = 1.0 / rate
+
+    # A week of one-hour drives, one a day
+    started = time.perf_counter()
+    samples = 0
+    for day in range(7):
+        t = start + day * 86400
+        end = t + 3600
+        closed_until = 0.0
+        while t < end:
+            if t >= closed_until and rng.random() < 0.3 / rate:
+                closed_until = t + (rng.uniform(1.0, 4.0) if rng.random() < 0.1 else rng.uniform(0.1, 0.3))
+                engine.add_blinks(1, t)
+            engine.add_sample(t, t < closed_until)
+            if rng.random() < 1 / (rate * 600):
+                engine.add_alert(t)
+            if rng.random() < 1 / (rate * 60):
+                engine.set_status(rng.randint(1, 5), t)
+            t += interval
+            samples += 1
+        engine.tick(end)
+    elapsed = time.perf_counter() - started
+    print(f"Rolled up {samples:,} samples in {elapsed:.1f}s ({elapsed / samples * 1e6:.2f} us each), "
+          f"rows {engine.get_stats()}")
+
+    # The last drive's raw samples, to compare against
+    store = SampleStore(os.path.join(directory, "samples"))
+    store.start_session(now - 3600)
+    store.clock_offset = 0.0
+    rng = random.Random(9)
+    closed_until = 0.0
+    t = now - 3600
+    while t < now:
+        if t >= closed_until and rng.random() < 0.3 / rate:
+            closed_until = t + rng.uniform(0.1, 0.3)
+        store.append(t, t < closed_until, 80.0)
+        engine.add_sample(t, t < closed_until)
+        t += interval
+    store.close()
+    engine.close()
+
+    reader = RollupReader(os.path.join(directory, "rollups"))
+    started = time.perf_counter()
+    rows = reader.collect(start, now)
+    week = combine(rows)
+    print(f"Week summary from {len(rows)} rollup rows in {(time.perf_counter() - started) * 1000:.1f} ms: "
+          f"{week.observed / 3600:.1f} h observed, {closed_fraction(week):.1%} closed, "
+          f"{week.blinks:,} blinks, {week.alerts} alerts, status {week.min_status}-{week.max_status}")
+    started = time.perf_counter()
+    history = daily_alertness(reader, days=7, now=now)
+    print(f"Daily alertness in {(time.perf_counter() - started) * 1000:.1f} ms: {history}")
+
+    session = open_sessions(os.path.join(directory, "samples"))[0]
+    started = time.perf_counter()
+    raw = session.closed_fraction()
+    raw_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    rolled = closed_fraction(reader.summarize(now - 3600, now))
+    print(f"Last drive closed fraction: raw scan of {len(session):,} samples {raw:.2%} in {raw_ms:.1f} ms, "
+          f"rollups {rolled:.2%} in {(time.perf_counter() - started) * 1000:.1f} ms")
+    del session
+    shutil.rmtree(directory)
@@ -0,0 +1,148 @@
+# sample_buffer.py - Fixed-size ring buffer of raw eye sensor samples
+import itertools
+from array import array
+
+from records import encode_samples, DEFAULT_TICK
+
+
+class SampleRingBuffer:
+    """Preallocated ring of (timestamp, eyes_closed) samples.
+
+    Timestamps live in an array('d') and states in an array('b'), both
+    allocated once, so append() never allocates and memory stays flat no
+    matter how long the session runs. One thread writes; any number of
+    readers can take zero-copy memoryview (or NumPy) windows of recent
+    samples. A reader racing the writer can see the oldest slots of a
+    window overwritten, so windows stop `guard` slots short of a full lap.
+    """
+
+    def __init__(self, capacity=300000, guard=64):
+        if capacity <= guard:
+            raise ValueError("Ring buffer capacity must exceed its guard size")
+        self.capacity = capacity
+        self.guard = guard
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.states = array('b', bytes(capacity))
+        self.count = 0  # Total samples ever written
+
+    @classmethod
+    def for_duration(cls, seconds, rate_hz):
+        """Size a buffer to hold `seconds` of history at `rate_hz`"""
+        return cls(capacity=int(seconds * rate_hz) + 64)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp, eyes_closed):
+        """Store one sample, overwriting the oldest when full"""
+        index = self.count % self.capacity
+        self.timestamps[index] = timestamp
+        self.states[index] = eyes_closed
+        self.count += 1
+
+    def latest(self):
+        """Most recent (timestamp, eyes_closed) sample, or None"""
+        if not self.count:
+            return None
+        index = (self.count - 1) % self.capacity
+        return self.timestamps[index], bool(self.states[index])
+
+    def _start_of_window(self, since, end):
+        """First logical index in [oldest, end) with timestamp >= since"""
+        low = max(0, end - self.capacity + self.guard)
+        high = end
+        timestamps = self.timestamps
+        capacity = self.capacity
+        while low < high:
+            middle = (low + high) // 2
+            if timestamps[middle % capacity] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def window(self, seconds, now=None):
+        """Zero-copy views of samples from the last `seconds`.
+
+        Returns a list of up to two (timestamps, states) memoryview pairs in
+        chronological order - two when the window wraps the end of the ring.
+        `now` defaults to the newest sample's timestamp.
+        """
+        end = self.count
+        if not end:
+            return []
+        if now is None:
+            now = self.timestamps[(end - 1) % self.capacity]
+        start = self._start_of_window(now - seconds, end)
+        return self._segments(start, end)
+
+    def last(self, n):
+        """Zero-copy views of the newest n samples, as for window()"""
+        end = self.count
+        start = max(0, end - n, end - self.capacity + self.guard)
+        return self._segments(start, end)
+
+    def _segments(self, start, end):
+        if start >= end:
+            return []
+        timestamps = memoryview(self.timestamps)
+        states = memoryview(self.states)
+        first = start % self.capacity
+        last = (end - 1) % self.capacity + 1
+        if first < last:
+            return [(timestamps[first:last], states[first:last])]
+        return [
+            (timestamps[first:], states[first:]),
+            (timestamps[:last], states[:last]),
+        ]
+
+    def window_arrays(self, seconds, now=None):
+        """Same as window() but each view is wrapped as a NumPy array (no copy)"""
+        import numpy as np
+        return [
+            (np.frombuffer(timestamps, dtype=np.float64), np.frombuffer(states, dtype=np.int8))
+            for timestamps, states in self.window(seconds, now)
+        ]
+
+    def encode_window(self, seconds, now=None, tick=DEFAULT_TICK):
+        """Delta-encode the last `seconds` of samples for storage or transmission"""
+        segments = self.window(seconds, now)
+        return encode_samples(
+            itertools.chain.from_iterable(timestamps for timestamps, _ in segments),
+            itertools.chain.from_iterable(states for _, states in segments),
+            tick,
+        )
+
+    def closed_fraction(self, seconds, now=None):
+        """Fraction of samples in the last `seconds` with eyes closed"""
+        total = closed = 0
+        for _, states in self.window(seconds, now):
+            total += len(states)
+            closed += sum(states)
+        return closed / total if total else 0.0
+
+    def clear(self):
+        self.count = 0
+
+
+# Memory check when run directly
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+    from sensor_backends import SyntheticBackend
+
+    backend = SyntheticBackend(rate_hz=1000, seed=1, realtime=False)
+    backend.open()
+    buffer = SampleRingBuffer.for_duration(300, 1000)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for chunk in range(5):
+        for _ in range(1_000_000):
+            buffer.append(*backend.read())
+        current, peak = tracemalloc.get_traced_memory()
+        print(f"{buffer.count:>10,} samples written | traced {current / 1024:8.1f} KiB "
+              f"(peak {peak / 1024:8.1f} KiB) | closed last 60s: {buffer.closed_fraction(60):.1%}")
+    elapsed = time.perf_counter() - started
+    print(f"Buffer footprint {(buffer.capacity * 9) / 1e6:.1f} MB, "
+          f"{buffer.count / elapsed:,.0f} samples/s including generation")
@@ -0,0 +1,267 @@
+# sample_store.py - Per-session columnar sample files, appended by the monitor, read through mmap
+import bisect
+import mmap
+import os
+import time
+from array import array
+
+# Column name, array typecode, file name. One fixed-width value per sample,
+# little-endian as written by array on every platform we run on.
+COLUMNS = (
+    ('timestamp', 'd', "timestamp.f64"),  # epoch seconds
+    ('state', 'B', "state.u8"),           # 1 = eyes closed
+    ('battery', 'f', "battery.f32"),      # percent
+)
+NUMPY_DTYPES = {'d': '<f8', 'B': 'u1', 'f': '<f4'}
+
+SESSION_PREFIX = "session-"
+
+
+def session_name(session_start):
+    return f"{SESSION_PREFIX}{int(session_start * 1000):016d}"
+
+
+def list_sessions(directory):
+    """[(session_start, path)] for the stored sessions, oldest first"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    sessions = []
+    for name in names:
+        if name.startswith(SESSION_PREFIX):
+            try:
+                start_ms = int(name[len(SESSION_PREFIX):])
+            except ValueError:
+                continue
+            sessions.append((start_ms / 1000, os.path.join(directory, name)))
+    sessions.sort()
+    return sessions
+
+
+def stored_rows(path):
+    """Complete rows in a session directory - the shortest column wins"""
+    rows = None
+    for _, typecode, filename in COLUMNS:
+        try:
+            size = os.path.getsize(os.path.join(path, filename))
+        except FileNotFoundError:
+            return 0
+        count = size // array(typecode).itemsize
+        rows = count if rows is None else min(rows, count)
+    return rows or 0
+
+
+class SampleStore:
+    """Writes raw samples as one column file per field, a directory per session.
+
+    append() only adds to in-memory arrays; every `flush_rows` samples or
+    `flush_interval` seconds the arrays go out as one write per column, so
+    at 200 Hz the sampling thread does a few small writes a second. There
+    is no fsync - the event log is the durable record, these are bulk data
+    for charts and analysis. Sample timestamps arrive on the monotonic
+    clock and are stored as epoch seconds.
+    """
+
+    def __init__(self, directory, flush_rows=1024, flush_interval=0.5):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self.path = None
+        self.files = None
+        self.buffers = None
+        self.clock_offset = 0.0
+        self.last_flush = time.monotonic()
+
+        # Statistics
+        self.rows = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self.write_time = 0.0
+
+    def start_session(self, session_start):
+        """Close the current session's files and start appending to session_start's"""
+        self.close()
+        self.path = os.path.join(self.directory, session_name(session_start))
+        os.makedirs(self.path, exist_ok=True)
+        # A crash can leave columns of different lengths - cut back to whole rows
+        rows = stored_rows(self.path)
+        self.files = []
+        for _, typecode, filename in COLUMNS:
+            f = open(os.path.join(self.path, filename), 'ab')
+            f.truncate(rows * array(typecode).itemsize)
+            self.files.append(f)
+        self.buffers = [array(typecode) for _, typecode, _ in COLUMNS]
+        self.clock_offset = time.time() - time.monotonic()
+        self.last_flush = time.monotonic()
+
+    def append(self, timestamp, eyes_closed, battery):
+        """Buffer one sample (monotonic timestamp); writes out when a flush is due"""
+        if self.buffers is None:
+            return
+        timestamps, states, batteries = self.buffers
+        timestamps.append(timestamp + self.clock_offset)
+        states.append(1 if eyes_closed else 0)
+        batteries.append(battery)
+        if len(timestamps) >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write buffered samples to the column files"""
+        self.last_flush = time.monotonic()
+        if not self.buffers or not self.buffers[0]:
+            return
+        started = time.perf_counter()
+        # Timestamps last, so a reader that catches the columns mid-write sees the shorter row count
+        for f, buffer in reversed(list(zip(self.files, self.buffers))):
+            data = buffer.tobytes()
+            f.write(data)
+            f.flush()
+            self.bytes_written += len(data)
+        self.write_time += time.perf_counter() - started
+        self.rows += len(self.buffers[0])
+        self.writes += 1
+        self.buffers = [array(typecode) for _, typecode, _ in COLUMNS]
+
+    def get_stats(self):
+        return {
+            "rows": self.rows,
+            "writes": self.writes,
+            "rows_per_write": self.rows / self.writes if self.writes else 0.0,
+            "bytes": self.bytes_written,
+            "write_ms": self.write_time * 1000,
+            "session": self.path,
+        }
+
+    def close(self):
+        if self.files is None:
+            return
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"Sample store write failed: {e}")
+        for f in self.files:
+            f.close()
+        self.files = None
+        self.buffers = None
+
+
+class SampleSession:
+    """Read-only view of one session's columns, mapped rather than loaded.
+
+    The columns are NumPy memmaps when NumPy is installed and typed
+    memoryviews over mmap otherwise - either way nothing is copied until a
+    slice is used, so hours of samples cost no Python objects. The files
+    keep growing while the monitor writes; refresh() maps any new rows.
+    """
+
+    def __init__(self, path, use_numpy=True):
+        self.path = path
+        self.session_start = int(os.path.basename(path)[len(SESSION_PREFIX):]) / 1000
+        self.np = None
+        if use_numpy:
+            try:
+                import numpy
+                self.np = numpy
+            except ImportError:
+                pass
+        self.rows = 0
+        self.timestamp = self.state = self.battery = ()
+        self.refresh()
+
+    def __len__(self):
+        return self.rows
+
+    def refresh(self):
+        """Map rows written since the last refresh. Returns the row count."""
+        rows = stored_rows(self.path)
+        if rows == self.rows:
+            return rows
+        self.rows = rows
+        for name, typecode, filename in COLUMNS:
+            setattr(self, name, self._map(os.path.join(self.path, filename), typecode, rows))
+        return rows
+
+    def _map(self, path, typecode, rows):
+        if not rows:
+            return ()
+        if self.np is not None:
+            return self.np.memmap(path, dtype=NUMPY_DTYPES[typecode], mode='r', shape=(rows,))
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), rows * array(typecode).itemsize, access=mmap.ACCESS_READ)
+        return memoryview(mapped).cast(typecode)
+
+    def index_at(self, timestamp):
+        """First row at or after an epoch timestamp"""
+        if self.np is not None and self.rows:
+            return int(self.np.searchsorted(self.timestamp, timestamp, side='left'))
+        return bisect.bisect_left(self.timestamp, timestamp)
+
+    def window(self, since=None, until=None):
+        """(timestamp, state, battery) column slices for since <= t < until, without copying"""
+        start = 0 if since is None else self.index_at(since)
+        end = self.rows if until is None else self.index_at(until)
+        return self.timestamp[start:end], self.state[start:end], self.battery[start:end]
+
+    def closed_fraction(self, since=None, until=None):
+        """Fraction of samples in the range with eyes closed"""
+        _, states, _ = self.window(since, until)
+        if not len(states):
+            return 0.0
+        closed = int(states.sum()) if self.np is not None else sum(states)
+        return closed / len(states)
+
+    def end_time(self):
+        return float(self.timestamp[self.rows - 1]) if self.rows else None
+
+
+def open_sessions(directory, use_numpy=True):
+    """SampleSessions for every stored session, oldest first"""
+    return [SampleSession(path, use_numpy) for _, path in list_sessions(directory)]
+
+
+# Write a few hours of synthetic samples, then scan them through the maps
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    import tracemalloc
+    from sensor_backends import SyntheticBackend
+
+    directory = tempfile.mkdtemp(prefix="neurolens-samples-")
+    store = SampleStore(directory)
+    session_start = time.time()
+    store.start_session(session_start)
+    backend = SyntheticBackend(rate_hz=200, seed=2, realtime=False)
+    backend.open()
+    total = 200 * 3600 * 3  # Three hours at 200 Hz
+
+    started = time.perf_counter()
+    for _ in range(total):
+        timestamp, eyes_closed = backend.read()
+        store.append(timestamp, eyes_closed, 80.0)
+    elapsed = time.perf_counter() - started
+    store.close()
+    stats = store.get_stats()
+    print(f"Appended {total:,} samples in {elapsed:.1f}s ({elapsed / total * 1e6:.2f} us each), "
+          f"{stats['writes']} writes, {stats['bytes'] / 1e6:.1f} MB")
+
+    try:
+        import numpy  # Imported up front so the timings below are scans, not the import
+    except ImportError:
+        pass
+    for use_numpy in (True, False):
+        tracemalloc.start()
+        started = time.perf_counter()
+        session = open_sessions(directory, use_numpy)[0]
+        end = session.end_time()
+        hour = session.closed_fraction(end - 3600, end)
+        whole = session.closed_fraction()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{'numpy.memmap' if session.np else 'mmap+memoryview'}: {len(session):,} rows, "
+              f"closed {whole:.1%} overall / {hour:.1%} last hour in {elapsed * 1000:.0f} ms, "
+              f"peak Python memory {peak / 1024:.0f} KiB")
+        del session
+    shutil.rmtree(directory)
@@ -0,0 +1,381 @@
+# sensor_backends.py - Pluggable eye sensor sample sources
+import csv
+import json
+import random
+import socket
+import time
+
+from edge_acquisition import EdgeAcquisition
+from link_monitor import LinkMonitor, ReconnectBackoff, SimulatedLink
+
+
+class SensorBackend:
+    """Base class for eye sensor sample sources.
+
+    read() returns the next (timestamp, eyes_closed) sample or None when
+    timeout seconds pass without one. Timestamps are on the time.monotonic()
+    timeline. Backends with simulated = True produce no raw samples and let
+    SensorMonitor drive its legacy status simulation instead. Backends
+    behind a link to the glasses expose a LinkMonitor as `link`.
+    """
+
+    name = "base"
+    simulated = False
+    gpio = None
+    link = None
+
+    def open(self):
+        """Prepare the backend before the first read"""
+
+    def read(self, timeout=None):
+        """Return the next (timestamp, eyes_closed) sample, or None"""
+        if timeout:
+            time.sleep(timeout)
+        return None
+
+    def set_rate(self, rate_hz):
+        """Change the sampling rate - ignored by sources that are not polled"""
+
+    def close(self):
+        """Release any resources held by the backend"""
+
+
+class GPIOBackend(SensorBackend):
+    """Real IR sensor on a GPIO pin, edge-triggered or polled"""
+
+    name = "gpio"
+
+    def __init__(self, gpio, sensor_pin=2, edge_triggered=True, poll_interval=0.1):
+        self.gpio = gpio
+        self.sensor_pin = sensor_pin
+        self.edge_triggered = edge_triggered
+        self.poll_interval = poll_interval
+        self.edge_acquisition = None
+        self.last_poll = 0
+        self.next_poll = 0
+
+    def open(self):
+        self.gpio.setup(self.sensor_pin, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
+        if self.edge_triggered:
+            self.edge_acquisition = EdgeAcquisition(self.gpio, self.sensor_pin)
+            self.edge_acquisition.start()
+
+    def read(self, timeout=None):
+        if self.edge_acquisition:
+            return self.edge_acquisition.read(timeout)
+
+        # Polled mode: one sample per poll_interval
+        wait = self.next_poll - time.monotonic()
+        if timeout is not None and wait > timeout:
+            time.sleep(timeout)
+            return None
+        if wait > 0:
+            time.sleep(wait)
+        now = time.monotonic()
+        self.last_poll = now
+        self.next_poll = now + self.poll_interval
+        return (now, self.gpio.input(self.sensor_pin) == self.gpio.LOW)
+
+    def set_rate(self, rate_hz):
+        self.poll_interval = 1.0 / rate_hz
+        self.next_poll = self.last_poll + self.poll_interval
+
+    def close(self):
+        if self.edge_acquisition:
+            self.edge_acquisition.stop()
+            self.edge_acquisition = None
+
+
+class SimulatedBackend(SensorBackend):
+    """Demo mode - ticks at 10 Hz and lets SensorMonitor fake the status and link"""
+
+    name = "simulated"
+    simulated = True
+
+    def __init__(self, tick_interval=0.1, seed=None):
+        self.tick_interval = tick_interval
+        self.link = LinkMonitor()
+        self.simulated_link = SimulatedLink(self.link, seed)
+
+    def read(self, timeout=None):
+        time.sleep(self.tick_interval)
+        self.simulated_link.tick()
+        return None
+
+
+class SyntheticBackend(SensorBackend):
+    """Seeded eye-state generator for load testing the detection path.
+
+    Produces a sample every 1/rate_hz seconds. Eyes are mostly open with
+    short blinks and occasional multi-second closures. With realtime=False
+    samples are returned as fast as the caller can consume them, on a
+    virtual timeline, which makes runs reproducible and CPU bound.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, rate_hz=1000, seed=0, realtime=True, blink_rate=0.3,
+                 closure_rate=0.05, max_samples=None):
+        self.rate_hz = rate_hz
+        self.interval = 1.0 / rate_hz
+        self.seed = seed
+        self.realtime = realtime
+        self.blink_rate = blink_rate        # blinks per second
+        self.closure_rate = closure_rate    # long closures per second
+        self.max_samples = max_samples
+        self.rng = random.Random(seed)
+        self.sample_count = 0
+        self.start_time = None
+        self.next_time = None
+        self.eyes_closed = False
+        self.state_until = 0
+
+    def open(self):
+        self.rng = random.Random(self.seed)
+        self.sample_count = 0
+        self.start_time = time.monotonic()
+        self.next_time = self.start_time
+        self.eyes_closed = False
+        self.state_until = self.start_time + self.rng.expovariate(self.blink_rate + self.closure_rate)
+
+    def next_state(self, timestamp):
+        """Advance the open/closed state machine to timestamp"""
+        while timestamp >= self.state_until:
+            if self.eyes_closed:
+                self.eyes_closed = False
+                self.state_until += self.rng.expovariate(self.blink_rate + self.closure_rate)
+            else:
+                self.eyes_closed = True
+                if self.rng.random() < self.closure_rate / (self.blink_rate + self.closure_rate):
+                    self.state_until += self.rng.uniform(1.0, 4.0)
+                else:
+                    self.state_until += self.rng.uniform(0.1, 0.4)
+        return self.eyes_closed
+
+    def read(self, timeout=None):
+        if self.max_samples is not None and self.sample_count >= self.max_samples:
+            return super().read(timeout)
+
+        timestamp = self.next_time
+        if self.realtime:
+            wait = timestamp - time.monotonic()
+            if timeout is not None and wait > timeout:
+                time.sleep(timeout)
+                return None
+            if wait > 0:
+                time.sleep(wait)
+
+        self.sample_count += 1
+        self.next_time = timestamp + self.interval
+        return (timestamp, self.next_state(timestamp))
+
+    def set_rate(self, rate_hz):
+        interval = 1.0 / rate_hz
+        if self.next_time is not None:
+            self.next_time += interval - self.interval
+        self.rate_hz = rate_hz
+        self.interval = interval
+
+
+class ReplayBackend(SensorBackend):
+    """Replay a recorded CSV of timestamp,eyes_closed rows"""
+
+    name = "replay"
+
+    def __init__(self, path, realtime=True, loop=False):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.samples = []
+        self.position = 0
+        self.offset = 0
+
+    def open(self):
+        with open(self.path, newline='', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile)
+            self.samples = [
+                (float(row[0]), row[1].strip() in ('1', 'True', 'true'))
+                for row in reader
+                if row and not row[0].startswith(('#', 'timestamp'))
+            ]
+        self.rewind()
+        print(f"Replay backend loaded {len(self.samples)} samples from {self.path}")
+
+    def rewind(self):
+        self.position = 0
+        if self.samples:
+            self.offset = time.monotonic() - self.samples[0][0]
+
+    def read(self, timeout=None):
+        if self.position >= len(self.samples):
+            if not (self.loop and self.samples):
+                return super().read(timeout)
+            self.rewind()
+
+        recorded_time, eyes_closed = self.samples[self.position]
+        timestamp = recorded_time + self.offset
+        if self.realtime:
+            wait = timestamp - time.monotonic()
+            if timeout is not None and wait > timeout:
+                time.sleep(timeout)
+                return None
+            if wait > 0:
+                time.sleep(wait)
+
+        self.position += 1
+        return (timestamp, eyes_closed)
+
+
+class DaemonBackend(SensorBackend):
+    """Attach to the anti_sleep_glasses Pi.py service over its local IPC endpoint.
+
+    The service publishes JSON-line state messages; every change of its
+    sensor level becomes one sample. Pi.py escalates while the sensor reads
+    HIGH, so that level is reported as eyes_closed. The service's own
+    actuator state is kept in last_state. Every message is a heartbeat for
+    `link` (the service sends one at least every second); a connection
+    silent for three heartbeats is dropped, and reconnects back off
+    exponentially from retry_interval to max_retry_interval while reads
+    return None.
+    """
+
+    name = "daemon"
+
+    def __init__(self, host="127.0.0.1", port=8765, retry_interval=0.5, max_retry_interval=30.0,
+                 heartbeat_interval=1.0):
+        self.host = host
+        self.port = port
+        self.link = LinkMonitor(heartbeat_interval)
+        self.backoff = ReconnectBackoff(retry_interval, max_retry_interval)
+        self.sock = None
+        self.buffer = b""
+        self.next_connect = 0
+        self.last_state = None
+        self.sensor_low = None
+        self.connects = 0
+
+    def open(self):
+        self.connect()
+
+    def connect(self):
+        try:
+            self.sock = socket.create_connection((self.host, self.port), timeout=1.0)
+        except OSError as e:
+            delay = self.backoff.next_delay()
+            self.next_connect = time.monotonic() + delay
+            print(f"Sensor daemon not reachable at {self.host}:{self.port}: {e} - retrying in {delay:.1f}s")
+            self.sock = None
+            return False
+        self.buffer = b""
+        self.sensor_low = None
+        self.connects += 1
+        self.link.connected()
+        print(f"Attached to sensor daemon at {self.host}:{self.port}")
+        return True
+
+    def disconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            self.link.disconnected()
+            self.next_connect = time.monotonic() + self.backoff.next_delay()
+
+    def read(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Hand out buffered messages before touching the socket
+            while b"\n" in self.buffer:
+                line, self.buffer = self.buffer.split(b"\n", 1)
+                sample = self.handle_message(line)
+                if sample is not None:
+                    return sample
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+
+            if self.sock is None:
+                wait = self.next_connect - time.monotonic()
+                if remaining is not None and wait > remaining:
+                    time.sleep(remaining)
+                    return None
+                if wait > 0:
+                    time.sleep(wait)
+                self.connect()
+                continue
+
+            if self.link.timed_out():
+                print("Sensor daemon missed its heartbeats - reconnecting")
+                self.disconnect()
+                continue
+
+            # Wake in time to notice missed heartbeats even when the caller waits forever
+            silence_limit = self.link.heartbeat_interval * self.link.missed_limit
+            try:
+                self.sock.settimeout(silence_limit if remaining is None else min(remaining, silence_limit))
+                data = self.sock.recv(4096)
+            except socket.timeout:
+                if remaining is None or remaining > silence_limit:
+                    continue
+                return None
+            except OSError:
+                data = b""
+            if not data:
+                print("Sensor daemon connection lost")
+                self.disconnect()
+                continue
+            self.buffer += data
+
+    def handle_message(self, line):
+        """Turn one state message into a sample when the sensor level changed"""
+        try:
+            state = json.loads(line)
+        except ValueError:
+            return None
+        self.last_state = state
+        if "seq" in state and "time" in state:
+            self.link.heartbeat(state["seq"], state["time"], time.time())
+            # Only a link that delivers heartbeats counts as recovered
+            self.backoff.reset()
+        sensor_low = state.get("sensor_low")
+        if sensor_low is None or sensor_low == self.sensor_low:
+            return None
+        self.sensor_low = sensor_low
+
+        # Map the service's wall-clock timestamp onto this process's monotonic clock
+        age = max(0.0, time.time() - state.get("time", time.time()))
+        return (time.monotonic() - age, not sensor_low)
+
+    def close(self):
+        self.disconnect()
+
+
+def create_backend(kind, **options):
+    """Build a backend by name: gpio, simulated, synthetic, replay or daemon"""
+    backends = {
+        'gpio': GPIOBackend,
+        'simulated': SimulatedBackend,
+        'synthetic': SyntheticBackend,
+        'replay': ReplayBackend,
+        'daemon': DaemonBackend,
+    }
+    if kind not in backends:
+        raise ValueError(f"Unknown sensor backend '{kind}'. Choose from: {', '.join(backends)}")
+    return backends[kind](**options)
+
+
+# Load test the detection path when run directly
+if __name__ == "__main__":
+    from sensor_monitor import SensorMonitor
+
+    total = 200000
+    backend = SyntheticBackend(rate_hz=1000, seed=42, realtime=False, max_samples=total)
+    monitor = SensorMonitor(backend=backend)
+    backend.open()
+
+    print(f"Feeding {total} synthetic samples through the detection path...")
+    started = time.perf_counter()
+    for _ in range(total):
+        monitor.process_sample(*backend.read())
+    elapsed = time.perf_counter() - started
+    print(f"Processed {total} samples in {elapsed:.2f}s ({total / elapsed:,.0f} samples/s)")
@@ -4,6 +4,24 @@ import time
 import platform
 import random
 from datetime import datetime
+from sensor_backends import GPIOBackend, SimulatedBackend
+from sample_buffer import SampleRingBuffer
+from jitter_meter import JitterMeter
+from async_stream import AsyncSubscription, Sample
+from sampling_policy import AdaptiveSamplingPolicy
+from drowsiness_detector import DrowsinessDetector, WARNING, CRITICAL
+from monitor_snapshot import SnapshotPublisher
+from rollups import RollupReader, daily_alertness
+from checkpoint import SessionState
+from event_log import (EVENT_ALERT, EVENT_STATUS, EVENT_BLINKS, EVENT_BATTERY, EVENT_SESSION,
+                       STATUS_PAYLOAD, BLINKS_PAYLOAD, BATTERY_PAYLOAD, SESSION_PAYLOAD)
+from link_monitor import LOCAL_LINK, CONNECTED, DEGRADED, DISCONNECTED
+from shared_state import HEARTBEAT_INTERVAL
+from actuators import ActuatorDriver, CRITICAL_ESCALATION, VIBRATION_PULSE
+from alert_queue import AlertQueue, PRIORITY_CRITICAL, PRIORITY_HIGH, PRIORITY_NORMAL
+from records import (AlertRecord, as_dict, ALERT_DROWSINESS, ALERT_BATTERY, CONDITIONS,
+                     DROWSINESS_CONDITIONS, SIMULATED_RESPONSES, COND_EYES_CLOSED, COND_BATTERY_LOW,
+                     ACTION_NOTIFY, ACTION_BATTERY, RESPONSE_PENDING, RESPONSE_CHARGE)
 
 # Check if we're on Raspberry Pi
 IS_RASPBERRY_PI = platform.machine() in ('armv7l', 'aarch64')
@@ -19,23 +37,73 @@ if IS_RASPBERRY_PI:
 else:
     print("Running on Windows/other - using simulation mode")
 
+# Longest the sampling loop blocks before re-checking self.running
+EDGE_IDLE_TIMEOUT = 1.0
+
 class SensorMonitor(threading.Thread):
-    def __init__(self, dashboard=None, sensor_pin=2, motor_pin=8, buzzer_pin=9):
+    def __init__(self, dashboard=None, sensor_pin=2, motor_pin=8, buzzer_pin=9,
+                 gpio=None, edge_triggered=True, backend=None, ui_channel=None,
+                 alert_capacity=50, alert_policies=None, sampling_policy=None,
+                 shared_state=None, event_log=None, alert_store=None, sample_store=None,
+                 rollups=None, checkpointer=None):
         super().__init__(daemon=True)
         self.dashboard = dashboard
+        self.ui_channel = ui_channel  # Pushes snapshots to the Tk main loop
+        self.shared_state = shared_state  # SharedStateWriter when the UI is in another process
+        self.shared_written = 0.0
+        self.event_log = event_log  # EventLog for alerts and state changes
+        self.alert_store = alert_store  # AlertStore keeping the full alert history
+        self.sample_store = sample_store  # SampleStore keeping raw samples per session
+        self.stored_session = None
+        self.rollups = rollups  # RollupEngine keeping 1 s / 1 min / 1 h aggregates for charts
+        self.rolled_blinks = 0
+        self.clock_offset = time.time() - time.monotonic()  # Sample timestamps to epoch - also the rollups' clock
+        self.logged_state = None
+        self.last_event_seq = 0
+        self.checkpointer = checkpointer  # Checkpointer saving session state for resume after a crash
         self.sensor_pin = sensor_pin
         self.motor_pin = motor_pin  
         self.buzzer_pin = buzzer_pin
-        self.last_trigger_time = time.time()
         self.running = True
+
+        # Sample source - real GPIO on a Pi (or an injected FakeGPIO), else simulation
+        if backend is None:
+            if gpio is None and IS_RASPBERRY_PI:
+                gpio = GPIO
+            if gpio is not None:
+                backend = GPIOBackend(gpio, sensor_pin, edge_triggered=edge_triggered)
+            else:
+                backend = SimulatedBackend()
+        self.backend = backend
+        self.gpio = backend.gpio  # Actuator outputs share the sensor's GPIO module
+        self.link = backend.link  # LinkMonitor when the glasses are behind a link
+        self.link_stats = LOCAL_LINK if self.link is None else self.link.get_stats()
+        self.actuators = ActuatorDriver(self.gpio, motor_pin, buzzer_pin)
+
+        # Polled GPIO adapts its rate to eye state and battery by default - edge-triggered
+        # GPIO has no rate to adapt
+        if sampling_policy is None and isinstance(backend, GPIOBackend) and not backend.edge_triggered:
+            sampling_policy = AdaptiveSamplingPolicy()
+        self.sampling_policy = sampling_policy
+        self.sampling_rate = None
+        self.detector = DrowsinessDetector()
+        self.detector.reset(time.monotonic())
+        self.samples = SampleRingBuffer()  # Raw sample history for windowed stats
+        self.jitter = JitterMeter()  # Intervals between sampling loop passes
+        self.stream_subscribers = []  # AsyncSubscriptions from stream()
+        self.alert_subscribers = []   # AsyncSubscriptions from alerts()
+        self.eyes_closed = False
+        self.closure_level = self.detector.closure_level
+        self.last_metrics_update = 0
         
         # Enhanced data tracking
         self.battery_level = 85.0
         self.current_status = 3  # 1-5 scale (1=drowsy, 5=alert)
         self.alert_count = 0
-        self.new_alerts = []
+        self.new_alerts = AlertQueue(alert_capacity, policies=alert_policies)
         self.blink_count = 0
         self.session_start = time.time()
+        self.resumed = self.resume_session()
         
         # Performance metrics
         self.performance_metrics = {
@@ -44,81 +112,140 @@ class SensorMonitor(threading.Thread):
             'avg_response_time': 2.5,
             'false_positives': 3
         }
+
+        # Published dashboard state - readers take self.snapshots.current lock-free
+        self.snapshots = SnapshotPublisher()
+        self.publish_lock = threading.Lock()
+        self.metrics_version = 0
         
         # Simulation variables
-        self.simulation_mode = not IS_RASPBERRY_PI
+        self.simulation_mode = backend.simulated
         self.sim_cycle = 0
+        if self.simulation_mode and self.rollups is not None:
+            # Demo data must not end up in the persistent rollups the charts read
+            self.rollups.close()
+            self.rollups = None
         self.last_alert_time = 0
         
-        # Alert patterns for realistic simulation
-        self.alert_conditions = [
-            "Eyes closed for 3+ seconds",
-            "Head nodding detected", 
-            "Low blink rate: 8/min",
-            "Micro-sleep episode detected",
-            "Sustained attention drift",
-            "Eyelid droop detected",
-            "Head tilt angle exceeded"
-        ]
-        
-        self.user_responses = [
-            "User acknowledged",
-            "User took break", 
-            "No response",
-            "User alert",
-            "Session paused",
-            "User active"
-        ]
+        # Alert patterns for realistic simulation (condition / response codes)
+        self.alert_conditions = DROWSINESS_CONDITIONS
+        self.user_responses = SIMULATED_RESPONSES
 
         # Setup hardware or simulation
-        if IS_RASPBERRY_PI:
+        if self.gpio is not None:
             self.setup_real_gpio()
         else:
             self.setup_simulation()
             
-        print(f"Sensor monitor initialized ({'Real Hardware' if IS_RASPBERRY_PI else 'Simulation Mode'})")
+        print(f"Sensor monitor initialized ({'Simulation Mode' if self.simulation_mode else backend.name + ' backend'})")
+        self.publish_snapshot()
 
     def setup_real_gpio(self):
         """Setup real GPIO for Raspberry Pi"""
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.motor_pin, GPIO.OUT)
-        GPIO.setup(self.buzzer_pin, GPIO.OUT)
-        GPIO.setup(self.sensor_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.output(self.motor_pin, GPIO.HIGH)
-        GPIO.output(self.buzzer_pin, GPIO.LOW)
+        gpio = self.gpio
+        gpio.setmode(gpio.BCM)
+        self.actuators.setup()
         
     def setup_simulation(self):
-        """Setup simulation for testing"""
-        print("Simulation mode: Generating realistic sensor data")
-        self.motor_on = True
-        self.buzzer_on = False
+        """Setup simulated actuators for testing"""
+        if self.simulation_mode:
+            print("Simulation mode: Generating realistic sensor data")
+        self.actuators.setup()
 
     def run(self):
         """Main sensor monitoring loop"""
+        self.backend.open()
+        if not self.simulation_mode:
+            self.current_status = self.detector.status
+        if not self.resumed:
+            self.log_event(EVENT_SESSION, SESSION_PAYLOAD.pack(self.session_start))
+
         while self.running:
             try:
-                if IS_RASPBERRY_PI:
-                    self.run_real_hardware()
-                else:
+                sample = self.backend.read(timeout=self.next_threshold_timeout())
+                self.jitter.record(time.monotonic())
+
+                if sample is not None:
+                    self.process_sample(*sample)
+                elif not self.simulation_mode:
+                    self.apply_detection(self.detector.poll(time.monotonic()))
+
+                if self.simulation_mode:
                     self.run_enhanced_simulation()
                 
                 # Update metrics
                 self.update_system_metrics()
-                
-                time.sleep(0.1)
+                self.update_link()
+                self.update_rollups()
+                self.log_state()
+                self.checkpoint()
+                self.publish_snapshot()
                 
             except Exception as e:
                 print(f"Sensor monitoring error: {e}")
                 time.sleep(1)
 
-    def run_real_hardware(self):
-        """Monitor real hardware sensors"""
-        sensor_state = GPIO.input(self.sensor_pin)
-        
-        if sensor_state == GPIO.LOW:  # Eyes closed
-            self.handle_eyes_closed()
-        else:  # Eyes open
-            self.handle_eyes_open()
+        if self.sample_store is not None:
+            self.sample_store.close()
+        if self.rollups is not None:
+            self.rollups.close()
+        if self.checkpointer is not None:
+            self.log_state()
+            self.checkpointer.close(self.session_state())
+        self.release_hardware()
+
+    def release_hardware(self):
+        """Close the sensor backend and actuators and reset the GPIO - after the loop has stopped using them"""
+        self.backend.close()
+        self.actuators.close()
+        if self.gpio is not None:
+            self.gpio.cleanup()
+
+    def process_sample(self, timestamp, eyes_closed):
+        """Feed one (timestamp, eyes_closed) sample to the detection engine"""
+        self.samples.append(timestamp, eyes_closed)
+        self.store_sample(timestamp, eyes_closed)
+        if self.rollups is not None:
+            self.rollups.add_sample(timestamp + self.clock_offset, eyes_closed)
+        new_state = self.detector.update(timestamp, eyes_closed)
+        self.apply_detection(new_state)
+        if self.stream_subscribers:
+            sample = Sample(timestamp, eyes_closed, self.detector.state)
+            for subscription in self.stream_subscribers:
+                subscription.offer(sample)
+
+        if self.sampling_policy is not None:
+            rate_hz = self.sampling_policy.choose(
+                timestamp, eyes_closed, self.detector.state, self.battery_level)
+            if rate_hz != self.sampling_rate:
+                self.sampling_rate = rate_hz
+                self.backend.set_rate(rate_hz)
+
+    def apply_detection(self, new_state):
+        """React to the detector's debounced eye state and any state change"""
+        detector = self.detector
+        if detector.eyes_closed != self.eyes_closed:
+            self.eyes_closed = detector.eyes_closed
+            if not self.eyes_closed:
+                self.handle_eyes_open()
+        self.blink_count = detector.blink_count
+
+        if new_state is not None:
+            self.current_status = detector.status
+
+        # Actuators follow how long this closure has lasted, not the
+        # recovering status, so a quick re-closure still escalates
+        if detector.closure_level != self.closure_level:
+            self.closure_level = detector.closure_level
+            if self.eyes_closed:
+                self.handle_eyes_closed(self.closure_level)
+
+    def next_threshold_timeout(self):
+        """Seconds until the detector can next change state on its own"""
+        deadline = self.detector.next_deadline()
+        if deadline is None:
+            return EDGE_IDLE_TIMEOUT
+        return max(0, min(EDGE_IDLE_TIMEOUT, deadline - time.monotonic()))
 
     def run_enhanced_simulation(self):
         """Enhanced simulation with realistic patterns"""
@@ -147,27 +274,18 @@ class SensorMonitor(threading.Thread):
             if self.battery_level < 20:
                 self.create_battery_alert()
 
-    def handle_eyes_closed(self):
-        """Handle eyes closed detection"""
-        current_time = time.time()
-        closed_duration = current_time - self.last_trigger_time
-        
-        if closed_duration > 3.0:  # Critical threshold
-            self.current_status = 1
+    def handle_eyes_closed(self, level):
+        """Escalate actuators as a closure reaches a new detection level"""
+        if level == CRITICAL:
             self.trigger_alert("Eyes closed for 3+ seconds - Critical drowsiness")
+            self.create_closure_alert()
             self.activate_all_alerts()
             
-        elif closed_duration > 2.0:  # Warning threshold
-            self.current_status = 2
+        elif level == WARNING:
             self.activate_vibration()
-            
-        elif closed_duration > 1.0:  # Caution
-            self.current_status = 3
 
     def handle_eyes_open(self):
-        """Handle eyes open detection"""
-        self.last_trigger_time = time.time()
-        self.current_status = min(5, self.current_status + 1)  # Improve status
+        """Silence actuators as soon as the eyes reopen"""
         self.deactivate_alerts()
 
     def create_realistic_alert(self):
@@ -181,62 +299,83 @@ class SensorMonitor(threading.Thread):
         self.alert_count += 1
         self.last_alert_time = current_time
         
-        alert = {
-            "id": f"A{self.alert_count:03d}",
-            "title": f"Drowsiness Alert #{self.alert_count:03d}",
-            "user": "Current User",
-            "condition": random.choice(self.alert_conditions),
-            "action": self.get_alert_action(),
-            "response": random.choice(self.user_responses),
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "battery": f"{self.battery_level:.1f}%",
-            "status": self.current_status,
-            "session_time": self.get_session_duration()
-        }
+        alert = AlertRecord.create(
+            self.alert_count, ALERT_DROWSINESS,
+            condition=random.choice(self.alert_conditions),
+            action=self.get_alert_action(),
+            response=random.choice(self.user_responses),
+            status=self.current_status,
+            battery=self.battery_level,
+            session_seconds=self.get_session_seconds(),
+            timestamp=current_time,
+        )
         
-        self.new_alerts.append(alert)
         self.performance_metrics['total_alerts'] += 1
+        self.metrics_version += 1
+        priority = PRIORITY_CRITICAL if self.current_status == 1 else (
+            PRIORITY_HIGH if self.current_status == 2 else PRIORITY_NORMAL)
+        self.add_alert(alert, priority)
         
-        print(f"ALERT GENERATED: {alert['condition']} (Status: {self.current_status})")
+        print(f"ALERT GENERATED: {CONDITIONS[alert.condition]} (Status: {self.current_status})")
 
     def create_battery_alert(self):
         """Create battery-specific alert"""
         if self.battery_level < 20:
-            battery_alert = {
-                "id": f"B{self.alert_count:03d}",
-                "title": "Low Battery Warning",
-                "user": "System",
-                "condition": f"Battery level critically low: {self.battery_level:.1f}%",
-                "action": "Battery warning notification sent",
-                "response": "Charge device immediately",
-                "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "battery": f"{self.battery_level:.1f}%",
-                "status": "critical"
-            }
+            battery_alert = AlertRecord.create(
+                self.alert_count, ALERT_BATTERY, COND_BATTERY_LOW, ACTION_BATTERY,
+                RESPONSE_CHARGE, status=0, battery=self.battery_level,
+            )
             
-            self.new_alerts.append(battery_alert)
+            self.add_alert(battery_alert, PRIORITY_HIGH, key="battery")
             print(f"BATTERY ALERT: {self.battery_level:.1f}%")
 
+    def create_closure_alert(self):
+        """Create an alert for a critical eye closure from the real sensor"""
+        self.alert_count += 1
+        alert = AlertRecord.create(
+            self.alert_count, ALERT_DROWSINESS, COND_EYES_CLOSED,
+            action=self.get_alert_action(),
+            response=RESPONSE_PENDING,
+            status=self.current_status,
+            battery=self.battery_level,
+            session_seconds=self.get_session_seconds(),
+        )
+        self.performance_metrics['total_alerts'] += 1
+        self.metrics_version += 1
+        self.add_alert(alert, PRIORITY_CRITICAL)
+
+    def add_alert(self, alert, priority=PRIORITY_NORMAL, key=None):
+        """Queue an alert for the dashboard - repeats coalesce, overflow is policed"""
+        # Queued for the store's writer - an SQLite commit could stall sampling
+        if self.alert_store is not None and isinstance(alert, AlertRecord):
+            self.alert_store.submit(alert)
+        if not self.new_alerts.push(alert, priority, key):
+            print(f"Alert dropped (queue full): {as_dict(alert).get('title', 'Alert')}")
+        if isinstance(alert, AlertRecord):
+            self.log_event(EVENT_ALERT, alert.pack())
+            if self.rollups is not None:
+                self.rollups.add_alert(self.rollup_time())
+        for subscription in self.alert_subscribers:
+            subscription.offer(alert)
+
     def get_alert_action(self):
-        """Generate appropriate alert action based on status"""
-        actions = {
-            1: "Emergency alert - Buzzer + Vibration + Visual",
-            2: "High priority - Buzzer + Vibration", 
-            3: "Standard alert - Vibration only",
-            4: "Low priority - Visual notification",
-            5: "Information only - Status update"
-        }
-        return actions.get(self.current_status, "Alert notification sent")
+        """Action code for the current status - see records.ACTIONS"""
+        if 1 <= self.current_status <= 5:
+            return self.current_status
+        return ACTION_NOTIFY
 
-    def get_session_duration(self):
-        """Get current session duration"""
-        duration = time.time() - self.session_start
-        hours = int(duration // 3600)
-        minutes = int((duration % 3600) // 60)
-        return f"{hours}H{minutes:02d}m"
+    def get_session_seconds(self):
+        """Seconds since the session started"""
+        return time.time() - self.session_start
 
     def update_system_metrics(self):
         """Update system performance metrics"""
+        # Edge-triggered loops wake irregularly - keep the legacy ~10 Hz cadence
+        now = time.monotonic()
+        if now - self.last_metrics_update < 0.1:
+            return
+        self.last_metrics_update = now
+
         # Simulate performance changes
         if random.random() < 0.01:  # 1% chance per cycle
             self.performance_metrics['response_rate'] += random.uniform(-2, 3)
@@ -244,55 +383,169 @@ class SensorMonitor(threading.Thread):
             
             self.performance_metrics['avg_response_time'] += random.uniform(-0.5, 0.5)  
             self.performance_metrics['avg_response_time'] = max(1.0, min(5.0, self.performance_metrics['avg_response_time']))
+            self.metrics_version += 1
 
-    def activate_all_alerts(self):
-        """Activate all alert mechanisms"""
-        if IS_RASPBERRY_PI:
-            GPIO.output(self.buzzer_pin, GPIO.HIGH)
-            GPIO.output(self.motor_pin, GPIO.LOW)  # Active low
+    def store_sample(self, timestamp, eyes_closed):
+        """Append a raw sample to this session's column files, if there is a sample store"""
+        store = self.sample_store
+        if store is None:
+            return
+        # Sessions switch here, on the sampling thread, so the store has a single writer
+        if self.stored_session != self.session_start:
+            self.stored_session = self.session_start
+            store.start_session(self.session_start)
+        try:
+            store.append(timestamp, eyes_closed, self.battery_level)
+        except OSError as e:
+            print(f"Sample store write failed: {e}")
+
+    def rollup_time(self):
+        """Now on the rollups' clock - monotonic time shifted by clock_offset, as samples are"""
+        return time.monotonic() + self.clock_offset
+
+    def update_rollups(self):
+        """Feed blink and status changes to the rollups and close buckets that have ended"""
+        rollups = self.rollups
+        if rollups is None:
+            return
+        now = self.rollup_time()
+        rollups.tick(now)
+        if self.blink_count > self.rolled_blinks:
+            rollups.add_blinks(self.blink_count - self.rolled_blinks, now)
+        self.rolled_blinks = self.blink_count  # Also follows session resets down to 0
+        if self.current_status != rollups.status:
+            rollups.set_status(self.current_status, now)
+
+    def log_event(self, kind, payload):
+        """Append to the event log, if there is one - queues only, the log's writer does the I/O"""
+        if self.event_log is not None:
+            self.last_event_seq = self.event_log.append(kind, payload)
+
+    def log_state(self):
+        """Log status, blink count and whole-percent battery changes"""
+        if self.event_log is None:
+            return
+        state = (self.current_status, self.blink_count, int(self.battery_level))
+        previous = self.logged_state
+        if state == previous:
+            return
+        self.logged_state = state
+        if previous is None or state[0] != previous[0]:
+            self.log_event(EVENT_STATUS, STATUS_PAYLOAD.pack(state[0]))
+        if previous is None or state[1] != previous[1]:
+            self.log_event(EVENT_BLINKS, BLINKS_PAYLOAD.pack(state[1]))
+        if previous is None or state[2] != previous[2]:
+            self.log_event(EVENT_BATTERY, BATTERY_PAYLOAD.pack(self.battery_level))
+
+    def session_state(self):
+        """Current SessionState, as of the last logged event"""
+        return SessionState(self.last_event_seq, time.time(), self.session_start, self.blink_count,
+                            self.alert_count, self.battery_level, self.current_status)
+
+    def checkpoint(self):
+        """Hand the session state to the checkpointer when one is due - its thread does the I/O"""
+        checkpointer = self.checkpointer
+        if checkpointer is not None and checkpointer.due(time.monotonic()):
+            checkpointer.submit(self.session_state())
+
+    def resume_session(self):
+        """Restore the last checkpoint plus the log tail after it. Returns True if a session resumed."""
+        if self.checkpointer is None:
+            return False
+        try:
+            state, replayed, elapsed = self.checkpointer.restore()
+        except Exception as e:
+            print(f"Session resume failed: {e}")
+            return False
+        if state is None:
+            return False
+        self.session_start = state.session_start
+        self.blink_count = self.detector.blink_count = state.blink_count
+        self.alert_count = state.alert_count
+        self.battery_level = state.battery_level
+        if state.current_status:
+            self.current_status = state.current_status
+        self.rolled_blinks = self.blink_count  # Already in the rollups
+        self.last_event_seq = state.seq
+        print(f"Resumed session from {datetime.fromtimestamp(state.session_start):%H:%M} "
+              f"({replayed} events replayed in {elapsed * 1000:.1f} ms)")
+        return True
+
+    def update_link(self):
+        """Refresh link stats from the backend's heartbeats, announcing status changes"""
+        if self.link is None:
+            return
+        stats = self.link.get_stats()
+        previous = self.link_stats.status
+        self.link_stats = stats
+        if stats.status == previous:
+            return
+        if stats.status == CONNECTED:
+            if previous == DISCONNECTED and stats.reconnects:
+                self.trigger_alert("Glasses link restored")
+        elif stats.status == DEGRADED:
+            self.trigger_alert(f"Glasses link degraded ({stats.latency_ms:.0f} ms, {stats.loss_pct:.0f}% loss)")
         else:
-            self.buzzer_on = True
-            self.motor_on = False
+            self.trigger_alert("Glasses link lost - reconnecting")
+
+    def activate_all_alerts(self):
+        """Activate all alert mechanisms - escalating buzzer over vibration"""
+        self.actuators.play(CRITICAL_ESCALATION)
+        if self.gpio is None:
             print("🚨 FULL ALERT ACTIVATED: Buzzer + Vibration")
 
     def activate_vibration(self):
-        """Activate vibration only"""
-        if IS_RASPBERRY_PI:
-            GPIO.output(self.motor_pin, GPIO.LOW)
-        else:
-            self.motor_on = False
+        """Activate vibration only - pulsed"""
+        self.actuators.play(VIBRATION_PULSE)
+        if self.gpio is None:
             print("📳 Vibration alert activated")
 
     def deactivate_alerts(self):
         """Deactivate all alert mechanisms"""
-        if IS_RASPBERRY_PI:
-            GPIO.output(self.buzzer_pin, GPIO.LOW)
-            GPIO.output(self.motor_pin, GPIO.HIGH)
-        else:
-            self.buzzer_on = False
-            self.motor_on = True
+        self.actuators.stop_pattern()
 
     def trigger_alert(self, message):
         """Trigger alert with logging"""
         if self.dashboard and hasattr(self.dashboard, 'update_status'):
             self.dashboard.update_status(message)
+        if self.ui_channel is not None:
+            self.ui_channel.post('message', message)
         print(f"ALERT: {message}")
 
+    def publish_snapshot(self):
+        """Publish a new dashboard snapshot if anything changed since the last one"""
+        with self.publish_lock:
+            previous = self.snapshots.current
+            snapshot = self.snapshots.publish(
+                battery_level=self.battery_level,
+                current_status=self.current_status,
+                alert_count=self.alert_count,
+                blink_count=self.blink_count,
+                session_start=self.session_start,
+                link=self.link_stats,
+                alerts_version=self.new_alerts.version,
+                alerts=self.new_alerts,
+                metrics_version=self.metrics_version,
+                metrics=self.performance_metrics,
+            )
+            # Seqlock has a single writer - publish_lock keeps it that way. An unchanged
+            # snapshot is rewritten once per heartbeat, so the UI process sees the loop is alive
+            if self.shared_state is not None:
+                now = time.time()
+                if snapshot is not previous or now - self.shared_written >= HEARTBEAT_INTERVAL:
+                    self.shared_state.write_snapshot(snapshot, self.new_alerts.pushed, now)
+                    self.shared_written = now
+        if snapshot is not previous and self.ui_channel is not None:
+            self.ui_channel.post('snapshot', snapshot)
+        return snapshot
+
+    def get_snapshot(self):
+        """Latest published MonitorSnapshot - O(1), no locking"""
+        return self.snapshots.current
+
     def get_dashboard_data(self):
         """Get comprehensive data for dashboard"""
-        session_duration = time.time() - self.session_start
-        
-        return {
-            "battery_level": max(0, self.battery_level),
-            "current_status": self.current_status,
-            "alert_count": self.alert_count,
-            "new_alerts": self.new_alerts.copy(),
-            "blink_count": self.blink_count,
-            "session_duration": session_duration,
-            "performance_metrics": self.performance_metrics.copy(),
-            "connectivity_status": True,  # Simulated - replace with real check
-            "last_update": datetime.now().isoformat()
-        }
+        return self.get_snapshot().as_dashboard_data()
 
     def get_alerts_data(self):
         """Get alerts specifically formatted for alerts page"""
@@ -306,44 +559,90 @@ class SensorMonitor(threading.Thread):
                 "date": alert.get("date", datetime.now().strftime("%Y-%m-%d %H:%M")),
                 "live": True
             }
-            for alert in self.new_alerts
+            for alert in map(as_dict, self.get_snapshot().new_alerts)
         ]
 
+    def take_alerts(self):
+        """Remove and return all pending alerts, oldest first"""
+        alerts = self.new_alerts.drain()
+        if alerts:
+            self.publish_snapshot()
+        return alerts
+
+    def get_sampling_stats(self):
+        """Time spent at each adaptive sampling rate, or None if the rate is fixed"""
+        if self.sampling_policy is None:
+            return None
+        return self.sampling_policy.get_stats(time.monotonic())
+
+    def stream(self, maxlen=1024):
+        """Raw samples for `async for sample in monitor.stream()` - call from the consumer's loop.
+
+        Yields Sample(timestamp, eyes_closed, state). A consumer that falls
+        more than maxlen samples behind loses the oldest ones; see
+        subscription.dropped.
+        """
+        subscription = AsyncSubscription(maxlen, on_close=self.unsubscribe)
+        self.stream_subscribers = self.stream_subscribers + [subscription]
+        return subscription
+
+    def alerts(self, maxlen=256):
+        """Alerts for `async for alert in monitor.alerts()` - call from the consumer's loop"""
+        subscription = AsyncSubscription(maxlen, on_close=self.unsubscribe)
+        self.alert_subscribers = self.alert_subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Drop a stream() or alerts() subscription"""
+        # Lists are replaced, never mutated, so the sensor thread can iterate them unlocked
+        self.stream_subscribers = [s for s in self.stream_subscribers if s is not subscription]
+        self.alert_subscribers = [s for s in self.alert_subscribers if s is not subscription]
+
+    def get_jitter_stats(self):
+        """Inter-sample interval statistics for the sampling loop, in ms"""
+        return self.jitter.get_stats()
+
+    def get_alert_stats(self):
+        """Alert queue occupancy, coalescing and overflow statistics"""
+        return self.new_alerts.get_stats()
+
     def clear_alerts(self):
         """Clear processed alerts"""
-        cleared_count = len(self.new_alerts)
-        self.new_alerts = []
+        cleared_count = self.new_alerts.clear()
+        self.publish_snapshot()
         if cleared_count > 0:
             print(f"Cleared {cleared_count} processed alerts")
 
-    def get_performance_history(self):
-        """Get performance data for charts"""
-        # Generate realistic performance history
-        base_performance = self.performance_metrics['response_rate']
-        history = []
-        
-        for i in range(7):  # Last 7 data points
-            variation = random.uniform(-5, 5)
-            value = max(70, min(100, base_performance + variation))
-            history.append(int(value))
-        
-        return history
+    def get_performance_history(self, days=7):
+        """[(weekday, alertness %)] per day from the rollups, today last - None for days without data"""
+        if self.rollups is None:
+            return []
+        return daily_alertness(RollupReader(self.rollups.directory), days)
 
     def reset_session(self):
         """Reset session data"""
         self.session_start = time.time()
+        self.detector.reset(time.monotonic())
         self.blink_count = 0
         self.alert_count = 0
-        self.new_alerts = []
+        self.new_alerts.clear()
+        self.log_event(EVENT_SESSION, SESSION_PAYLOAD.pack(self.session_start))
+        self.publish_snapshot()
         print("Session data reset")
 
-    def stop(self):
-        """Stop the monitoring thread"""
+    def stop(self, timeout=2.0):
+        """Stop the monitoring thread and wait for it - it releases the hardware on its way out"""
         self.running = False
-        self.deactivate_alerts()
-        
-        if IS_RASPBERRY_PI and GPIO:
-            GPIO.cleanup()
+        for subscription in self.stream_subscribers + self.alert_subscribers:
+            subscription.close()
+
+        if self.ident is None:
+            self.release_hardware()  # Never started - nothing else will
+        elif self is not threading.current_thread():
+            self.join(timeout)
+            if self.is_alive():
+                print("Sensor monitor still busy - it cleans up when its loop exits")
+                return
         
         print("Sensor monitor stopped and cleaned up")
 
@@ -0,0 +1,300 @@
+# sensor_process.py - Run SensorMonitor in its own process, read its state from shared memory
+import multiprocessing
+import queue
+import threading
+import time
+
+from monitor_snapshot import MonitorSnapshot, EMPTY_METRICS
+from records import encode_alerts, decode_alerts
+from shared_state import (SharedStateReader, SharedStateWriter, create_block, link_stats,
+                          HEARTBEAT_INTERVAL, MISSED_HEARTBEATS)
+from link_monitor import LinkStats, DISCONNECTED, DEGRADED
+from event_log import EventLog
+from alert_store import AlertStore
+from sample_store import SampleStore
+from rollups import RollupEngine
+from checkpoint import Checkpointer
+
+# How often the UI side checks the shared record for a new version (seconds)
+STATE_POLL_INTERVAL = 0.02
+
+# How often the sensing process reports its sampling jitter (seconds)
+JITTER_REPORT_INTERVAL = 1.0
+
+# Link shown before the sensing process publishes, or after it dies
+LOST_LINK = LinkStats(DISCONNECTED, 0.0, 0.0, 0)
+
+
+class _EventForwarder:
+    """Stands in for UIEventChannel inside the sensing process.
+
+    Snapshots already go through shared memory, so only status messages
+    are forwarded to the UI process.
+    """
+
+    def __init__(self, events):
+        self.events = events
+
+    def post(self, kind, payload=None):
+        if kind == 'message':
+            self.events.put(('message', payload))
+
+
+def _sensor_main(state_name, commands, events, backend_kind, backend_options, monitor_options,
+                 event_log_dir=None, alert_store_path=None, sample_dir=None, rollup_dir=None,
+                 checkpoint_path=None):
+    """Sensing process entry point - runs until a 'stop' command arrives"""
+    from sensor_monitor import SensorMonitor
+    from sensor_backends import create_backend
+
+    writer = SharedStateWriter(state_name, create=False)
+    backend = create_backend(backend_kind, **backend_options) if backend_kind else None
+    # The log is written from this process, next to the monitor that feeds it
+    event_log = EventLog(event_log_dir) if event_log_dir else None
+    alert_store = AlertStore(alert_store_path) if alert_store_path else None
+    sample_store = SampleStore(sample_dir) if sample_dir else None
+    rollups = RollupEngine(rollup_dir) if rollup_dir else None
+    checkpointer = Checkpointer(checkpoint_path, event_log) if checkpoint_path else None
+    monitor = SensorMonitor(backend=backend, ui_channel=_EventForwarder(events), shared_state=writer,
+                            event_log=event_log, alert_store=alert_store, sample_store=sample_store,
+                            rollups=rollups, checkpointer=checkpointer, **monitor_options)
+    monitor.start()
+    next_report = time.monotonic() + JITTER_REPORT_INTERVAL
+
+    try:
+        while True:
+            try:
+                command = commands.get(timeout=0.05)
+            except queue.Empty:
+                command = None
+            except (EOFError, OSError):
+                break  # UI process went away
+
+            # Alerts are rare and variable-sized - they travel by queue, not shared memory
+            alerts = monitor.take_alerts()
+            if alerts:
+                events.put(('alerts', encode_alerts(alerts)))
+
+            if command == 'stop':
+                break
+            if command in ('reset_session', 'clear_alerts'):
+                getattr(monitor, command)()
+            if command == 'jitter' or time.monotonic() >= next_report:
+                events.put(('jitter', monitor.get_jitter_stats()))
+                next_report = time.monotonic() + JITTER_REPORT_INTERVAL
+    finally:
+        monitor.stop()
+        if event_log is not None:
+            event_log.close()
+        if alert_store is not None:
+            alert_store.close()
+        writer.buf = None
+        writer.shm.close()
+
+
+class SensorProcess:
+    """UI-side handle for a SensorMonitor running in a child process.
+
+    Offers the parts of the SensorMonitor API the pages use. Dashboard
+    state is read from a fixed-layout shared memory record (see
+    shared_state.py) with no pickling; alerts arrive on a queue as packed
+    AlertRecords, status messages as text. With a ui_channel, a pump thread posts 'snapshot' events
+    whenever the record changes, and 'message' events as they arrive, so
+    pages subscribe exactly as they do for the in-process monitor.
+    """
+
+    def __init__(self, ui_channel=None, backend_kind=None, backend_options=None, event_log_dir=None,
+                 alert_store_path=None, sample_dir=None, rollup_dir=None,
+                 checkpoint_path=None, **monitor_options):
+        self.ui_channel = ui_channel
+        self.event_log_dir = event_log_dir  # The child writes its EventLog here
+        self.alert_store_path = alert_store_path  # ...and inserts alerts into this database
+        self.sample_dir = sample_dir  # ...and raw sample columns under this directory
+        self.rollup_dir = rollup_dir  # ...and rollup tiers here
+        self.checkpoint_path = checkpoint_path  # ...and resumes its session from this checkpoint
+        self.backend_kind = backend_kind
+        self.backend_options = backend_options or {}
+        self.monitor_options = monitor_options
+        context = multiprocessing.get_context("spawn")
+        self.commands = context.Queue()
+        self.events = context.Queue()
+        self.context = context
+        self.process = None
+        self.shm = None
+        self.reader = None
+        self.pump = None
+        self.running = False
+
+        # Alerts received from the child and not yet taken by the UI
+        self.lock = threading.Lock()
+        self.pending_alerts = []
+        self.snapshot = None
+        self.snapshot_key = None
+        self.version = 0
+        self.jitter_stats = {"samples": 0}
+        self.jitter_updated = threading.Event()
+
+    def start(self):
+        """Create the shared record and spawn the sensing process"""
+        self.shm = create_block()
+        self.reader = SharedStateReader(self.shm.name)
+        self.process = self.context.Process(
+            target=_sensor_main, name="sensor-monitor",
+            args=(self.shm.name, self.commands, self.events, self.backend_kind,
+                  self.backend_options, self.monitor_options, self.event_log_dir,
+                  self.alert_store_path, self.sample_dir, self.rollup_dir,
+                  self.checkpoint_path),
+            daemon=True,
+        )
+        self.process.start()
+        self.running = True
+        self.pump = threading.Thread(target=self._pump, name="sensor-process-pump", daemon=True)
+        self.pump.start()
+        print(f"Sensor monitor started in process {self.process.pid}")
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def _pump(self):
+        """Forward child events and record changes to the UI channel"""
+        while self.running:
+            try:
+                kind, payload = self.events.get(timeout=STATE_POLL_INTERVAL)
+            except queue.Empty:
+                kind = payload = None
+            except (EOFError, OSError, ValueError):
+                break
+
+            if kind == 'alerts':
+                with self.lock:
+                    self.pending_alerts.extend(decode_alerts(payload))
+            elif kind == 'jitter':
+                self.jitter_stats = payload
+                self.jitter_updated.set()
+            elif kind == 'message' and self.ui_channel is not None:
+                self.ui_channel.post('message', payload)
+
+            previous = self.snapshot
+            snapshot = self.get_snapshot()
+            if snapshot is not previous and self.ui_channel is not None:
+                self.ui_channel.post('snapshot', snapshot)
+
+    def heartbeat(self, record):
+        """DISCONNECTED if the child is gone or has missed MISSED_HEARTBEATS heartbeats,
+        DEGRADED once one is late, else None"""
+        if not self.is_alive():
+            return DISCONNECTED
+        silence = time.time() - record.published_at
+        if silence > HEARTBEAT_INTERVAL * MISSED_HEARTBEATS:
+            return DISCONNECTED
+        if silence > HEARTBEAT_INTERVAL * 1.5:
+            return DEGRADED
+        return None
+
+    def get_snapshot(self):
+        """Latest state as a MonitorSnapshot - rebuilt only when the record, pending alerts or heartbeat change"""
+        record = self.reader.read() if self.reader is not None else None
+        health = self.heartbeat(record) if record is not None else None
+        with self.lock:
+            alerts = tuple(self.pending_alerts)
+            key = (record, len(alerts), health)
+            if key == self.snapshot_key and self.snapshot is not None:
+                return self.snapshot
+            self.snapshot_key = key
+            self.version += 1
+            if record is None:
+                self.snapshot = MonitorSnapshot(
+                    version=self.version, battery_level=0.0, current_status=0, alert_count=0,
+                    new_alerts=alerts, blink_count=0, session_start=time.time(),
+                    performance_metrics=EMPTY_METRICS, connectivity_status=False,
+                    link=LOST_LINK, published_at=time.time(),
+                )
+            else:
+                # A dead or hung sensing process leaves its last record behind - don't trust its link
+                link = link_stats(record)
+                if health == DISCONNECTED:
+                    link = LOST_LINK
+                elif health == DEGRADED and link.status != DISCONNECTED:
+                    link = link._replace(status=DEGRADED)
+                self.snapshot = MonitorSnapshot(
+                    version=self.version,
+                    battery_level=record.battery_level,
+                    current_status=record.current_status,
+                    alert_count=record.alert_count,
+                    new_alerts=alerts,
+                    blink_count=record.blink_count,
+                    session_start=record.session_start,
+                    performance_metrics=EMPTY_METRICS,
+                    connectivity_status=link.status != DISCONNECTED,
+                    link=link,
+                    published_at=record.published_at,
+                )
+            return self.snapshot
+
+    def get_dashboard_data(self):
+        return self.get_snapshot().as_dashboard_data()
+
+    def get_alerts_data(self):
+        """Pending alerts in the Alerts page format"""
+        return [dict(alert.to_dict(), live=True) for alert in self.get_snapshot().new_alerts]
+
+    def take_alerts(self):
+        """Remove and return all alerts received so far, oldest first"""
+        with self.lock:
+            alerts, self.pending_alerts = self.pending_alerts, []
+        return alerts
+
+    def get_jitter_stats(self, wait=0):
+        """Sampling jitter reported by the child, optionally waiting up to `wait` s for a fresh report"""
+        if wait and self.is_alive():
+            self.jitter_updated.clear()
+            self.commands.put('jitter')
+            self.jitter_updated.wait(wait)
+        return self.jitter_stats
+
+    def reset_session(self):
+        self.commands.put('reset_session')
+
+    def clear_alerts(self):
+        with self.lock:
+            self.pending_alerts = []
+        self.commands.put('clear_alerts')
+
+    def stop(self, timeout=3.0):
+        """Stop the child, then release the shared record. Safe to call twice."""
+        if self.process is None:
+            return
+        self.running = False
+        try:
+            self.commands.put('stop')
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            print("Sensor process did not stop in time - terminating")
+            self.process.terminate()
+            self.process.join(1)
+        if self.pump is not None:
+            self.pump.join(timeout=1)
+        self.process = None
+
+        self.reader.close()
+        self.reader = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+        print("Sensor process stopped")
+
+
+# Run the synthetic backend out of process and watch the shared record
+if __name__ == "__main__":
+    sensor = SensorProcess(backend_kind='synthetic', backend_options={'rate_hz': 200, 'seed': 1})
+    sensor.start()
+    try:
+        for _ in range(10):
+            time.sleep(0.5)
+            snapshot = sensor.get_snapshot()
+            print(f"status={snapshot.current_status} blinks={snapshot.blink_count} "
+                  f"alerts={snapshot.alert_count} pending={len(sensor.take_alerts())}")
+    finally:
+        sensor.stop()
@@ -0,0 +1,200 @@
+# shared_state.py - Fixed-layout monitor state in shared memory, guarded by a seqlock
+import struct
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+from link_monitor import LINK_STATUSES, LinkStats, CONNECTED
+
+# Record layout (little endian, no padding):
+#   sequence       u64  seqlock counter - odd while a write is in progress
+#   version        u64  MonitorSnapshot.version
+#   current_status i32  1-5 scale
+#   blink_count    u32
+#   alert_count    u32
+#   connectivity   u8   index into link_monitor.LINK_STATUSES (1 = connected)
+#   alert_seq      u64  bumps whenever an alert is queued
+#   battery_level  f64
+#   session_start  f64  epoch seconds
+#   published_at   f64  epoch seconds
+#   link_latency   f32  ms
+#   link_loss      f32  percent
+#   reconnects     u32
+SEQUENCE = struct.Struct('<Q')
+BODY = struct.Struct('<QiIIBQdddffI')
+BODY_OFFSET = SEQUENCE.size
+RECORD_SIZE = BODY_OFFSET + BODY.size
+
+# The writer republishes at least this often (seconds), with a fresh published_at,
+# so readers can tell a hung sensing loop from one with nothing new to say
+HEARTBEAT_INTERVAL = 1.0
+# Records older than this many heartbeats mean the writer has stopped
+MISSED_HEARTBEATS = 3
+
+SharedStateRecord = namedtuple('SharedStateRecord', (
+    'version', 'current_status', 'blink_count', 'alert_count',
+    'connectivity_status', 'alert_seq', 'battery_level', 'session_start',
+    'published_at', 'link_latency', 'link_loss', 'reconnects',
+))
+
+
+class SharedStateWriter:
+    """Single writer for the shared state record - lives in the sensing process.
+
+    Creates the shared memory block (or attaches to `name`) and publishes
+    records with a seqlock: the sequence is made odd, the body written and
+    the sequence made even again. Only one process may write.
+    """
+
+    def __init__(self, name=None, create=True):
+        if create:
+            self.shm = create_block(name)
+        else:
+            self.shm = attach(name)
+        self.owner = create
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self.sequence = SEQUENCE.unpack_from(self.buf, 0)[0] & ~1
+        self.writes = 0
+
+    def write(self, version, current_status, blink_count, alert_count,
+              connectivity_status, alert_seq, battery_level, session_start,
+              published_at=None, link_latency=0.0, link_loss=0.0, reconnects=0):
+        """Publish one record - connectivity_status is a link status name"""
+        if published_at is None:
+            published_at = time.time()
+        buf = self.buf
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, 0, self.sequence)
+        BODY.pack_into(buf, BODY_OFFSET, version, int(current_status), blink_count,
+                       alert_count, LINK_STATUSES.index(connectivity_status), alert_seq,
+                       battery_level, session_start, published_at,
+                       link_latency, link_loss, reconnects)
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, 0, self.sequence)
+        self.writes += 1
+
+    def write_snapshot(self, snapshot, alert_seq, published_at=None):
+        """Publish the fields of a MonitorSnapshot - published_at overrides the snapshot's for heartbeats"""
+        link = snapshot.link
+        self.write(snapshot.version, snapshot.current_status, snapshot.blink_count,
+                   snapshot.alert_count, link.status, alert_seq,
+                   snapshot.battery_level, snapshot.session_start,
+                   snapshot.published_at if published_at is None else published_at,
+                   link.latency_ms, link.loss_pct, link.reconnects)
+
+    def close(self):
+        """Detach, and remove the block if this writer created it"""
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def link_stats(record):
+    """LinkStats from a record's link fields (f32 values rounded back to display precision)"""
+    return LinkStats(LINK_STATUSES[record.connectivity_status], round(record.link_latency, 1),
+                     round(record.link_loss, 1), record.reconnects)
+
+
+class SharedStateReader:
+    """Lock-free reader for the shared state record - lives in the UI process.
+
+    read() unpacks straight from the shared buffer (no pickling, no
+    intermediate copy) and retries while a write is in progress or the
+    sequence moved underneath it.
+    """
+
+    def __init__(self, name):
+        self.shm = attach(name)
+        self.name = name
+        self.buf = self.shm.buf
+        self.reads = 0
+        self.retries = 0
+
+    def sequence(self):
+        """Current seqlock counter - cheap change check between full reads"""
+        return SEQUENCE.unpack_from(self.buf, 0)[0]
+
+    def read(self, max_retries=10000):
+        """Return a consistent SharedStateRecord, or None if nothing was published yet"""
+        buf = self.buf
+        for _ in range(max_retries):
+            before = SEQUENCE.unpack_from(buf, 0)[0]
+            if before & 1:
+                self.retries += 1
+                time.sleep(0)  # let the writer finish
+                continue
+            body = BODY.unpack_from(buf, BODY_OFFSET)
+            if SEQUENCE.unpack_from(buf, 0)[0] == before:
+                self.reads += 1
+                if before == 0:
+                    return None
+                return SharedStateRecord._make(body)
+            self.retries += 1
+            time.sleep(0)
+        raise RuntimeError(f"Shared state '{self.name}' did not settle after {max_retries} retries")
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+def create_block(name=None):
+    """Create a zeroed shared memory block sized for one record"""
+    shm = shared_memory.SharedMemory(name=name, create=True, size=RECORD_SIZE)
+    shm.buf[:RECORD_SIZE] = bytes(RECORD_SIZE)
+    return shm
+
+
+def attach(name):
+    """Attach to an existing block.
+
+    multiprocessing children share their parent's resource tracker, so the
+    block stays registered once and is released by the creator's unlink().
+    """
+    return shared_memory.SharedMemory(name=name)
+
+
+def _writer_process(name, count):
+    """Benchmark writer - publishes `count` records as fast as possible"""
+    writer = SharedStateWriter(name, create=False)
+    for i in range(1, count + 1):
+        writer.write(i, 1 + i % 5, i, i // 10, CONNECTED, i // 10, 85.0 - i * 1e-6, 0.0, float(i))
+    writer.buf = None
+    writer.shm.close()
+
+
+# Check seqlock consistency across processes when run directly
+if __name__ == "__main__":
+    import multiprocessing
+
+    total = 200000
+    owner = SharedStateWriter()
+    reader = SharedStateReader(owner.name)
+    print(f"Shared state '{owner.name}': {RECORD_SIZE} bytes")
+
+    process = multiprocessing.Process(target=_writer_process, args=(owner.name, total))
+    started = time.perf_counter()
+    process.start()
+
+    reads = torn = 0
+    last_version = 0
+    while process.is_alive() or last_version < total:
+        record = reader.read()
+        if record is None:
+            continue
+        reads += 1
+        # Every field of a record derives from its version - any mismatch is a torn read
+        if record.blink_count != record.version or record.published_at != float(record.version):
+            torn += 1
+        last_version = record.version
+        if not process.is_alive() and last_version == total:
+            break
+    elapsed = time.perf_counter() - started
+    process.join()
+
+    print(f"{reads:,} reads in {elapsed:.2f}s ({reads / elapsed:,.0f} reads/s), "
+          f"{reader.retries:,} retries, {torn} torn, last version {last_version}")
+    reader.close()
+    owner.close()
@@ -0,0 +1,387 @@
+# sync_engine.py - Batched, compressed, resumable upload of unsynced events
+import json
+import os
+import random
+import struct
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+
+from event_log import EVENT_ALERT
+
+# Each event in a chunk: seq u64, kind u8, length u32, then `length` bytes
+EVENT_HEADER = struct.Struct('<QBI')
+
+DEFAULT_ENDPOINT = "http://127.0.0.1:8787/neurolens/sync"
+
+# HTTP statuses worth retrying - everything else in 4xx is a permanent failure
+RETRYABLE_STATUS = (408, 425, 429, 500, 502, 503, 504)
+
+
+class SyncOutbox:
+    """In-memory queue of events waiting to be synced, numbered by sequence.
+
+    Sequence numbers continue from `first_seq` so they stay comparable with
+    a cursor persisted by an earlier run. Anything that can answer
+    read_since(cursor, limit), pending_since(cursor) and discard_through(seq)
+    can stand in for it - the app uses the durable EventLogReader.
+    """
+
+    def __init__(self, first_seq=1):
+        self.lock = threading.Lock()
+        self.events = []  # (seq, kind, payload), oldest first
+        self.next_seq = first_seq
+
+    def __len__(self):
+        return len(self.events)
+
+    def append(self, kind, payload):
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            self.events.append((seq, kind, bytes(payload)))
+            return seq
+
+    def read_since(self, cursor, limit):
+        """Up to `limit` events with seq > cursor, oldest first"""
+        with self.lock:
+            return [event for event in self.events if event[0] > cursor][:limit]
+
+    def pending_since(self, cursor):
+        with self.lock:
+            return sum(1 for event in self.events if event[0] > cursor)
+
+    def discard_through(self, seq):
+        """Forget events up to and including seq once they are synced"""
+        with self.lock:
+            self.events = [event for event in self.events if event[0] > seq]
+
+
+def encode_chunk(events):
+    """Frame and deflate a batch of (seq, kind, payload) events"""
+    parts = []
+    for seq, kind, payload in events:
+        parts.append(EVENT_HEADER.pack(seq, kind, len(payload)))
+        parts.append(payload)
+    return zlib.compress(b"".join(parts), 6)
+
+
+def decode_chunk(body):
+    """Inverse of encode_chunk - returns [(seq, kind, payload)]"""
+    data = zlib.decompress(body)
+    events = []
+    offset = 0
+    while offset < len(data):
+        seq, kind, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        events.append((seq, kind, data[offset:offset + length]))
+        offset += length
+    return events
+
+
+class SyncError(Exception):
+    """A chunk was rejected in a way retrying will not fix"""
+
+
+class SyncEngine:
+    """Push unsynced events to an HTTP endpoint from a background thread.
+
+    Events are read from the outbox after the persisted cursor, in batches
+    of `batch_size`, deflated and POSTed. The endpoint acknowledges a chunk
+    with any 2xx; the cursor then advances to the chunk's last sequence
+    number and is written to `cursor_path` (atomically), so a restart
+    resumes where the last acknowledged chunk ended. Network errors and
+    retryable statuses back off exponentially with jitter. Progress goes
+    to `on_progress(progress_dict)` from the sync thread.
+    """
+
+    def __init__(self, outbox=None, endpoint=DEFAULT_ENDPOINT, cursor_path=None, device_id="glasses-1",
+                 batch_size=500, timeout=10.0, backoff_base=0.5, backoff_max=30.0, max_attempts=8,
+                 on_progress=None):
+        self.endpoint = endpoint
+        self.cursor_path = cursor_path
+        self.device_id = device_id
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_attempts = max_attempts
+        self.on_progress = on_progress
+        self.cursor = self.load_cursor()
+        self.outbox = outbox if outbox is not None else SyncOutbox(self.cursor + 1)
+
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.syncing = False
+
+        # Statistics
+        self.chunks_sent = 0
+        self.events_sent = 0
+        self.bytes_raw = 0
+        self.bytes_sent = 0
+        self.retries = 0
+        self.last_error = None
+        self.last_sync = None
+
+    # Cursor persistence
+
+    def load_cursor(self):
+        if not self.cursor_path:
+            return 0
+        try:
+            with open(self.cursor_path, encoding='utf-8') as f:
+                return int(json.load(f).get("cursor", 0))
+        except (OSError, ValueError):
+            return 0
+
+    def save_cursor(self):
+        if not self.cursor_path:
+            return
+        directory = os.path.dirname(self.cursor_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.cursor_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"cursor": self.cursor, "endpoint": self.endpoint, "saved_at": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.cursor_path)
+
+    # Background thread
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="sync-engine", daemon=True)
+        self.thread.start()
+
+    def request_sync(self):
+        """Ask the sync thread to push everything pending - returns immediately"""
+        self.start()
+        self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            if self.stopping.is_set():
+                break
+            try:
+                self.sync_now()
+            except SyncError as e:
+                self.report("failed", error=str(e))
+            except Exception as e:
+                # e.g. OSError saving the cursor or reading the log - keep the thread for the next try
+                print(f"Sync failed: {e!r}")
+                self.report("failed", error=str(e))
+
+    def stop(self, timeout=2.0):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    # Sync
+
+    def report(self, state, **details):
+        if self.on_progress is not None:
+            progress = {"state": state, "cursor": self.cursor}
+            progress.update(details)
+            try:
+                self.on_progress(progress)
+            except Exception as e:
+                print(f"Sync progress callback failed: {e}")
+
+    def sync_now(self):
+        """Push all pending events. Blocks; returns the number of events sent."""
+        self.syncing = True
+        try:
+            total = self.outbox.pending_since(self.cursor)
+            sent = 0
+            self.report("started", sent=0, total=total)
+            while not self.stopping.is_set():
+                events = self.outbox.read_since(self.cursor, self.batch_size)
+                if not events:
+                    break
+                self.send_chunk(events)
+                sent += len(events)
+                self.report("progress", sent=sent, total=max(total, sent))
+            self.last_sync = time.time()
+            self.last_error = None
+            self.report("done", sent=sent, total=max(total, sent))
+            return sent
+        finally:
+            self.syncing = False
+
+    def send_chunk(self, events):
+        """POST one chunk, retrying with backoff until acknowledged"""
+        raw_size = sum(EVENT_HEADER.size + len(payload) for _, _, payload in events)
+        body = encode_chunk(events)
+        first_seq, last_seq = events[0][0], events[-1][0]
+        request = urllib.request.Request(self.endpoint, data=body, method="POST", headers={
+            "Content-Type": "application/octet-stream",
+            "X-NeuroLens-Device": self.device_id,
+            "X-NeuroLens-First-Seq": str(first_seq),
+            "X-NeuroLens-Last-Seq": str(last_seq),
+            "X-NeuroLens-Events": str(len(events)),
+        })
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                break
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRYABLE_STATUS:
+                    self.last_error = f"HTTP {e.code}"
+                    raise SyncError(f"Endpoint rejected chunk {first_seq}-{last_seq}: HTTP {e.code}") from None
+                error = f"HTTP {e.code}"
+            except (urllib.error.URLError, OSError) as e:
+                error = str(getattr(e, 'reason', e))
+
+            self.last_error = error
+            if attempt == self.max_attempts:
+                raise SyncError(f"Giving up on chunk {first_seq}-{last_seq} after {attempt} attempts: {error}")
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            self.retries += 1
+            self.report("retrying", error=error, attempt=attempt, delay=delay)
+            # Wait on the stop event so stop() does not sit out the backoff
+            if self.stopping.wait(delay):
+                raise SyncError("Sync stopped")
+
+        self.cursor = last_seq
+        self.save_cursor()
+        self.outbox.discard_through(last_seq)
+        self.chunks_sent += 1
+        self.events_sent += len(events)
+        self.bytes_raw += raw_size
+        self.bytes_sent += len(body)
+
+    def get_stats(self):
+        return {
+            "cursor": self.cursor,
+            "pending": self.outbox.pending_since(self.cursor),
+            "chunks_sent": self.chunks_sent,
+            "events_sent": self.events_sent,
+            "bytes_raw": self.bytes_raw,
+            "bytes_sent": self.bytes_sent,
+            "retries": self.retries,
+            "last_error": self.last_error,
+            "last_sync": self.last_sync,
+        }
+
+
+class LocalSyncServer:
+    """Stand-in sync endpoint on localhost for trying the engine without a backend.
+
+    Decodes every chunk it accepts into `received` and answers the first
+    `fail_first` requests with `fail_status` to exercise the retry path.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, path="/neurolens/sync", fail_first=0, fail_status=503):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path != server.path:
+                    self.send_response(404)
+                elif server.failures_left > 0:
+                    server.failures_left -= 1
+                    self.send_response(server.fail_status)
+                else:
+                    try:
+                        events = decode_chunk(body)
+                    except (zlib.error, struct.error):
+                        self.send_response(400)
+                    else:
+                        # Resent chunks overlap what is already stored - keep each seq once
+                        with server.lock:
+                            for event in events:
+                                server.received.setdefault(event[0], event)
+                            server.chunks += 1
+                            server.bytes += len(body)
+                        self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.path = path
+        self.fail_status = fail_status
+        self.failures_left = fail_first
+        self.lock = threading.Lock()
+        self.received = {}
+        self.chunks = 0
+        self.bytes = 0
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.httpd.server_address[1]}{path}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="sync-stand-in", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# Sync alerts to a local stand-in server, with failures and a restart
+if __name__ == "__main__":
+    import tempfile
+    from records import AlertRecord, ALERT_DROWSINESS, DROWSINESS_CONDITIONS, RESPONSE_PENDING
+
+    finished = threading.Event()
+
+    def print_progress(progress):
+        if progress["state"] in ("done", "failed"):
+            finished.set()
+        if progress["state"] == "retrying":
+            print(f"  retrying in {progress['delay']:.2f}s ({progress['error']})")
+        elif progress["state"] in ("done", "failed"):
+            print(f"  {progress['state']}: cursor {progress['cursor']} {progress.get('error', '')}")
+
+    def make_alerts(outbox, count):
+        for i in range(count):
+            record = AlertRecord.create(i + 1, ALERT_DROWSINESS, DROWSINESS_CONDITIONS[i % 7], 1 + i % 5,
+                                        RESPONSE_PENDING, 1 + i % 5, 90.0 - i * 0.01, i * 3)
+            outbox.append(EVENT_ALERT, record.pack())
+
+    cursor_path = os.path.join(tempfile.mkdtemp(), "sync_cursor.json")
+    server = LocalSyncServer(fail_first=2)
+
+    print(f"Run 1: 5000 alerts to {server.url}, first 2 requests fail")
+    engine = SyncEngine(endpoint=server.url, cursor_path=cursor_path, batch_size=1000,
+                        backoff_base=0.05, on_progress=print_progress)
+    make_alerts(engine.outbox, 5000)
+    engine.request_sync()  # Runs on the sync thread
+    finished.wait(30)
+    engine.stop()
+    stats = engine.get_stats()
+    print(f"  {stats['events_sent']} events in {stats['chunks_sent']} chunks, {stats['retries']} retries, "
+          f"{stats['bytes_raw']:,} bytes framed -> {stats['bytes_sent']:,} bytes deflated")
+
+    print("Run 2: restart, resume from the saved cursor while the endpoint is down")
+    server.close()
+    engine = SyncEngine(endpoint=server.url, cursor_path=cursor_path, batch_size=1000,
+                        backoff_base=0.01, max_attempts=3, on_progress=print_progress)
+    print(f"  resumed at cursor {engine.cursor}, outbox continues at seq {engine.outbox.next_seq}")
+    make_alerts(engine.outbox, 1500)
+    try:
+        engine.sync_now()
+    except SyncError as e:
+        print(f"  {e}")
+
+    print("Run 3: endpoint back up")
+    server = LocalSyncServer(port=int(server.url.split(":")[2].split("/")[0]))
+    engine.sync_now()
+    decoded = [AlertRecord.unpack(payload) for _, kind, payload in server.received.values() if kind == EVENT_ALERT]
+    print(f"  server now holds seqs {min(server.received)}-{max(server.received)} "
+          f"({len(decoded)} alerts), cursor {engine.cursor}")
+    server.close()
@@ -0,0 +1,156 @@
+# telemetry_client.py - Simulated glasses sending binary telemetry, and a localhost benchmark
+import argparse
+import random
+import socket
+import time
+
+from telemetry_protocol import pack_sample_into, encode_heartbeat, SAMPLE_FRAME_SIZE
+from telemetry_server import DEFAULT_HOST, DEFAULT_PORT
+
+# Frames per UDP datagram - keeps datagrams under a typical 1500 byte MTU
+UDP_FRAMES_PER_DATAGRAM = 1400 // SAMPLE_FRAME_SIZE
+
+
+class SimulatedGlasses:
+    """One pair of glasses: blinks, occasional long closures, slow battery drain"""
+
+    __slots__ = ('device_id', 'rng', 'seq', 'eyes_closed', 'state_until', 'battery')
+
+    def __init__(self, device_id, seed=None):
+        self.device_id = device_id
+        self.rng = random.Random(device_id if seed is None else seed)
+        self.seq = 0
+        self.eyes_closed = False
+        self.state_until = 0.0
+        self.battery = self.rng.uniform(40.0, 100.0)
+
+    def sample(self, now):
+        """Eye state at `now`, advancing the blink model as needed"""
+        if now >= self.state_until:
+            self.eyes_closed = not self.eyes_closed
+            if self.eyes_closed:
+                long_closure = self.rng.random() < 0.1
+                self.state_until = now + (self.rng.uniform(1.0, 4.0) if long_closure
+                                          else self.rng.uniform(0.1, 0.4))
+            else:
+                self.state_until = now + self.rng.expovariate(0.35)
+            self.battery = max(0.0, self.battery - 0.001)
+        self.seq += 1
+        return self.seq, self.eyes_closed, self.battery
+
+
+class TelemetryClient:
+    """Send frames to a telemetry server over TCP or UDP, batching them into few writes"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, transport="tcp"):
+        self.transport = transport
+        self.address = (host, port)
+        if transport == "tcp":
+            self.sock = socket.create_connection(self.address)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.connect(self.address)
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    def send_samples(self, glasses, now=None):
+        """Send one sample frame for each of `glasses`"""
+        if now is None:
+            now = time.monotonic()
+        per_write = len(glasses) if self.transport == "tcp" else UDP_FRAMES_PER_DATAGRAM
+        buffer = bytearray(min(per_write, len(glasses)) * SAMPLE_FRAME_SIZE)
+        for start in range(0, len(glasses), per_write):
+            offset = 0
+            for device in glasses[start:start + per_write]:
+                seq, eyes_closed, battery = device.sample(now)
+                offset = pack_sample_into(buffer, offset, device.device_id, seq, now, eyes_closed, battery)
+            self._send(memoryview(buffer)[:offset])
+            self.frames_sent += offset // SAMPLE_FRAME_SIZE
+
+    def send_heartbeat(self, device, now=None):
+        device.seq += 1
+        self._send(encode_heartbeat(device.device_id, device.seq,
+                                    time.monotonic() if now is None else now))
+
+    def _send(self, data):
+        if self.transport == "tcp":
+            self.sock.sendall(data)
+        else:
+            try:
+                self.sock.send(data)
+            except (BlockingIOError, ConnectionRefusedError):
+                return  # UDP is lossy by design - the server counts the gap
+        self.bytes_sent += len(data)
+
+    def close(self):
+        self.sock.close()
+
+
+def run_phase(transport, device_count, total_frames, rate, port):
+    """Spawn a server process, stream frames at it, return (client_stats, server_stats)"""
+    import multiprocessing
+    from telemetry_server import run_server_process
+
+    context = multiprocessing.get_context("spawn")
+    ready, stop, results = context.Event(), context.Event(), context.Queue()
+    server = context.Process(target=run_server_process,
+                             args=(DEFAULT_HOST, port, port, ready, stop, results), daemon=True)
+    server.start()
+    if not ready.wait(10):
+        server.terminate()
+        raise RuntimeError("Telemetry server did not start")
+
+    glasses = [SimulatedGlasses(device_id) for device_id in range(1, device_count + 1)]
+    client = TelemetryClient(DEFAULT_HOST, port, transport)
+    rounds = max(1, total_frames // device_count)
+    interval = device_count / rate if rate else 0.0
+
+    started = time.monotonic()
+    next_round = started
+    for _ in range(rounds):
+        if interval:
+            delay = next_round - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_round += interval
+        client.send_samples(glasses)
+    elapsed = time.monotonic() - started
+    client.close()
+
+    stop.set()
+    server_stats = results.get(timeout=10)
+    server.join(5)
+    return {"frames": client.frames_sent, "seconds": elapsed,
+            "frames_per_second": client.frames_sent / elapsed}, server_stats
+
+
+def report(label, client_stats, server_stats):
+    print(f"{label}: sent {client_stats['frames']:,} frames in {client_stats['seconds']:.2f}s "
+          f"({client_stats['frames_per_second']:,.0f}/s), server ingested {server_stats['frames']:,} "
+          f"({server_stats['frames_per_second']:,.0f}/s) from {server_stats['devices']} devices, "
+          f"lost {server_stats['lost']:,}")
+    if "latency_mean_ms" in server_stats:
+        print(f"    latency mean {server_stats['latency_mean_ms']:.3f} ms, "
+              f"p50 {server_stats['latency_p50_ms']:.3f} ms, p99 {server_stats['latency_p99_ms']:.3f} ms, "
+              f"max {server_stats['latency_max_ms']:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the telemetry server on localhost")
+    parser.add_argument("--transport", choices=("tcp", "udp", "both"), default="both")
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=400000, help="frames for the throughput run")
+    parser.add_argument("--rate", type=int, default=5000, help="frames/s for the latency run")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    transports = ("tcp", "udp") if args.transport == "both" else (args.transport,)
+    for transport in transports:
+        report(f"{transport.upper()} throughput", *run_phase(transport, args.devices, args.frames, 0, args.port))
+        report(f"{transport.upper()} paced {args.rate:,} frames/s",
+               *run_phase(transport, args.devices, args.rate * 3, args.rate, args.port))
+
+
+if __name__ == "__main__":
+    main()
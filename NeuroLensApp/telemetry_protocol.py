@@ -0,0 +1,135 @@
+# telemetry_protocol.py - Length-prefixed binary telemetry frames from remote glasses
+import struct
+from collections import namedtuple
+
+PROTOCOL_VERSION = 1
+
+# Frame types
+FRAME_SAMPLE = 1     # One eye-state sample with battery level
+FRAME_HEARTBEAT = 2  # Keep-alive, no payload
+
+# Header (little endian): length u16 (bytes after the length field), version u8,
+# type u8, device id u32, sequence u32, sender timestamp f64 (seconds)
+LENGTH = struct.Struct('<H')
+HEADER = struct.Struct('<HBBIId')
+SAMPLE_PAYLOAD = struct.Struct('<?f')   # eyes_closed, battery level (%)
+
+HEADER_SIZE = HEADER.size
+SAMPLE_FRAME_SIZE = HEADER_SIZE + SAMPLE_PAYLOAD.size
+HEARTBEAT_FRAME_SIZE = HEADER_SIZE
+MAX_FRAME_SIZE = 1024  # Anything larger is treated as a corrupt stream
+
+# Smallest frame each known type can be - longer frames are allowed, for fields added later
+MIN_FRAME_SIZE = {FRAME_SAMPLE: SAMPLE_FRAME_SIZE, FRAME_HEARTBEAT: HEARTBEAT_FRAME_SIZE}
+
+Frame = namedtuple('Frame', 'type device_id seq timestamp eyes_closed battery')
+
+
+class ProtocolError(ValueError):
+    """Raised for frames that cannot be decoded"""
+
+
+def encode_sample(device_id, seq, timestamp, eyes_closed, battery):
+    buffer = bytearray(SAMPLE_FRAME_SIZE)
+    pack_sample_into(buffer, 0, device_id, seq, timestamp, eyes_closed, battery)
+    return bytes(buffer)
+
+
+def pack_sample_into(buffer, offset, device_id, seq, timestamp, eyes_closed, battery):
+    """Write a sample frame into buffer at offset - lets senders batch frames without copies"""
+    HEADER.pack_into(buffer, offset, SAMPLE_FRAME_SIZE - LENGTH.size, PROTOCOL_VERSION,
+                     FRAME_SAMPLE, device_id, seq & 0xFFFFFFFF, timestamp)
+    SAMPLE_PAYLOAD.pack_into(buffer, offset + HEADER_SIZE, eyes_closed, battery)
+    return offset + SAMPLE_FRAME_SIZE
+
+
+def encode_heartbeat(device_id, seq, timestamp):
+    return HEADER.pack(HEARTBEAT_FRAME_SIZE - LENGTH.size, PROTOCOL_VERSION,
+                       FRAME_HEARTBEAT, device_id, seq & 0xFFFFFFFF, timestamp)
+
+
+def decode_frame(buffer, offset=0):
+    """Decode one complete frame at offset. Returns (frame, next_offset)."""
+    try:
+        length, version, frame_type, device_id, seq, timestamp = HEADER.unpack_from(buffer, offset)
+    except struct.error as e:
+        raise ProtocolError(f"Truncated header: {e}") from None
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}")
+    size = LENGTH.size + length
+    if size < MIN_FRAME_SIZE.get(frame_type, HEADER_SIZE):
+        raise ProtocolError(f"Frame type {frame_type} too short: {size} bytes")
+    end = offset + size
+    if end > len(buffer):
+        raise ProtocolError(f"Truncated frame: need {end - offset} bytes, have {len(buffer) - offset}")
+    if frame_type == FRAME_SAMPLE:
+        eyes_closed, battery = SAMPLE_PAYLOAD.unpack_from(buffer, offset + HEADER_SIZE)
+        return Frame(frame_type, device_id, seq, timestamp, eyes_closed, battery), end
+    if frame_type == FRAME_HEARTBEAT:
+        return Frame(frame_type, device_id, seq, timestamp, None, None), end
+    # Unknown types are skipped by length so newer senders stay compatible
+    return None, end
+
+
+class FrameDecoder:
+    """Reassemble frames from a byte stream that may split or merge them.
+
+    A frame whose length is sound but whose contents are not is skipped
+    and counted in `errors`; a bad length leaves no way to find the next
+    frame, so it raises ProtocolError.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.errors = 0
+
+    def feed(self, data):
+        """Add received bytes and return the list of complete frames"""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        offset = 0
+        available = len(buffer)
+        while available - offset >= LENGTH.size:
+            length = LENGTH.unpack_from(buffer, offset)[0]
+            if length + LENGTH.size > MAX_FRAME_SIZE or length + LENGTH.size < HEADER_SIZE:
+                raise ProtocolError(f"Bad frame length {length}")
+            if available - offset < LENGTH.size + length:
+                break
+            try:
+                frame, _ = decode_frame(buffer, offset)
+            except ProtocolError:
+                self.errors += 1
+                frame = None
+            offset += LENGTH.size + length
+            if frame is not None:
+                frames.append(frame)
+        if offset:
+            del buffer[:offset]
+        self.frames += len(frames)
+        return frames
+
+
+def decode_datagram(data):
+    """Decode the frames packed into one UDP datagram. Returns (frames, bad frames).
+
+    Bad frames are skipped by their length; a bad length ends the datagram.
+    """
+    frames = []
+    errors = 0
+    offset = 0
+    while len(data) - offset >= LENGTH.size:
+        size = LENGTH.size + LENGTH.unpack_from(data, offset)[0]
+        if size < HEADER_SIZE or offset + size > len(data):
+            errors += 1
+            break
+        try:
+            frame, _ = decode_frame(data, offset)
+        except ProtocolError:
+            errors += 1
+            frame = None
+        offset += size
+        if frame is not None:
+            frames.append(frame)
+    return frames, errors
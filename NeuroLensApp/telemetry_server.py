@@ -0,0 +1,256 @@
+# telemetry_server.py - TCP/UDP ingestion of binary telemetry frames into a FleetMonitor
+import asyncio
+import time
+from collections import deque
+
+from fleet_monitor import FleetMonitor
+from telemetry_protocol import FrameDecoder, ProtocolError, decode_datagram, FRAME_SAMPLE
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9750  # Same number for TCP and UDP
+
+# A UDP sender silent this long (seconds) is forgotten, and its devices go offline
+UDP_TIMEOUT = 10.0
+
+
+class _TCPTelemetryProtocol(asyncio.Protocol):
+    """One TCP connection - may carry frames from several devices"""
+
+    def __init__(self, server):
+        self.server = server
+        self.decoder = FrameDecoder()
+        self.transport = None
+        self.last_seq = {}  # device id -> last sequence number on this connection
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections += 1
+
+    def data_received(self, data):
+        self.server.bytes_received += len(data)
+        decoder = self.decoder
+        errors = decoder.errors
+        try:
+            frames = decoder.feed(data)
+        except ProtocolError as e:
+            self.server.protocol_errors += 1
+            print(f"Telemetry connection dropped: {e}")
+            self.transport.close()
+            return
+        self.server.protocol_errors += decoder.errors - errors
+        self.server.handle_frames(frames, self.last_seq)
+
+    def connection_lost(self, exc):
+        self.server.connections -= 1
+        self.server.disconnect(self.last_seq)
+
+
+class _UDPTelemetryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server.bytes_received += len(data)
+        frames, errors = decode_datagram(data)
+        self.server.protocol_errors += errors
+        self.server.handle_frames(frames, self.server.udp_seq, addr)
+
+
+class TelemetryServer:
+    """Accept telemetry frames over TCP and UDP and route them per device.
+
+    Every device id gets a detector in the FleetMonitor on first contact.
+    Samples are timed on the server's clock when they arrive, since remote
+    clocks are not comparable; the sender timestamp is only used for the
+    latency figures, which are meaningful when sender and server share a
+    host. Sequence numbers detect lost frames (gaps) and drop stale ones
+    (duplicates and reordering, common over UDP). They are tracked per TCP
+    connection and per UDP sender address, so a device that reconnects
+    after a reboot starts a fresh sequence. A device goes offline once
+    every stream it sent on is gone: its TCP connections closed and its
+    UDP senders silent for UDP_TIMEOUT seconds.
+    """
+
+    def __init__(self, fleet=None, host=DEFAULT_HOST, port=DEFAULT_PORT, udp_port=DEFAULT_PORT,
+                 latency_window=100000):
+        self.fleet = fleet or FleetMonitor()
+        self.host = host
+        self.port = port
+        self.udp_port = udp_port
+        self.loop = None
+        self.tcp_server = None
+        self.udp_transport = None
+        self.udp_seq = {}   # (sender address, device id) -> last sequence number
+        self.udp_seen = {}  # (sender address, device id) -> loop time of its last frame
+        self.streams = {}   # device id -> TCP connections and UDP senders it is live on
+        self.expiry = None
+
+        # Statistics
+        self.connections = 0
+        self.frames = 0
+        self.bytes_received = 0
+        self.lost = 0
+        self.stale = 0
+        self.protocol_errors = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.started = None
+        self.first_frame_at = None
+        self.last_frame_at = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.fleet.bind(self.loop)
+        if self.port is not None:
+            self.tcp_server = await self.loop.create_server(
+                lambda: _TCPTelemetryProtocol(self), self.host, self.port)
+        if self.udp_port is not None:
+            self.udp_transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: _UDPTelemetryProtocol(self), local_addr=(self.host, self.udp_port))
+            self.expiry = self.loop.call_later(UDP_TIMEOUT, self.expire_udp)
+        self.started = time.monotonic()
+        print(f"Telemetry server listening on {self.host} (tcp {self.port}, udp {self.udp_port})")
+
+    def handle_frames(self, frames, last_seq, source=None):
+        """Route decoded frames to their devices' detectors - `last_seq` holds the sequence
+        numbers of the stream they came on, keyed by (source, device id)"""
+        if not frames:
+            return
+        fleet = self.fleet
+        devices = fleet.devices
+        now = self.loop.time()
+        latencies = self.latencies
+        if self.first_frame_at is None:
+            self.first_frame_at = now
+        self.last_frame_at = now
+
+        for frame in frames:
+            device_id = frame.device_id
+            key = device_id if source is None else (source, device_id)
+            previous = last_seq.get(key)
+            if previous is not None:
+                gap = (frame.seq - previous) & 0xFFFFFFFF
+                if gap == 0 or gap > 0x7FFFFFFF:
+                    self.stale += 1
+                    continue
+                self.lost += gap - 1
+            else:
+                self.streams[device_id] = self.streams.get(device_id, 0) + 1
+            last_seq[key] = frame.seq
+            if source is not None:
+                self.udp_seen[key] = now
+            self.frames += 1
+            latencies.append(now - frame.timestamp)
+
+            device = devices.get(device_id)
+            if device is None:
+                device = fleet.add_device(device_id)
+            device.connected = True
+            if frame.type == FRAME_SAMPLE:
+                device.battery_level = frame.battery
+                fleet.handle_event(device, now, frame.eyes_closed)
+            else:
+                device.last_seen = now
+
+    def disconnect(self, last_seq):
+        """A TCP connection closed - release its devices"""
+        for device_id in last_seq:
+            self.release(device_id)
+        last_seq.clear()
+
+    def expire_udp(self):
+        """Forget UDP senders silent for UDP_TIMEOUT and release their devices - reschedules itself"""
+        now = self.loop.time()
+        for key, seen in list(self.udp_seen.items()):
+            if now - seen > UDP_TIMEOUT:
+                del self.udp_seen[key]
+                del self.udp_seq[key]
+                self.release(key[1])
+        self.expiry = self.loop.call_later(UDP_TIMEOUT / 2, self.expire_udp)
+
+    def release(self, device_id):
+        """One stream carrying device_id ended - the device is offline once none are left"""
+        remaining = self.streams.get(device_id, 0) - 1
+        if remaining > 0:
+            self.streams[device_id] = remaining
+            return
+        self.streams.pop(device_id, None)
+        device = self.fleet.devices.get(device_id)
+        if device is not None:
+            self.fleet.disconnect(device)
+
+    def get_stats(self):
+        # Rate over the span frames were arriving, so idle time before and after doesn't dilute it
+        elapsed = (self.last_frame_at - self.first_frame_at) if self.first_frame_at is not None else 0
+        latencies = sorted(self.latencies)
+        stats = {
+            "devices": len(self.fleet.devices),
+            "connections": self.connections,
+            "frames": self.frames,
+            "bytes": self.bytes_received,
+            "frames_per_second": self.frames / elapsed if elapsed else 0.0,
+            "lost": self.lost,
+            "stale": self.stale,
+            "protocol_errors": self.protocol_errors,
+        }
+        if latencies:
+            stats.update({
+                "latency_mean_ms": sum(latencies) / len(latencies) * 1000,
+                "latency_p50_ms": latencies[len(latencies) // 2] * 1000,
+                "latency_p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+                "latency_max_ms": latencies[-1] * 1000,
+            })
+        return stats
+
+    def reset_stats(self):
+        self.frames = self.bytes_received = self.lost = self.stale = 0
+        self.latencies.clear()
+        self.started = time.monotonic()
+        self.first_frame_at = self.last_frame_at = None
+
+    def close(self):
+        if self.expiry is not None:
+            self.expiry.cancel()
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+
+
+def run_server_process(host, port, udp_port, ready, stop, results):
+    """Child process entry point for benchmarks - serves until `stop` is set"""
+    async def serve():
+        server = TelemetryServer(host=host, port=port, udp_port=udp_port)
+        await server.start()
+        ready.set()
+        while not stop.is_set():
+            await asyncio.sleep(0.05)
+        # Let queued frames land before reporting: wait for TCP clients to
+        # hang up and the frame count to settle
+        deadline = time.monotonic() + 30
+        frames = -1
+        while (server.connections or server.frames != frames) and time.monotonic() < deadline:
+            frames = server.frames
+            await asyncio.sleep(0.1)
+        results.put(server.get_stats())
+        server.close()
+
+    asyncio.run(serve())
+
+
+# Serve until interrupted, printing ingestion stats
+if __name__ == "__main__":
+    async def main():
+        server = TelemetryServer()
+        await server.start()
+        while True:
+            await asyncio.sleep(5)
+            stats = server.get_stats()
+            snapshot = server.fleet.get_snapshot()
+            print(f"{stats['devices']} devices, {stats['frames']:,} frames "
+                  f"({stats['frames_per_second']:,.0f}/s), lost {stats['lost']}, "
+                  f"critical {len(snapshot.critical_devices)}")
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
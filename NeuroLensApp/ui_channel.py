@@ -0,0 +1,141 @@
+# ui_channel.py - Push events from sensor threads into the Tk main loop
+import collections
+import threading
+import time
+import tkinter as tk
+
+# Virtual event used to wake the Tk main loop when events are queued
+SENSOR_EVENT = "<<SensorEvent>>"
+
+# Event kinds where only the newest payload matters - older ones are dropped
+COALESCED_KINDS = ('snapshot',)
+
+
+class UIEventChannel:
+    """Thread-safe channel from SensorMonitor into the Tk main loop.
+
+    Producers on any thread call post(kind, payload). The first post after
+    a drain wakes the main loop with event_generate(when="tail"), so the
+    handlers run on the next Tk event cycle instead of waiting for a poll.
+    Where Tcl is not thread-enabled, or the wakeup fails, an adaptive
+    after() poll delivers instead: it runs every `busy_interval` ms while
+    events are arriving and backs off to `idle_interval` ms when quiet.
+    Handlers always run on the Tk thread.
+    """
+
+    def __init__(self, root, busy_interval=16, idle_interval=1000):
+        self.root = root
+        self.busy_interval = busy_interval
+        self.idle_interval = idle_interval
+        self.poll_interval = idle_interval
+        self.events = collections.deque()
+        self.handlers = collections.defaultdict(list)
+        self.wakeup_pending = False
+        self.threaded = self._tcl_is_threaded()
+        self.main_thread = threading.current_thread()
+        self.poll_job = None
+        self.closed = False
+
+        # Delivery statistics
+        self.posted = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.wakeups = 0
+        self.max_latency = 0.0
+
+        self.root.bind(SENSOR_EVENT, lambda event: self.drain(), add="+")
+        self._schedule_poll()
+
+    def _tcl_is_threaded(self):
+        """True when Tk calls from other threads are safely marshalled"""
+        try:
+            return bool(self.root.tk.eval("set tcl_platform(threaded)"))
+        except tk.TclError:
+            return False
+
+    def subscribe(self, kind, callback):
+        """Run callback(payload) on the Tk thread for every event of this kind"""
+        self.handlers[kind].append(callback)
+
+    def post(self, kind, payload=None):
+        """Queue an event from any thread and wake the main loop if needed"""
+        if self.closed:
+            return
+        self.events.append((kind, payload, time.monotonic()))
+        self.posted += 1
+
+        if self.wakeup_pending:
+            return
+        self.wakeup_pending = True
+
+        if threading.current_thread() is self.main_thread:
+            self.root.after_idle(self.drain)
+        elif self.threaded:
+            try:
+                self.root.event_generate(SENSOR_EVENT, when="tail")
+                self.wakeups += 1
+            except (tk.TclError, RuntimeError):
+                # Main loop not running yet or shutting down - the poll will pick it up
+                pass
+
+    def drain(self):
+        """Deliver all queued events on the Tk thread"""
+        self.wakeup_pending = False
+        if not self.events:
+            return 0
+
+        latest = {}
+        batch = []
+        while self.events:
+            kind, payload, posted_at = self.events.popleft()
+            if kind in COALESCED_KINDS:
+                if kind in latest:
+                    self.coalesced += 1
+                latest[kind] = (payload, posted_at)
+            else:
+                batch.append((kind, payload, posted_at))
+        batch.extend((kind, payload, posted_at) for kind, (payload, posted_at) in latest.items())
+
+        now = time.monotonic()
+        for kind, payload, posted_at in batch:
+            self.max_latency = max(self.max_latency, now - posted_at)
+            for callback in self.handlers.get(kind, ()):
+                try:
+                    callback(payload)
+                except Exception as e:
+                    print(f"UI event handler error ({kind}): {e}")
+            self.delivered += 1
+        return len(batch)
+
+    def _schedule_poll(self):
+        if not self.closed:
+            self.poll_job = self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        """Fallback delivery - fast while busy, backing off when idle"""
+        if self.drain():
+            self.poll_interval = self.busy_interval
+        else:
+            self.poll_interval = min(self.idle_interval, self.poll_interval * 2)
+        self._schedule_poll()
+
+    def get_stats(self):
+        return {
+            "posted": self.posted,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "wakeups": self.wakeups,
+            "max_latency_ms": self.max_latency * 1000,
+            "threaded_tcl": self.threaded,
+        }
+
+    def close(self):
+        """Stop polling and drop any undelivered events"""
+        self.closed = True
+        if self.poll_job is not None:
+            try:
+                self.root.after_cancel(self.poll_job)
+            except tk.TclError:
+                pass
+            self.poll_job = None
+        self.events.clear()
@@ -1,49 +1,292 @@
+"""
+Anti-sleep glasses headless service for the Raspberry Pi.
+
+Escalation is the same as the original polling script: when the sensor
+goes LOW the timer restarts, and while it stays LOW the motor runs and the
+buzzer is silent. While the sensor reads HIGH, the buzzer sounds once 3
+seconds have passed since the timer restarted and the motor switches
+(active low) at 4 seconds - so after a LOW lasting 4 seconds or more both
+fire as soon as the sensor goes HIGH. Instead of polling the pin every
+100 ms, the service waits on sensor edges and on the next escalation
+deadline, so outputs change within a few milliseconds of the edge or
+deadline. The pin is also re-read whenever that wait times out (at least
+once a second), so an edge lost to debouncing cannot leave it in the
+wrong state.
+
+Live state is published as JSON lines on a local TCP endpoint
+(127.0.0.1:8765 by default) that the NeuroLens UI can attach to.
 
+Run: python3 Pi.py [--host HOST] [--port PORT]
 """
-import RPi.GPIO as GPIO
+import argparse
+import json
+import queue
+import socket
+import threading
 import time
-"""
 
 # Pin definitions (BCM numbering)
 SENSOR_PIN = 2    # GPIO2 connected to IR/eye-detection sensor
 MOTOR_PIN = 8     # GPIO8 connected to the motor relay/driver
 BUZZER_PIN = 9    # GPIO9 connected to the buzzer
 
-# Track the last time the sensor detected closed eyes
-last_trigger_time = time.time()
-
-def time_delay():
-    """Return elapsed seconds since last sensor trigger."""
-    return int(time.time() - last_trigger_time)
-
-# --- Setup ---
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(MOTOR_PIN, GPIO.OUT)
-GPIO.setup(BUZZER_PIN, GPIO.OUT)
-GPIO.setup(SENSOR_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)  # pull-up similar to Arduino default
-
-GPIO.output(MOTOR_PIN, GPIO.HIGH)  # motor on initially
-GPIO.output(BUZZER_PIN, GPIO.LOW)  # buzzer off
-
-try:
-    while True:
-        if GPIO.input(SENSOR_PIN) == GPIO.LOW:
-            # Eyes closed: reset timer, run motor, silence buzzer
-            last_trigger_time = time.time()
-            while GPIO.input(SENSOR_PIN) == GPIO.LOW:
-                GPIO.output(BUZZER_PIN, GPIO.LOW)
-                GPIO.output(MOTOR_PIN, GPIO.HIGH)
-                time.sleep(1)
-        else:
-            # Eyes open: check elapsed time
-            if time_delay() >= 3:
-                GPIO.output(BUZZER_PIN, GPIO.HIGH)
-            if time_delay() >= 4:
-                GPIO.output(MOTOR_PIN, GPIO.LOW)
-
-        time.sleep(0.1)  # small loop delay to reduce CPU usage
-
-except KeyboardInterrupt:
-    pass
-finally:
-    GPIO.cleanup()
+# Seconds of sensor HIGH before each output escalates
+BUZZER_DELAY = 3.0
+MOTOR_DELAY = 4.0
+
+# Local IPC endpoint for the UI
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Publish state at least this often so clients can detect a dead link
+HEARTBEAT_INTERVAL = 1.0
+
+# A client with this many messages unsent, or one send blocked this long (seconds), is dropped
+CLIENT_BACKLOG = 64
+CLIENT_SEND_TIMEOUT = 2.0
+
+
+class _Client:
+    """One subscriber - a bounded queue drained by its own writer thread, so a
+    client that stops reading never blocks the sensor loop"""
+
+    def __init__(self, sock, on_close):
+        self.sock = sock
+        self.on_close = on_close
+        self.messages = queue.Queue(maxsize=CLIENT_BACKLOG)
+        self.closed = False
+        threading.Thread(target=self._write_loop, name="state-client", daemon=True).start()
+
+    def offer(self, message):
+        """Queue a message without waiting - False if the client is too far behind"""
+        try:
+            self.messages.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def _write_loop(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                break
+            try:
+                self.sock.sendall(message)
+            except OSError:  # Includes send timeouts
+                break
+        self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.sock.close()
+            self.on_close(self)
+        try:
+            self.messages.put_nowait(None)  # Wake the writer
+        except queue.Full:
+            pass
+
+
+class StatePublisher:
+    """Broadcast JSON-line state messages to every connected client.
+
+    publish() only queues each message for the clients' writer threads;
+    clients with CLIENT_BACKLOG messages unsent are dropped.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.server = socket.create_server((host, port), reuse_port=False)
+        self.clients = []
+        self.lock = threading.Lock()
+        self.last_message = None
+        self.thread = threading.Thread(target=self._accept_loop, name="state-publisher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.settimeout(CLIENT_SEND_TIMEOUT)
+            client = _Client(sock, self._remove)
+            with self.lock:
+                self.clients.append(client)
+                if self.last_message is not None:
+                    client.offer(self.last_message)
+
+    def _remove(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def publish(self, state):
+        message = (json.dumps(state) + "\n").encode()
+        with self.lock:
+            self.last_message = message
+            lagging = [client for client in self.clients if not client.offer(message)]
+        for client in lagging:
+            print("Dropping a state client that stopped reading")
+            client.close()
+
+    def close(self):
+        self.server.close()
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            client.close()
+
+
+class AntiSleepDaemon:
+    """Edge-driven sensor loop with deadline-based escalation"""
+
+    def __init__(self, gpio, publisher=None):
+        self.gpio = gpio
+        self.publisher = publisher
+        self.edges = queue.SimpleQueue()
+        self.running = True
+        self.sequence = 0
+
+        # The timer restarts when the sensor goes LOW and escalates only while it reads HIGH
+        self.sensor_low = True
+        self.last_trigger_time = time.monotonic()
+        self.buzzer_on = False
+        self.motor_switched = False
+        self.last_edge_latency = 0.0
+
+    def setup(self):
+        gpio = self.gpio
+        gpio.setmode(gpio.BCM)
+        gpio.setup(MOTOR_PIN, gpio.OUT)
+        gpio.setup(BUZZER_PIN, gpio.OUT)
+        gpio.setup(SENSOR_PIN, gpio.IN, pull_up_down=gpio.PUD_UP)  # pull-up similar to Arduino default
+
+        gpio.output(MOTOR_PIN, gpio.HIGH)  # motor on initially
+        gpio.output(BUZZER_PIN, gpio.LOW)  # buzzer off
+
+        gpio.add_event_detect(SENSOR_PIN, gpio.BOTH, callback=self._on_edge, bouncetime=5)
+        self._on_edge(SENSOR_PIN)
+
+    def _on_edge(self, channel):
+        """GPIO callback - timestamp the edge and hand it to the main loop"""
+        self.edges.put((time.monotonic(), self.gpio.input(channel) == self.gpio.LOW))
+
+    def time_delay(self, now=None):
+        """Return elapsed seconds since the sensor last went LOW (0 while it is LOW)."""
+        if self.sensor_low:
+            return 0.0
+        return (time.monotonic() if now is None else now) - self.last_trigger_time
+
+    def next_deadline(self):
+        """Monotonic time of the next escalation, or None"""
+        if self.sensor_low:
+            return None
+        if not self.buzzer_on:
+            return self.last_trigger_time + BUZZER_DELAY
+        if not self.motor_switched:
+            return self.last_trigger_time + MOTOR_DELAY
+        return None
+
+    def set_outputs(self, buzzer_on, motor_switched):
+        """Write only the outputs that change"""
+        if buzzer_on != self.buzzer_on:
+            self.gpio.output(BUZZER_PIN, self.gpio.HIGH if buzzer_on else self.gpio.LOW)
+            self.buzzer_on = buzzer_on
+        if motor_switched != self.motor_switched:
+            self.gpio.output(MOTOR_PIN, self.gpio.LOW if motor_switched else self.gpio.HIGH)
+            self.motor_switched = motor_switched
+
+    def handle_edge(self, timestamp, sensor_low):
+        if sensor_low == self.sensor_low:
+            return
+        self.sensor_low = sensor_low
+        if sensor_low:
+            # Reset timer, run motor, silence buzzer
+            self.last_trigger_time = timestamp
+            self.set_outputs(False, False)
+        self.escalate(time.monotonic())
+        self.last_edge_latency = time.monotonic() - timestamp
+
+    def escalate(self, now):
+        elapsed = self.time_delay(now)
+        self.set_outputs(self.buzzer_on or elapsed >= BUZZER_DELAY,
+                         self.motor_switched or elapsed >= MOTOR_DELAY)
+
+    def state(self):
+        return {
+            "seq": self.sequence,
+            "time": time.time(),
+            "sensor_low": self.sensor_low,
+            "elapsed": round(self.time_delay(), 3),
+            "buzzer": self.buzzer_on,
+            "motor_switched": self.motor_switched,
+            "edge_latency_ms": round(self.last_edge_latency * 1000, 3),
+        }
+
+    def publish(self):
+        self.sequence += 1
+        if self.publisher is not None:
+            self.publisher.publish(self.state())
+
+    def run(self):
+        """Block on edges and escalation deadlines until stopped"""
+        last_publish = 0.0
+        while self.running:
+            before = (self.sensor_low, self.buzzer_on, self.motor_switched)
+            now = time.monotonic()
+            deadline = self.next_deadline()
+            timeout = HEARTBEAT_INTERVAL - (now - last_publish)
+            if deadline is not None:
+                timeout = min(timeout, deadline - now)
+
+            try:
+                timestamp, sensor_low = self.edges.get(timeout=max(0.0, timeout))
+                self.handle_edge(timestamp, sensor_low)
+            except queue.Empty:
+                # Re-read the pin in case debouncing swallowed an edge
+                sensor_low = self.gpio.input(SENSOR_PIN) == self.gpio.LOW
+                if sensor_low != self.sensor_low:
+                    print("Sensor edge missed - resynchronised from the pin")
+                    self.handle_edge(time.monotonic(), sensor_low)
+                self.escalate(time.monotonic())
+
+            now = time.monotonic()
+            changed = before != (self.sensor_low, self.buzzer_on, self.motor_switched)
+            if changed or now - last_publish >= HEARTBEAT_INTERVAL:
+                self.publish()
+                last_publish = now
+
+    def stop(self):
+        self.running = False
+        self.edges.put((time.monotonic(), self.sensor_low))  # wake the loop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anti-sleep glasses sensor service")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="IPC bind address (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="IPC port (default: %(default)s)")
+    args = parser.parse_args()
+
+    import RPi.GPIO as GPIO
+
+    publisher = StatePublisher(args.host, args.port)
+    publisher.start()
+    daemon = AntiSleepDaemon(GPIO, publisher)
+    daemon.setup()
+    print(f"Anti-sleep service running - state on {args.host}:{args.port}")
+
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        publisher.close()
+        GPIO.cleanup()
+
+
+if __name__ == "__main__":
+    main()